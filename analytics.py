@@ -0,0 +1,210 @@
+"""
+Portfolio analytics served from the portfolio_rollups summary table.
+
+Each row holds one user's totals for the projects starting in one year.
+Routes that change a project, its labor estimation or its summary call
+refresh_rollups before committing, which recomputes only the affected
+(user, year) rows inside the same transaction. The analytics endpoint then
+reads a handful of rows however many projects the user has.
+"""
+
+from datetime import date
+
+import click
+
+from flask import Blueprint
+from flask import current_app
+from flask import jsonify
+from flask import session
+
+from auth import login_required
+from bulk import upsert
+from database import db, dialect_name, latest_row_per
+from estimator import calc
+from models import Project, ProjectSummary, LaborCostEstimation, PortfolioRollup
+
+
+bp = Blueprint("analytics", __name__, cli_group="analytics")
+
+ROLLUP_FIELDS = (
+    "projects_count", "summaries_count", "approved_count", "rejected_count", "chargers_count",
+    "grand_total", "total_submitted", "approved_amount", "price_per_charger_total", "price_per_charger_count",
+)
+
+
+def starts_in(year):
+    """
+    Projects starting in ``year``, as a half-open start_date range that an
+    index on start_date can serve (extract('year', ...) can't). Raises
+    ValueError for years outside what a date can hold.
+    """
+    return db.and_(Project.start_date >= date(year, 1, 1), Project.start_date < date(year + 1, 1, 1))
+
+
+def _year_filter(query, user_id, years):
+    """Limit a query to projects starting in the given years"""
+    if user_id is not None:
+        query = query.filter(Project.user_id == user_id)
+    if years is not None:
+        query = query.filter(db.or_(*(starts_in(year) for year in years)))
+    return query
+
+
+def compute_rollups(user_id=None, years=None):
+    """Aggregate rollup rows straight from the source tables, keyed by (user_id, year)"""
+    year = db.extract('year', Project.start_date)
+    # Only each project's newest summary and labor estimation count, the ones
+    # the listing shows; at most one of each per project, so neither multiplies the other
+    summary, summary_on = latest_row_per(
+        Project.id,
+        ProjectSummary.project_id,
+        [ProjectSummary.created_at.desc(), ProjectSummary.id.desc()],
+        [
+            ProjectSummary.id,
+            ProjectSummary.approved,
+            ProjectSummary.grand_total,
+            ProjectSummary.total_submitted,
+            ProjectSummary.approved_amount,
+            ProjectSummary.price_per_charger
+        ]
+    )
+    labor, labor_on = latest_row_per(
+        Project.id,
+        LaborCostEstimation.project_id,
+        [LaborCostEstimation.created_at.desc(), LaborCostEstimation.id.desc()],
+        [LaborCostEstimation.id, LaborCostEstimation.chargers_count]
+    )
+    counted_price = db.and_(summary.c.price_per_charger.isnot(None), summary.c.price_per_charger > 0)
+
+    rows = _year_filter(db.session.query(
+        Project.user_id,
+        year.label('year'),
+        db.func.count(Project.id),
+        db.func.count(summary.c.id),
+        db.func.sum(db.case((summary.c.approved.is_(True), 1), else_=0)),
+        db.func.sum(db.case((summary.c.approved.is_(False), 1), else_=0)),
+        db.func.sum(summary.c.grand_total),
+        db.func.sum(summary.c.total_submitted),
+        db.func.sum(summary.c.approved_amount),
+        db.func.sum(db.case((counted_price, summary.c.price_per_charger), else_=0)),
+        db.func.sum(db.case((counted_price, 1), else_=0)),
+        db.func.sum(labor.c.chargers_count),
+    ).select_from(Project).outerjoin(summary, summary_on).outerjoin(labor, labor_on), user_id, years).group_by(
+        Project.user_id, year
+    ).all()
+
+    rollups = {}
+    for (row_user, row_year, projects, summaries, approved, rejected, grand_total, submitted, approved_amount,
+         price_total, price_count, chargers) in rows:
+        key = (row_user, int(row_year))
+        rollups[key] = {
+            "user_id": row_user,
+            "year": key[1],
+            "projects_count": projects,
+            "summaries_count": summaries,
+            "approved_count": approved or 0,
+            "rejected_count": rejected or 0,
+            "chargers_count": int(chargers or 0),
+            "grand_total": calc.money(grand_total),
+            "total_submitted": calc.money(submitted),
+            "approved_amount": calc.money(approved_amount),
+            "price_per_charger_total": calc.money(price_total),
+            "price_per_charger_count": price_count or 0,
+        }
+    return rollups
+
+
+def _lock_rollups(user_id, years):
+    """
+    Hold a transaction-scoped advisory lock per (user, year) until commit, so
+    concurrent refreshes of the same row run one after the other. The next
+    statement then reads (READ COMMITTED) whatever the previous holder
+    committed, and its upsert can't overwrite that with a stale aggregate.
+    Years are locked in order so two refreshes can't deadlock. SQLite
+    serializes writers on its own.
+    """
+    if dialect_name() != 'postgresql':
+        return
+    for year in sorted(years):
+        db.session.execute(db.select(db.func.pg_advisory_xact_lock(user_id, year)))
+
+
+def refresh_rollups(user_id, *years):
+    """
+    Recompute a user's rollup rows for the given start-date years. Flushes
+    pending changes first so they are counted; does not commit.
+    """
+    years = {year for year in years if year is not None}
+    if not years:
+        return
+    db.session.flush()
+    _lock_rollups(user_id, years)
+
+    rollups = compute_rollups(user_id, years)
+    upsert(PortfolioRollup, list(rollups.values()), ["user_id", "year"], ROLLUP_FIELDS,
+           constraint="uq_portfolio_rollups_user_year")
+
+    emptied = [year for year in years if (user_id, year) not in rollups]
+    if emptied:
+        PortfolioRollup.query.filter(
+            PortfolioRollup.user_id == user_id, PortfolioRollup.year.in_(emptied)
+        ).delete(synchronize_session=False)
+
+
+def rebuild_rollups(user_id=None):
+    """Replace every rollup row (or one user's) from the source tables; does not commit"""
+    query = PortfolioRollup.query
+    if user_id is not None:
+        query = query.filter_by(user_id=user_id)
+    query.delete(synchronize_session=False)
+
+    rollups = compute_rollups(user_id)
+    upsert(PortfolioRollup, list(rollups.values()), ["user_id", "year"], ROLLUP_FIELDS,
+           constraint="uq_portfolio_rollups_user_year")
+    return len(rollups)
+
+
+def _ratio(numerator, denominator, places=calc.RATE_PLACES):
+    if not denominator:
+        return None
+    return (calc.to_decimal(numerator) / denominator).quantize(places)
+
+
+def _figures(row):
+    """Dashboard figures of one rollup row or of the sum of several"""
+    decided = row["approved_count"] + row["rejected_count"]
+    return {
+        **row,
+        "pending_count": row["summaries_count"] - decided,
+        "approval_rate": _ratio(row["approved_count"], decided),
+        "average_price_per_charger": calc.money(_ratio(row["price_per_charger_total"], row["price_per_charger_count"])),
+        "approved_share_of_submitted": _ratio(row["approved_amount"], row["total_submitted"]),
+    }
+
+
+@bp.route("/portfolio/api/analytics")
+@login_required
+def portfolio_analytics():
+    try:
+        rows = PortfolioRollup.query.filter_by(user_id=session["user_id"]).order_by(PortfolioRollup.year).all()
+    except Exception as e:
+        current_app.logger.error(f"Error loading portfolio analytics: {str(e)}")
+        return jsonify({'success': False, 'message': 'An error occurred while loading analytics'}), 500
+
+    years = [{field: getattr(row, field) for field in ("year",) + ROLLUP_FIELDS} for row in rows]
+    overall = {field: sum((year[field] for year in years), 0) for field in ROLLUP_FIELDS}
+
+    return jsonify({
+        'success': True,
+        'years': [_figures(year) for year in years],
+        'overall': _figures(overall),
+    })
+
+
+@bp.cli.command("rebuild-rollups")
+@click.option("--user-id", type=int, help="Only rebuild this user's rows")
+def rebuild_rollups_command(user_id):
+    """Recompute the portfolio rollups from the projects and summaries"""
+    count = rebuild_rollups(user_id)
+    db.session.commit()
+    click.echo(f"Rebuilt {count} portfolio rollup rows")
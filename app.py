@@ -1,12 +1,25 @@
 import os
+from decimal import Decimal
 from flask import Flask
+from flask.json.provider import DefaultJSONProvider
 from dotenv import load_dotenv
 from flask_migrate import Migrate
-from database import db
+from database import db, engine_options, configure_engine
 
 load_dotenv()
 
+class JSONProvider(DefaultJSONProvider):
+    """Send Numeric amounts as JSON numbers; Flask's default turns Decimal into a string"""
+
+    @staticmethod
+    def default(o):
+        if isinstance(o, Decimal):
+            return float(o)
+        return DefaultJSONProvider.default(o)
+
+
 app = Flask(__name__)
+app.json = JSONProvider(app)
 app.secret_key = os.getenv("SECRET_KEY")
 
 # Configure database - use DATABASE_URL if available (Railway provides this)
@@ -19,19 +32,34 @@ else:
 
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
+# Pool sizing, pre-ping, recycle and statement timeout, all driven by environment variables
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config['SQLALCHEMY_DATABASE_URI'])
+
+# Number of projects per page on the projects listing
+app.config['PROJECTS_PAGE_SIZE'] = int(os.getenv("PROJECTS_PAGE_SIZE", "25"))
+
 # Initialize the database and migration
 db.init_app(app)
 migrate = Migrate(app, db)
 
+with app.app_context():
+    configure_engine(db.engine)
+
 # Import models after db initialization
 from models import *  # This ensures models are registered with SQLAlchemy
 
 # Register blueprints
 from auth import bp as auth_bp
 from portfolio import bp as portfolio_bp
+from perf import bp as perf_bp
+from repricing import bp as repricing_bp
+from analytics import bp as analytics_bp
 
 app.register_blueprint(auth_bp)
 app.register_blueprint(portfolio_bp)
+app.register_blueprint(perf_bp)
+app.register_blueprint(repricing_bp)
+app.register_blueprint(analytics_bp)
 app.add_url_rule("/", endpoint="index")
 
 # Custom Jinja2 filter for currency formatting
@@ -53,7 +81,7 @@ def format_datetime(value):
     return value.strftime('%Y-%m-%d %H:%M:%S')
 
 # Template helpers
-from portfolio import (
+from pricing import (
     get_wire_price,
     get_conduit_price,
     get_supplier_wire_update,
@@ -0,0 +1,77 @@
+"""
+Compare two benchmark result files, e.g. from the base and head commits:
+
+    python -m benchmarks.compare base.json head.json --threshold 15
+
+Exits with status 1 when a case's p95 latency grew by more than the
+threshold percentage or it started running more queries per request.
+"""
+
+import argparse
+import json
+import sys
+
+
+def _change(base, head):
+    if not base:
+        return None
+    return (head - base) / base * 100
+
+
+def compare(base, head, threshold):
+    """Rows of (case, metric deltas, regressed) for every case in either report"""
+    rows = []
+    for name in sorted(set(base["cases"]) | set(head["cases"])):
+        before = base["cases"].get(name)
+        after = head["cases"].get(name)
+        if before is None or after is None:
+            rows.append((name, None, False))
+            continue
+
+        p95 = _change(before["p95_ms"], after["p95_ms"])
+        deltas = {
+            "p50": _change(before["p50_ms"], after["p50_ms"]),
+            "p95": p95,
+            "queries": after["queries_median"] - before["queries_median"],
+            "peak_kb": _change(before.get("peak_kb"), after.get("peak_kb") or 0) if before.get("peak_kb") else None,
+        }
+        regressed = (p95 is not None and p95 > threshold) or deltas["queries"] > 0
+        rows.append((name, deltas, regressed))
+    return rows
+
+
+def _percent(value):
+    return "     n/a" if value is None else f"{value:+7.1f}%"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument("base")
+    parser.add_argument("head")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Allowed p95 growth in percent")
+    args = parser.parse_args()
+
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.head) as f:
+        head = json.load(f)
+
+    if any(base["meta"].get(key) != head["meta"].get(key) for key in ("scale", "dialect", "cold_caches")):
+        print("Warning: the two runs used different datasets or databases", file=sys.stderr)
+
+    print(f"{base['meta'].get('revision')} -> {head['meta'].get('revision')}")
+    print(f"{'case':<28}{'p50':>9}{'p95':>9}{'queries':>9}{'memory':>9}")
+    regressions = 0
+    for name, deltas, regressed in compare(base, head, args.threshold):
+        if deltas is None:
+            print(f"{name:<28}  only in one run")
+            continue
+        regressions += regressed
+        print(f"{name:<28}{_percent(deltas['p50'])}{_percent(deltas['p95'])}{deltas['queries']:>+9}"
+              f"{_percent(deltas['peak_kb'])}" + ("  REGRESSED" if regressed else ""))
+
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
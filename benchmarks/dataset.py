@@ -0,0 +1,241 @@
+"""
+Synthetic dataset for the benchmarks.
+
+The reference catalogs come from scripts/database_seeder.py. On top of them
+this adds more suppliers, unions and price history, and users whose projects
+carry a full estimation: AWG/conduit, misc/equipment, labor and a summary.
+"""
+
+import contextlib
+import io
+import random
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import insert
+
+from database import db
+from models import (
+    User, Project, CostEstimation, EstimationEntry, MiscEquipmentEstimation, MiscEquipmentEntry,
+    LaborCostEstimation, LaborCostEntry, ProjectSummary, MaterialSupplier, WirePrice, ConduitPrice,
+    ConstructionPrice, Union, UnionPosition, UnionWageRate
+)
+
+
+SCALES = {
+    "small": {"users": 2, "projects": 50, "entries": 10, "suppliers": 4, "unions": 3, "price_history": 6},
+    "medium": {"users": 5, "projects": 500, "entries": 20, "suppliers": 10, "unions": 6, "price_history": 12},
+    "large": {"users": 20, "projects": 2000, "entries": 40, "suppliers": 25, "unions": 12, "price_history": 24},
+}
+
+STREETS = ["Main St", "Sunset Blvd", "Wilshire Blvd", "Figueroa St", "Olympic Blvd", "Vermont Ave", "Pico Blvd", "Alameda St"]
+CITIES = ["Los Angeles", "Pasadena", "Long Beach", "Burbank", "Glendale", "Santa Monica", "Torrance", "Irvine"]
+COMPANIES = ["Chargie", "EVgo", "ChargePoint", "Electrify America", "Blink", "Volta", "SemaConnect"]
+PROJECT_TYPES = ["L2", "DCFC", "L2 + DCFC"]
+MISC_ITEMS = ["Bollards", "Signage", "Concrete Pad", "Trenching", "Wheel Stops", "Striping"]
+EQUIPMENT_ITEMS = ["Panel", "Switch Board", "Transformer", "Meter Pedestal", "Disconnect"]
+POSITIONS = ["Project Manager", "Foreman", "Journeyman", "Apprentice 1st Year", "Apprentice 3rd Year"]
+
+BENCH_PASSWORD = "benchmark"
+
+# Rows per INSERT round trip when loading the synthetic data
+BATCH_SIZE = 1000
+
+
+def _insert(model, rows, returning=False):
+    """Bulk insert rows; returns the new ids in input order when asked"""
+    if not rows:
+        return []
+    ids = []
+    for start in range(0, len(rows), BATCH_SIZE):
+        batch = rows[start:start + BATCH_SIZE]
+        if returning:
+            statement = insert(model).returning(model.id, sort_by_parameter_order=True)
+            ids.extend(db.session.execute(statement, batch).scalars().all())
+        else:
+            db.session.execute(insert(model), batch)
+    return ids
+
+
+def seed_reference_data():
+    """Suppliers, prices, construction materials and unions from the production seeder"""
+    # The seeder prints progress and its own sys.path on import
+    with contextlib.redirect_stdout(io.StringIO()):
+        import scripts.database_seeder as seeder
+        seeder.populate_suppliers()
+        seeder.populate_wire_prices()
+        seeder.populate_conduit_prices()
+        seeder.populate_construction_materials()
+        seeder.populate_unions_and_positions()
+
+
+def _add_suppliers(rng, count):
+    """Extra suppliers priced around the seeded ones, for every gauge and size"""
+    wire_keys = sorted({awg for (awg,) in db.session.query(WirePrice.awg).distinct()})
+    conduit_keys = sorted({size for (size,) in db.session.query(ConduitPrice.size).distinct()})
+    existing = db.session.query(MaterialSupplier).count()
+
+    names = [{"name": f"Supplier {i:03d}"} for i in range(max(0, count - existing))]
+    supplier_ids = _insert(MaterialSupplier, names, returning=True)
+
+    _insert(WirePrice, [
+        {"supplier_id": supplier_id, "awg": awg, "price_per_foot": round(rng.uniform(0.5, 25.0), 2)}
+        for supplier_id in supplier_ids for awg in wire_keys
+    ])
+    _insert(ConduitPrice, [
+        {"supplier_id": supplier_id, "size": size, "price_per_foot": round(rng.uniform(0.5, 15.0), 2)}
+        for supplier_id in supplier_ids for size in conduit_keys
+    ])
+
+
+def _add_price_history(rng, months):
+    """Monthly construction price history going back ``months`` months"""
+    now = datetime.utcnow()
+    rows = []
+    for (material_id, price) in db.session.query(ConstructionPrice.material_id, ConstructionPrice.price).all():
+        for month in range(1, months + 1):
+            stamp = now - timedelta(days=30 * month)
+            rows.append({
+                "material_id": material_id,
+                "price": round(float(price) * rng.uniform(0.85, 1.15), 2),
+                "created_at": stamp,
+                "updated_at": stamp
+            })
+    _insert(ConstructionPrice, rows)
+
+
+def _add_unions(rng, count, years):
+    """Extra unions with the usual positions and a yearly wage rate history"""
+    existing = db.session.query(Union).count()
+    union_ids = _insert(Union, [{"name": f"Local {500 + i}"} for i in range(max(0, count - existing))], returning=True)
+
+    position_rows = [
+        {"union_id": union_id, "name": name, "is_apprentice": name.startswith("Apprentice"),
+         "apprentice_year": int(name.split()[1][0]) if name.startswith("Apprentice") else None}
+        for union_id in union_ids for name in POSITIONS
+    ]
+    position_ids = _insert(UnionPosition, position_rows, returning=True)
+
+    today = date.today()
+    _insert(UnionWageRate, [
+        {"union_id": position["union_id"], "position_id": position_id,
+         "base_rate": round(rng.uniform(35.0, 120.0) * (1 - 0.03 * year), 2),
+         "effective_date": date(today.year - year, 1, 1)}
+        for position, position_id in zip(position_rows, position_ids) for year in range(years)
+    ])
+
+
+def _add_projects(rng, user_id, count, entries):
+    """``count`` projects for a user, each with one of every estimation and a summary"""
+    today = date.today()
+    projects = []
+    for _ in range(count):
+        start = today - timedelta(days=rng.randint(0, 3 * 365))
+        projects.append({
+            "user_id": user_id,
+            "address": f"{rng.randint(1, 9999)} {rng.choice(STREETS)}, {rng.choice(CITIES)}",
+            "company": rng.choice(COMPANIES),
+            "start_date": start,
+            "p_type": rng.choice(PROJECT_TYPES),
+            "status": "summary_submitted",
+            "created_at": datetime.combine(start, datetime.min.time())
+        })
+    project_ids = _insert(Project, projects, returning=True)
+
+    wire_names = ["AWG 10", "AWG 8", "AWG 6", "AWG 4", "AWG 3/0", "AWG 250 MCM"]
+    conduit_names = ['3/4"', '1"', '1 1/2"', '2"', '3"']
+
+    cost_ids = _insert(CostEstimation, [
+        {"project_id": project_id, "tax_percentage": 9.5, "tax_amount": 0.0, "grand_total": 0.0,
+         "awg_total": 0.0, "conduit_total": 0.0}
+        for project_id in project_ids
+    ], returning=True)
+    entry_rows = []
+    for cost_id in cost_ids:
+        for _ in range(entries):
+            for kind, names in (("AWG", wire_names), ("Conduit", conduit_names)):
+                cost = round(rng.uniform(0.5, 20.0), 2)
+                length = rng.randint(10, 500)
+                entry_rows.append({"cost_estimation_id": cost_id, "type": kind, "name": rng.choice(names),
+                                   "cost": cost, "length": length, "subtotal": round(cost * length, 2)})
+    _insert(EstimationEntry, entry_rows)
+
+    misc_ids = _insert(MiscEquipmentEstimation, [
+        {"project_id": project_id, "tax_percentage": 9.5, "tax_amount": 0.0, "grand_total": 0.0,
+         "misc_total": 0.0, "equipment_total": 0.0}
+        for project_id in project_ids
+    ], returning=True)
+    misc_rows = []
+    for misc_id in misc_ids:
+        for _ in range(entries):
+            for kind, names in (("Miscellaneous", MISC_ITEMS), ("Equipment", EQUIPMENT_ITEMS)):
+                cost = round(rng.uniform(50, 5000), 2)
+                quantity = rng.randint(1, 10)
+                misc_rows.append({"misc_equipment_estimation_id": misc_id, "type": kind, "name": rng.choice(names),
+                                  "cost": cost, "quantity": quantity, "subtotal": round(cost * quantity, 2)})
+    _insert(MiscEquipmentEntry, misc_rows)
+
+    chargers = [rng.randint(2, 40) for _ in project_ids]
+    labor_ids = _insert(LaborCostEstimation, [
+        {"project_id": project_id, "chargers_count": count_, "charger_price": 1000.0,
+         "labor_total": 0.0, "low_voltage_total": 1000.0 * count_, "grand_total": 0.0}
+        for project_id, count_ in zip(project_ids, chargers)
+    ], returning=True)
+    labor_rows = []
+    for labor_id in labor_ids:
+        for _ in range(entries):
+            rate = round(rng.uniform(35, 120), 2)
+            workers, hours, days = rng.randint(1, 6), 8, rng.randint(1, 20)
+            labor_rows.append({"labor_cost_estimation_id": labor_id, "position": rng.choice(POSITIONS), "rate": rate,
+                               "workers": workers, "hours": hours, "days": days,
+                               "subtotal": round(rate * workers * hours * days, 2)})
+    _insert(LaborCostEntry, labor_rows)
+
+    summaries = []
+    for project_id, count_ in zip(project_ids, chargers):
+        grand_total = round(rng.uniform(20000, 500000), 2)
+        approved = rng.choice([True, False, None])
+        summaries.append({
+            "project_id": project_id,
+            "grand_total": grand_total,
+            "total_submitted": grand_total,
+            "approved": approved,
+            "approved_amount": grand_total if approved else 0.0,
+            "price_per_charger": round(grand_total / count_, 2),
+            "price_per_charger_submitted": round(grand_total / count_, 2)
+        })
+    _insert(ProjectSummary, summaries)
+
+    return project_ids
+
+
+def build(users, projects, entries, suppliers, unions, price_history, seed=0):
+    """
+    Create every table and fill them at the given scale. ``projects`` is per
+    user and ``entries`` per estimation section. Returns the benchmark users
+    as (user_id, email) pairs.
+    """
+    from werkzeug.security import generate_password_hash
+
+    rng = random.Random(seed)
+
+    if db.engine.dialect.name == 'postgresql':
+        with db.engine.begin() as conn:
+            conn.exec_driver_sql("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    db.drop_all()
+    db.create_all()
+
+    seed_reference_data()
+    _add_suppliers(rng, suppliers)
+    _add_price_history(rng, price_history)
+    _add_unions(rng, unions, years=max(1, price_history // 6))
+
+    password = generate_password_hash(BENCH_PASSWORD)
+    bench_users = []
+    for i in range(users):
+        email = f"bench{i}@example.com"
+        user_id = _insert(User, [{"email": email, "username": f"bench{i}", "password": password}], returning=True)[0]
+        _add_projects(rng, user_id, projects, entries)
+        bench_users.append((user_id, email))
+
+    db.session.commit()
+    return bench_users
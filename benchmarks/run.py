@@ -0,0 +1,255 @@
+"""
+Benchmark the estimator hot paths against a synthetic dataset.
+
+Builds a fresh database at the requested scale, drives each route through
+the Flask test client and writes p50/p95 latency, queries per request and
+peak memory per route to a JSON file:
+
+    python -m benchmarks.run --scale medium
+    python -m benchmarks.run --database-url postgresql://localhost/estimator_bench --output head.json
+    python -m benchmarks.compare base.json head.json
+
+The database is dropped and recreated, so --database-url must point at a
+scratch database; DATABASE_URL from the environment is deliberately ignored.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def _awg_payload(project_id, entries):
+    awg = [{"name": "AWG 10", "cost": 1.5, "length": 100, "subtotal": 150.0, "notes_awg": ""} for _ in range(entries)]
+    conduit = [{"name": '1"', "cost": 3.0, "length": 100, "subtotal": 300.0, "notes_conduit": ""} for _ in range(entries)]
+    return {"project_id": project_id, "awgData": awg, "conduitData": conduit, "tax": 9.5,
+            "taxAmount": 42.75 * entries, "grandTotal": 492.75 * entries,
+            "awgTotal": 150.0 * entries, "conduitTotal": 300.0 * entries}
+
+
+def _misc_payload(project_id, entries):
+    misc = [{"name": "Bollards", "cost": 100, "quantity": 2, "subtotal": 200, "notes_misc": ""} for _ in range(entries)]
+    equipment = [{"name": "Panel", "cost": 500, "quantity": 1, "subtotal": 500, "notes_equip": ""} for _ in range(entries)]
+    return {"project_id": project_id, "miscData": misc, "equipmentData": equipment, "tax": 9.5,
+            "taxAmount": 66.5 * entries, "grandTotal": 766.5 * entries,
+            "miscTotal": 200 * entries, "equipmentTotal": 500 * entries}
+
+
+def _labor_payload(project_id, chargers_count, entries):
+    """Totals as the browser would preview them for the project's stored chargers count, which the server keeps"""
+    labor = [{"position": "Foreman", "rate": 90, "workers": 2, "hours": 8, "days": 3, "subtotal": 4320} for _ in range(entries)]
+    low_voltage = 1000 * chargers_count
+    return {"project_id": project_id, "laborData": labor,
+            "lowVoltageData": {"chargerPrice": 1000, "chargersCount": chargers_count},
+            "laborTotal": 4320 * entries, "lowVoltageTotal": low_voltage, "grandTotal": 4320 * entries + low_voltage}
+
+
+def _wire_prices_payload(catalog):
+    """Re-post the current wire prices of every supplier (an idempotent upsert)"""
+    return {str(supplier_id): dict(supplier["prices"]) for supplier_id, supplier in catalog.items()}
+
+
+def build_cases(project_ids, chargers, entries):
+    """(name, method, path, json body factory) for every benchmarked route"""
+    review_id = project_ids[len(project_ids) // 2]
+    queries = ["main", "sunset bl", "pasadena", "evgo", "wilsh", "figueroa st, long"]
+
+    def labor_payload(project_id):
+        return _labor_payload(project_id, chargers[project_id], entries)
+
+    return [
+        ("projects_listing", "GET", lambda i: "/portfolio/projects?year=ALL", None),
+        ("projects_listing_filtered", "GET", lambda i: "/portfolio/projects?year=ALL&approval=approved&sort=grand_total", None),
+        ("project_review", "GET", lambda i: f"/project_review/{review_id}", None),
+        ("search_projects", "GET", lambda i: f"/portfolio/search?q={queries[i % len(queries)]}", None),
+        ("material_prices", "GET", lambda i: "/portfolio/material_prices", None),
+        ("wire_prices_api", "GET", lambda i: "/portfolio/api/wire_prices", None),
+        ("conduit_prices_api", "GET", lambda i: "/portfolio/api/conduit_prices", None),
+        ("construction_prices_api", "GET", lambda i: "/portfolio/api/construction_prices", None),
+        ("wire_prices_post", "POST", lambda i: "/portfolio/api/wire_prices", "wire_prices"),
+        ("estimate_awg_cond", "POST", lambda i: "/portfolio/estimate_awg_cond",
+         lambda i: _awg_payload(project_ids[i % len(project_ids)], entries)),
+        ("estimate_misc_equip", "POST", lambda i: "/portfolio/estimate_misc_equip",
+         lambda i: _misc_payload(project_ids[i % len(project_ids)], entries)),
+        ("estimate_labor_cost", "POST", lambda i: "/portfolio/estimate_labor_cost",
+         lambda i: labor_payload(project_ids[i % len(project_ids)])),
+    ]
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, *args):
+        self.count += 1
+
+
+def run_case(client, case, iterations, warmup, memory_iterations, counter, reset=None):
+    name, method, path, body = case
+
+    def request(i):
+        if reset:
+            reset()
+        if method == "GET":
+            return client.get(path(i))
+        return client.post(path(i), json=body(i) if callable(body) else body)
+
+    for i in range(warmup):
+        request(i)
+
+    latencies, query_counts, failures = [], [], 0
+    for i in range(iterations):
+        counter.count = 0
+        start = time.perf_counter()
+        response = request(warmup + i)
+        latencies.append(time.perf_counter() - start)
+        query_counts.append(counter.count)
+        if response.status_code >= 400:
+            failures += 1
+
+    # Memory is measured in its own pass, since tracemalloc slows every allocation
+    peaks = []
+    tracemalloc.start()
+    try:
+        for i in range(memory_iterations):
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+            request(warmup + iterations + i)
+            peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "iterations": iterations,
+        "failures": failures,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 3),
+        "queries_median": statistics.median(query_counts),
+        "queries_max": max(query_counts),
+        "peak_kb": round(statistics.median(peaks) / 1024, 1) if peaks else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the estimator hot paths")
+    parser.add_argument("--database-url", help="Scratch database to (re)build; defaults to a temporary SQLite file")
+    parser.add_argument("--scale", choices=["small", "medium", "large"], default="small")
+    for option in ("users", "projects", "entries", "suppliers", "unions", "price-history"):
+        parser.add_argument(f"--{option}", type=int, help=f"Override the scale's {option.replace('-', ' ')}")
+    parser.add_argument("--iterations", type=int, default=30)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--memory-iterations", type=int, default=3)
+    parser.add_argument("--only", nargs="+", help="Run only these cases")
+    parser.add_argument("--cold", action="store_true", help="Empty the in-process caches before every request")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="JSON results file (default benchmarks/results/<revision>.json)")
+    args = parser.parse_args()
+
+    database_url = args.database_url or "sqlite:///" + os.path.join(tempfile.gettempdir(), "estimator_bench.sqlite")
+
+    # app.py reads its configuration at import time
+    os.environ["DATABASE_URL"] = database_url
+    os.environ.setdefault("SECRET_KEY", "benchmark")
+    os.chdir(ROOT)
+    sys.path.insert(0, ROOT)
+
+    from sqlalchemy import event
+
+    from app import app
+    from database import db
+    from benchmarks import dataset
+    import search
+    from models import Project, LaborCostEstimation
+    from pricing import get_catalog, price_cache, WIRE
+
+    scale = dict(dataset.SCALES[args.scale])
+    for option in ("users", "projects", "entries", "suppliers", "unions", "price_history"):
+        if getattr(args, option) is not None:
+            scale[option] = getattr(args, option)
+
+    app.config["TESTING"] = True
+    with app.app_context():
+        started = time.perf_counter()
+        users = dataset.build(seed=args.seed, **scale)
+        build_seconds = time.perf_counter() - started
+
+        user_id = users[0][0]
+        project_ids = [pid for (pid,) in db.session.query(Project.id).filter_by(user_id=user_id).order_by(Project.id)]
+        chargers = dict(db.session.query(LaborCostEstimation.project_id, LaborCostEstimation.chargers_count).filter(
+            LaborCostEstimation.project_id.in_(project_ids)
+        ))
+        wire_prices = _wire_prices_payload(get_catalog(WIRE))
+        dialect = db.engine.dialect.name
+
+        counter = QueryCounter()
+        event.listen(db.engine, "before_cursor_execute", counter)
+
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess["user_id"] = user_id
+
+    def reset_caches():
+        price_cache.clear()
+        search.invalidate_user_search(user_id)
+
+    results = {}
+    for case in build_cases(project_ids, chargers, scale["entries"]):
+        name = case[0]
+        if args.only and name not in args.only:
+            continue
+        if case[3] == "wire_prices":
+            case = (name, case[1], case[2], wire_prices)
+        results[name] = run_case(client, case, args.iterations, args.warmup, args.memory_iterations, counter,
+                                 reset=reset_caches if args.cold else None)
+        result = results[name]
+        print(f"{name:<28}p50 {result['p50_ms']:>9.2f}ms  p95 {result['p95_ms']:>9.2f}ms  "
+              f"queries {result['queries_median']:>5}  peak {result['peak_kb']:>8}KB"
+              + (f"  failures {result['failures']}" if result["failures"] else ""))
+
+    revision = _git_revision()
+    report = {
+        "meta": {
+            "revision": revision,
+            "created_at": datetime.utcnow().isoformat(timespec="seconds"),
+            "dialect": dialect,
+            "python": platform.python_version(),
+            "scale": scale,
+            "seed": args.seed,
+            "build_seconds": round(build_seconds, 2),
+            "iterations": args.iterations,
+            "cold_caches": args.cold,
+        },
+        "cases": results,
+    }
+
+    output = args.output or os.path.join(ROOT, "benchmarks", "results", f"{revision or 'working'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
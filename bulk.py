@@ -0,0 +1,73 @@
+from sqlalchemy import literal_column, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+
+from database import db, dialect_name
+
+
+# Keeps each statement well under the bind-parameter limits of both drivers
+BATCH_SIZE = 1000
+
+
+def upsert(model, rows, index_elements, update_columns, constraint=None):
+    """
+    Write rows with one INSERT ... ON CONFLICT DO UPDATE per batch.
+
+    Rows sharing the same conflict key are collapsed, keeping the last one,
+    because Postgres refuses to update the same row twice in one statement.
+    Existing rows are only rewritten (and their updated_at bumped) when one
+    of ``update_columns`` actually changes, since callers re-post whole price
+    sheets. Returns (inserted, updated, unchanged, duplicates), where
+    duplicates counts the collapsed rows. Does not commit.
+    """
+    received = len(rows)
+    rows = list({tuple(row[c] for c in index_elements): row for row in rows}.values())
+    duplicates = received - len(rows)
+    if not rows:
+        return 0, 0, 0, duplicates
+
+    dialect = dialect_name()
+    if dialect == 'postgresql':
+        insert = postgresql.insert
+    elif dialect == 'sqlite':
+        insert = sqlite.insert
+    else:
+        raise NotImplementedError(f"Bulk upsert is not supported on {dialect}")
+
+    table = model.__table__
+    inserted = updated = unchanged = 0
+
+    for start in range(0, len(rows), BATCH_SIZE):
+        batch = rows[start:start + BATCH_SIZE]
+
+        stmt = insert(table).values(batch)
+        set_ = {column: stmt.excluded[column] for column in update_columns}
+        if 'updated_at' in table.c:
+            set_['updated_at'] = db.func.now()
+
+        changed = db.or_(*(table.c[column].is_distinct_from(stmt.excluded[column]) for column in update_columns))
+        if dialect == 'postgresql' and constraint:
+            stmt = stmt.on_conflict_do_update(constraint=constraint, set_=set_, where=changed)
+        else:
+            stmt = stmt.on_conflict_do_update(index_elements=index_elements, set_=set_, where=changed)
+
+        if dialect == 'postgresql':
+            # Only inserted and updated rows come back; xmax is 0 only on tuples this statement inserted
+            flags = db.session.execute(
+                stmt.returning(literal_column('(xmax = 0)').label('inserted'))
+            ).scalars().all()
+            batch_inserted = sum(1 for flag in flags if flag)
+            batch_written = len(flags)
+        else:
+            key = tuple_(*(table.c[c] for c in index_elements))
+            existing = db.session.query(db.func.count()).select_from(table).filter(
+                key.in_([tuple(row[c] for c in index_elements) for row in batch])
+            ).scalar()
+            # SQLite counts inserted and updated rows, not the ones the WHERE left alone
+            batch_written = db.session.execute(stmt).rowcount
+            batch_inserted = len(batch) - existing
+
+        inserted += batch_inserted
+        updated += batch_written - batch_inserted
+        unchanged += len(batch) - batch_written
+
+    return inserted, updated, unchanged, duplicates
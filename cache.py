@@ -0,0 +1,74 @@
+import threading
+import time
+
+
+class VersionedCache:
+    """
+    Thread-safe in-process cache shared by every request in a worker.
+
+    Entries live under a namespace that carries a version counter. Writers
+    call invalidate() to bump the version, so anything loaded under an older
+    version is treated as a miss. Entries also expire after ``ttl`` seconds,
+    which bounds how stale another gunicorn worker can be, since workers do
+    not see each other's invalidations.
+    """
+
+    def __init__(self, ttl=300):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._versions = {}
+        self._hits = {}
+        self._misses = {}
+
+    def get(self, namespace, loader, key=None):
+        """Return the cached value for (namespace, key), calling loader() on a miss"""
+        now = time.monotonic()
+        with self._lock:
+            version = self._versions.get(namespace, 0)
+            entry = self._entries.get((namespace, key))
+            if entry and entry[0] == version and now - entry[1] < self.ttl:
+                self._hits[namespace] = self._hits.get(namespace, 0) + 1
+                return entry[2]
+            self._misses[namespace] = self._misses.get(namespace, 0) + 1
+
+        # Load outside the lock so a slow query doesn't block other namespaces
+        value = loader()
+
+        with self._lock:
+            # Don't store a value that was invalidated while it was loading
+            if self._versions.get(namespace, 0) == version:
+                self._entries[(namespace, key)] = (version, now, value)
+        return value
+
+    def invalidate(self, namespace):
+        """Bump the namespace version and drop its entries"""
+        with self._lock:
+            self._versions[namespace] = self._versions.get(namespace, 0) + 1
+            for cache_key in [k for k in self._entries if k[0] == namespace]:
+                del self._entries[cache_key]
+
+    def clear(self):
+        """Invalidate every namespace"""
+        with self._lock:
+            for namespace in {k[0] for k in self._entries} | set(self._versions):
+                self._versions[namespace] = self._versions.get(namespace, 0) + 1
+            self._entries.clear()
+
+    def version(self, namespace):
+        with self._lock:
+            return self._versions.get(namespace, 0)
+
+    def stats(self):
+        """Hit/miss counters and current version for each namespace"""
+        with self._lock:
+            namespaces = set(self._versions) | set(self._hits) | set(self._misses)
+            return {
+                str(namespace): {
+                    'version': self._versions.get(namespace, 0),
+                    'hits': self._hits.get(namespace, 0),
+                    'misses': self._misses.get(namespace, 0),
+                    'entries': sum(1 for k in self._entries if k[0] == namespace)
+                }
+                for namespace in namespaces
+            }
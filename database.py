@@ -1,4 +1,207 @@
+import os
+import threading
+import time
+
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
 
 # Create an instance of SQLAlchemy
-db = SQLAlchemy()
\ No newline at end of file
+db = SQLAlchemy()
+
+# Upper bounds (seconds) of the pool checkout wait histogram
+CHECKOUT_WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+
+def _env_flag(name, default):
+    return os.getenv(name, default).lower() in ('1', 'true', 'yes', 'on')
+
+
+def web_concurrency():
+    """(workers, threads) of the gunicorn deployment, read from the same variables as gunicorn_config.py"""
+    return int(os.getenv("WEB_CONCURRENCY", "2")), int(os.getenv("GUNICORN_THREADS", "4"))
+
+
+class CheckoutStats:
+    """Histogram of how long checkouts waited on the pool, plus timeouts"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.buckets = [0] * len(CHECKOUT_WAIT_BUCKETS)
+        self.count = 0
+        self.total = 0.0
+        self.timeouts = 0
+
+    def observe(self, seconds):
+        with self._lock:
+            self.count += 1
+            self.total += seconds
+            for i, bound in enumerate(CHECKOUT_WAIT_BUCKETS):
+                if seconds <= bound:
+                    self.buckets[i] += 1
+
+    def timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'buckets': list(zip(CHECKOUT_WAIT_BUCKETS, self.buckets)),
+                'count': self.count,
+                'sum': self.total,
+                'timeouts': self.timeouts
+            }
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waits, including opening a new connection"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkout_stats = CheckoutStats()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            self.checkout_stats.timeout()
+            raise
+        finally:
+            self.checkout_stats.observe(time.perf_counter() - start)
+
+
+def pgbouncer_mode():
+    """True when connections go through PgBouncer in transaction pooling mode"""
+    return _env_flag("DB_PGBOUNCER", "false")
+
+
+def statement_timeout_ms():
+    return int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "30000"))
+
+
+def engine_options(database_uri):
+    """
+    SQLALCHEMY_ENGINE_OPTIONS for the configured database.
+
+    Each gunicorn worker is its own process with its own pool, and a request
+    holds one connection per thread, so the pool is sized to the thread count.
+    DB_MAX_CONNECTIONS, when set, caps what all workers may open together.
+    """
+    url = make_url(database_uri)
+    if url.get_backend_name() != 'postgresql':
+        return {}
+
+    workers, threads = web_concurrency()
+    pool_size = int(os.getenv("DB_POOL_SIZE", str(threads)))
+    max_overflow = int(os.getenv("DB_MAX_OVERFLOW", str(max(1, threads // 2))))
+
+    max_connections = os.getenv("DB_MAX_CONNECTIONS")
+    if max_connections:
+        per_worker = max(1, int(max_connections) // workers)
+        pool_size = min(pool_size, per_worker)
+        max_overflow = min(max_overflow, per_worker - pool_size)
+
+    connect_args = {}
+    timeout = statement_timeout_ms()
+    # PgBouncer rejects startup options and hands connections to other clients
+    # between transactions, so in that mode the timeout is set per transaction
+    # instead (configure_engine). psycopg2 never uses server-side prepared
+    # statements, so there is nothing else to turn off.
+    if timeout and not pgbouncer_mode():
+        connect_args['options'] = f"-c statement_timeout={timeout}"
+
+    return {
+        'poolclass': InstrumentedQueuePool,
+        'pool_size': pool_size,
+        'max_overflow': max_overflow,
+        'pool_timeout': float(os.getenv("DB_POOL_TIMEOUT", "10")),
+        'pool_recycle': int(os.getenv("DB_POOL_RECYCLE", "1800")),
+        'pool_pre_ping': _env_flag("DB_POOL_PRE_PING", "true"),
+        'connect_args': connect_args
+    }
+
+
+def configure_engine(engine):
+    """Engine hooks that can't be expressed as create_engine() options"""
+    if engine.dialect.name != 'postgresql' or not pgbouncer_mode():
+        return
+
+    timeout = statement_timeout_ms()
+    if not timeout:
+        return
+
+    @event.listens_for(engine, 'begin')
+    def set_statement_timeout(conn):
+        # SET LOCAL ends with the transaction, so the setting never leaks to the
+        # next PgBouncer client; the raw cursor avoids re-entering begin()
+        cursor = conn.connection.cursor()
+        try:
+            cursor.execute(f"SET LOCAL statement_timeout = {timeout}")
+        finally:
+            cursor.close()
+
+
+def pool_status(engine):
+    """Size, usage and checkout waits of the engine's connection pool"""
+    pool = engine.pool
+    if not isinstance(pool, QueuePool):
+        return None
+
+    size = pool.size()
+    capacity = size + max(pool._max_overflow, 0)
+    checked_out = pool.checkedout()
+    return {
+        'size': size,
+        'max_overflow': pool._max_overflow,
+        'checked_in': pool.checkedin(),
+        'checked_out': checked_out,
+        'overflow': max(pool.overflow(), 0),
+        'saturation': checked_out / capacity if capacity else 0.0,
+        'checkout': pool.checkout_stats.snapshot() if isinstance(pool, InstrumentedQueuePool) else None
+    }
+
+
+def dialect_name():
+    """Name of the dialect bound to the current session, e.g. 'postgresql' or 'sqlite'"""
+    return db.session.get_bind().dialect.name
+
+
+def latest_rows(partition_by, order_by, columns, where=()):
+    """
+    Subquery holding exactly one row per ``partition_by`` value, the first one
+    by ``order_by``. Uses DISTINCT ON on Postgres and ROW_NUMBER() elsewhere,
+    so ties can never produce duplicate rows. ``columns`` must include
+    ``partition_by``; the subquery exposes them under their attribute keys.
+    """
+    if dialect_name() == 'postgresql':
+        return db.session.query(*columns).filter(*where).distinct(
+            partition_by
+        ).order_by(partition_by, *order_by).subquery()
+
+    row_number = db.func.row_number().over(partition_by=partition_by, order_by=order_by).label('row_number')
+    ranked = db.session.query(*columns, row_number).filter(*where).subquery()
+    return db.session.query(
+        *[ranked.c[column.key] for column in columns]
+    ).filter(ranked.c.row_number == 1).subquery()
+
+
+def latest_row_per(outer_key, foreign_key, order_by, columns):
+    """
+    The first row by ``order_by`` of the rows whose ``foreign_key`` equals
+    ``outer_key``, probed once per outer row: a LATERAL subquery with LIMIT 1
+    on Postgres, elsewhere a join on the id picked by a correlated subquery.
+    Both walk an index on (foreign_key, order_by). Returns (selectable,
+    onclause) for an outer join; ``columns`` must include the model's id.
+    """
+    if dialect_name() == 'postgresql':
+        latest = db.select(*columns).where(foreign_key == outer_key).order_by(*order_by).limit(1).lateral()
+        return latest, db.true()
+
+    row_id = next(column for column in columns if column.key == 'id')
+    latest_id = db.select(row_id).where(foreign_key == outer_key).order_by(*order_by).limit(1).scalar_subquery()
+    latest = db.select(*columns).subquery()
+    return latest, latest.c.id == latest_id
@@ -0,0 +1,247 @@
+"""
+Fixed-point arithmetic for estimations and project summaries.
+
+Amounts are Decimals rounded half-up to cents at the same steps the forms
+show them, so a figure computed here matches what is stored in the
+Numeric(12, 2) columns without any float drift. Inputs are plain tuples
+and dicts and nothing here touches the database, so the routes, the
+what-if tools and batch jobs all share the same arithmetic. The browser
+scripts only preview these figures; the server recomputes them on save.
+"""
+
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+ZERO = Decimal("0")
+HUNDRED = Decimal("100")
+CENT = Decimal("0.01")
+# Markups and percentages are stored with four decimal places
+RATE_PLACES = Decimal("0.0001")
+
+# Summary sections that carry a base cost, a markup, a subtotal and a profit
+SUMMARY_CATEGORIES = ("awg", "conduit", "misc", "equipment", "labor", "low_voltage", "permits")
+
+# Entry types of each priced section and the summary category they feed
+WIRE_CATEGORIES = {"AWG": "awg", "Conduit": "conduit"}
+MISC_CATEGORIES = {"Miscellaneous": "misc", "Equipment": "equipment"}
+
+
+def parse_decimal(value):
+    """Decimal from a form value, JSON number or column value; raises ValueError when it isn't one"""
+    if isinstance(value, Decimal):
+        result = value
+    elif isinstance(value, bool) or value is None:
+        raise ValueError(f"Not a number: {value!r}")
+    else:
+        # repr() of a float is its shortest round-tripping form, so 0.1 stays 0.1
+        text = repr(value) if isinstance(value, float) else str(value).strip()
+        try:
+            result = Decimal(text)
+        except InvalidOperation:
+            raise ValueError(f"Not a number: {value!r}")
+    if not result.is_finite():
+        raise ValueError(f"Not a number: {value!r}")
+    return result
+
+
+def to_decimal(value, default=ZERO):
+    """Like parse_decimal, but blank or invalid values become ``default``"""
+    if value is None or value == "":
+        return default
+    try:
+        return parse_decimal(value)
+    except ValueError:
+        return default
+
+
+def money(value):
+    """Round to cents"""
+    return to_decimal(value).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def rate(value, default=ZERO):
+    """Round a markup or percentage to the stored precision"""
+    return to_decimal(value, default).quantize(RATE_PLACES, rounding=ROUND_HALF_UP)
+
+
+def with_tax(amount, tax_percentage):
+    return money(amount + amount * tax_percentage / HUNDRED)
+
+
+def section_totals(entries, categories, tax_percentage):
+    """
+    Totals of a priced estimation section (AWG/conduit or misc/equipment).
+
+    ``entries`` is a sequence of (category, cost, quantity) tuples. Returns the
+    rounded cost, quantity and subtotal of every entry, each category's total
+    and its taxed base cost, and the section subtotal, tax and grand total.
+    """
+    tax_percentage = rate(tax_percentage)
+    totals = {category: ZERO for category in categories}
+    lines = []
+
+    for category, cost, quantity in entries:
+        cost = money(cost)
+        quantity = money(quantity)
+        subtotal = money(cost * quantity)
+        lines.append((cost, quantity, subtotal))
+        if category in totals:
+            totals[category] += subtotal
+
+    subtotal = money(sum(totals.values(), ZERO))
+    tax_amount = money(subtotal * tax_percentage / HUNDRED)
+    return {
+        "lines": lines,
+        "totals": totals,
+        "base_costs": {category: with_tax(total, tax_percentage) for category, total in totals.items()},
+        "tax_percentage": tax_percentage,
+        "subtotal": subtotal,
+        "tax_amount": tax_amount,
+        "grand_total": money(subtotal + tax_amount),
+    }
+
+
+def labor_totals(entries, chargers_count, charger_price):
+    """
+    Totals of a labor estimation. ``entries`` is a sequence of
+    (rate, workers, hours, days) tuples; workers is a whole number.
+    """
+    lines = []
+    labor_total = ZERO
+    for hourly_rate, workers, hours, days in entries:
+        hourly_rate = money(hourly_rate)
+        workers = int(to_decimal(workers))
+        hours = money(hours)
+        days = money(days)
+        subtotal = money(hourly_rate * workers * hours * days)
+        lines.append((hourly_rate, workers, hours, days, subtotal))
+        labor_total += subtotal
+
+    charger_price = money(charger_price)
+    low_voltage_total = money((chargers_count or 0) * charger_price)
+    return {
+        "lines": lines,
+        "labor_total": labor_total,
+        "charger_price": charger_price,
+        "low_voltage_total": low_voltage_total,
+        "grand_total": money(labor_total + low_voltage_total),
+    }
+
+
+def summary_totals(base_costs, markups, tax_percentage, overhead_percentage, chargers_count, total_submitted):
+    """
+    Every derived field of a project summary, keyed by its column name.
+
+    ``base_costs`` and ``markups`` map each of SUMMARY_CATEGORIES to its value;
+    a missing base cost counts as zero and a missing markup as 1. Markups and
+    percentages come back rounded to their stored four places.
+    """
+    result = {}
+    taxable_profit = ZERO
+    grand_subtotal = ZERO
+
+    for category in SUMMARY_CATEGORIES:
+        base_cost = money(base_costs.get(category))
+        markup = rate(markups.get(category), Decimal(1))
+        subtotal = money(base_cost * markup)
+        profit = money(subtotal - base_cost)
+        result[f"{category}_markup"] = markup
+        result[f"{category}_subtotal"] = subtotal
+        result[f"{category}_profit"] = profit
+        taxable_profit += profit
+        grand_subtotal += subtotal
+
+    taxable_profit = money(taxable_profit)
+    grand_subtotal = money(grand_subtotal)
+    tax_percentage = rate(tax_percentage)
+    overhead_percentage = rate(overhead_percentage)
+    tax_subtotal = money(taxable_profit * tax_percentage / HUNDRED)
+    overhead_subtotal = money(grand_subtotal * overhead_percentage / HUNDRED)
+    grand_total = money(grand_subtotal + tax_subtotal + overhead_subtotal)
+
+    result.update({
+        "tax_base_cost": taxable_profit,
+        "tax_percentage": tax_percentage,
+        "tax_subtotal": tax_subtotal,
+        "grand_subtotal": grand_subtotal,
+        "overhead_base_cost": grand_subtotal,
+        "overhead_percentage": overhead_percentage,
+        "overhead_subtotal": overhead_subtotal,
+        "grand_total": grand_total,
+    })
+
+    chargers_count = chargers_count or 0
+    # Per-charger prices leave out low voltage, which is priced per charger already
+    if chargers_count > 0:
+        result["price_per_charger"] = money(money(grand_total - result["low_voltage_subtotal"]) / chargers_count)
+    else:
+        result["price_per_charger"] = money(0)
+
+    total_submitted = money(total_submitted)
+    low_voltage_base_cost = money(base_costs.get("low_voltage"))
+    if total_submitted and chargers_count > 0:
+        if low_voltage_base_cost == 0:
+            result["price_per_charger_submitted"] = money(total_submitted / chargers_count)
+        else:
+            result["price_per_charger_submitted"] = money(money(total_submitted - low_voltage_base_cost) / chargers_count)
+    else:
+        result["price_per_charger_submitted"] = money(0)
+
+    return result
+
+
+def project_totals(inputs):
+    """
+    Every derived figure of one project in a single pass.
+
+    ``inputs`` holds plain values only:
+
+        {
+            "wire": {"entries": [(type, cost, length), ...], "tax_percentage": ...},
+            "misc": {"entries": [(type, cost, quantity), ...], "tax_percentage": ...},
+            "labor": {"entries": [(rate, workers, hours, days), ...],
+                      "chargers_count": ..., "charger_price": ...},
+            "summary": {"markups": {category: ...}, "base_costs": {category: ...},
+                        "tax_percentage": ..., "overhead_percentage": ..., "total_submitted": ...},
+        }
+
+    Any section may be missing or None. Base costs derived from a present
+    section win over ``summary["base_costs"]``, which supplies the rest
+    (always permits, and stored values for missing sections).
+    """
+    summary = inputs.get("summary") or {}
+    base_costs = dict(summary.get("base_costs") or {})
+    result = {}
+
+    for section, categories in (("wire", WIRE_CATEGORIES), ("misc", MISC_CATEGORIES)):
+        data = inputs.get(section)
+        if data is None:
+            continue
+        totals = section_totals(data.get("entries", ()), categories, data.get("tax_percentage"))
+        for entry_type, category in categories.items():
+            base_costs[category] = totals["base_costs"][entry_type]
+        result[section] = totals
+
+    labor = inputs.get("labor")
+    chargers_count = summary.get("chargers_count")
+    if labor is not None:
+        chargers_count = labor.get("chargers_count")
+        totals = labor_totals(labor.get("entries", ()), chargers_count, labor.get("charger_price"))
+        base_costs["labor"] = totals["labor_total"]
+        base_costs["low_voltage"] = totals["low_voltage_total"]
+        result["labor"] = totals
+
+    result["base_costs"] = {category: money(base_costs.get(category)) for category in SUMMARY_CATEGORIES}
+    result["summary"] = summary_totals(
+        base_costs,
+        summary.get("markups") or {},
+        summary.get("tax_percentage"),
+        summary.get("overhead_percentage"),
+        chargers_count,
+        summary.get("total_submitted"),
+    )
+    return result
+
+
+def portfolio_totals(projects):
+    """project_totals for many projects at once, e.g. {project_id: inputs} -> {project_id: totals}"""
+    return {key: project_totals(inputs) for key, inputs in projects.items()}
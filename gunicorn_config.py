@@ -1,5 +1,81 @@
+import gc
 import os
 
-workers = 2
-threads = 4
-bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
\ No newline at end of file
+# Worker model, picked with GUNICORN_WORKER_CLASS:
+#   gthread (default) - a few processes with a thread pool each; good for the
+#                       mix of templates and database-bound JSON endpoints
+#   gevent            - one process per core with many greenlets; for I/O-bound
+#                       JSON traffic, needs gevent and psycogreen installed
+#   sync              - one request per process, the gunicorn default
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+
+
+def _cpu_count():
+    # Respect CPU affinity / container limits where the platform exposes them
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+cpus = _cpu_count()
+
+if worker_class == 'gevent':
+    default_workers = cpus
+    default_threads = 1
+elif worker_class == 'sync':
+    default_workers = 2 * cpus + 1
+    default_threads = 1
+else:
+    default_workers = max(2, cpus)
+    default_threads = 4
+
+workers = int(os.getenv('WEB_CONCURRENCY', str(default_workers)))
+threads = int(os.getenv('GUNICORN_THREADS', str(default_threads)))
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', '100'))
+
+# database.engine_options() sizes each worker's pool from these two variables;
+# exporting them lets the app, loaded after this file, see the derived values.
+# A gevent worker runs many greenlets but the pool still caps how many reach
+# the database at once (DB_POOL_SIZE, default 4); the rest queue on checkout.
+os.environ['WEB_CONCURRENCY'] = str(workers)
+os.environ['GUNICORN_THREADS'] = str(threads if worker_class != 'gevent' else int(os.getenv('DB_POOL_SIZE', '4')))
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '30'))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', '30'))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', '5'))
+
+# Recycle workers periodically so slow leaks can't accumulate; the jitter keeps
+# them from all restarting at the same moment
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', '1000'))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', str(max_requests // 10)))
+
+# Import the app and models once in the master and fork workers from it. gevent
+# has to monkey-patch before the app is imported, so it doesn't preload by default.
+preload_app = os.getenv('GUNICORN_PRELOAD', 'false' if worker_class == 'gevent' else 'true').lower() in ('1', 'true', 'yes', 'on')
+
+
+def when_ready(server):
+    if preload_app:
+        # Move everything the preloaded app allocated out of the collector's
+        # reach, so gc passes in the workers don't touch (and copy) shared pages
+        gc.freeze()
+    server.log.info("Workers: %s x %s (%s), preload_app=%s", workers, threads, worker_class, preload_app)
+
+
+def post_fork(server, worker):
+    if preload_app:
+        # Connections opened by the master must not be shared with the workers
+        from app import app
+        from database import db
+        with app.app_context():
+            db.engine.dispose(close=False)
+
+    if worker_class == 'gevent':
+        try:
+            from psycogreen.gevent import patch_psycopg
+        except ImportError:
+            server.log.warning("psycogreen is not installed; database calls will block the gevent loop")
+        else:
+            patch_psycopg()
@@ -0,0 +1,36 @@
+"""trigram search indexes on project address and company
+
+Revision ID: 5c1f7d2e9a41
+Revises: a080d59e9bd2
+Create Date: 2026-10-18 10:40:12.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5c1f7d2e9a41'
+down_revision = 'a080d59e9bd2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # pg_trgm only exists on Postgres; other engines search with the in-memory n-gram index
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.create_index('ix_projects_address_trgm', 'projects', ['address'], unique=False,
+                    postgresql_using='gin', postgresql_ops={'address': 'gin_trgm_ops'})
+    op.create_index('ix_projects_company_trgm', 'projects', ['company'], unique=False,
+                    postgresql_using='gin', postgresql_ops={'company': 'gin_trgm_ops'})
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.drop_index('ix_projects_company_trgm', table_name='projects', postgresql_using='gin')
+    op.drop_index('ix_projects_address_trgm', table_name='projects', postgresql_using='gin')
@@ -0,0 +1,89 @@
+"""store money as numeric(12,2) and markups/percentages as numeric(8,4)
+
+Revision ID: b7e4a91c3d52
+Revises: 5c1f7d2e9a41
+Create Date: 2026-10-18 11:05:47.310582
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e4a91c3d52'
+down_revision = '5c1f7d2e9a41'
+branch_labels = None
+depends_on = None
+
+
+SUMMARY_CATEGORIES = ['awg', 'conduit', 'misc', 'equipment', 'labor', 'low_voltage', 'permits']
+
+# Amounts, converted to numeric(12, 2)
+MONEY = {
+    'cost_estimations': ['tax_amount', 'grand_total', 'awg_total', 'conduit_total'],
+    'estimation_entries': ['cost', 'subtotal'],
+    'misc_equipment_estimations': ['tax_amount', 'grand_total', 'misc_total', 'equipment_total'],
+    'misc_equipment_entries': ['cost', 'subtotal'],
+    'labor_cost_estimations': ['charger_price', 'labor_total', 'low_voltage_total', 'grand_total'],
+    'labor_cost_entries': ['rate', 'subtotal'],
+    'project_summaries': [
+        f'{category}_{field}' for category in SUMMARY_CATEGORIES for field in ('base_cost', 'subtotal', 'profit')
+    ] + [
+        'tax_base_cost', 'tax_subtotal', 'overhead_base_cost', 'overhead_subtotal', 'grand_subtotal', 'grand_total',
+        'price_per_charger', 'price_per_charger_submitted', 'total_submitted', 'approved_amount'
+    ],
+    'wire_prices': ['price_per_foot'],
+    'conduit_prices': ['price_per_foot'],
+    'construction_prices': ['price'],
+    'union_wage_rates': ['base_rate'],
+}
+
+# Markups and percentages, converted to numeric(8, 4)
+RATES = {
+    'cost_estimations': ['tax_percentage'],
+    'misc_equipment_estimations': ['tax_percentage'],
+    'project_summaries': [f'{category}_markup' for category in SUMMARY_CATEGORIES] + ['tax_percentage', 'overhead_percentage'],
+}
+
+
+def _columns():
+    """(table, [(column, precision, scale)]) for every converted column"""
+    tables = {}
+    for table, columns in MONEY.items():
+        tables.setdefault(table, []).extend((column, 12, 2) for column in columns)
+    for table, columns in RATES.items():
+        tables.setdefault(table, []).extend((column, 8, 4) for column in columns)
+    return tables.items()
+
+
+def upgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        # One ALTER TABLE per table, so each table is rewritten once rather than once per column
+        for table, columns in _columns():
+            clauses = ', '.join(
+                f'ALTER COLUMN {column} TYPE numeric({precision}, {scale}) USING round({column}::numeric, {scale})'
+                for column, precision, scale in columns
+            )
+            op.execute(f'ALTER TABLE {table} {clauses}')
+        return
+
+    for table, columns in _columns():
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            for column, precision, scale in columns:
+                batch_op.alter_column(column, existing_type=sa.Float(), type_=sa.Numeric(precision, scale))
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        for table, columns in _columns():
+            clauses = ', '.join(
+                f'ALTER COLUMN {column} TYPE double precision USING {column}::double precision'
+                for column, _, _ in columns
+            )
+            op.execute(f'ALTER TABLE {table} {clauses}')
+        return
+
+    for table, columns in _columns():
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            for column, precision, scale in columns:
+                batch_op.alter_column(column, existing_type=sa.Numeric(precision, scale), type_=sa.Float())
@@ -0,0 +1,120 @@
+"""per-user, per-year portfolio rollup table
+
+Revision ID: c3d8f15a6e27
+Revises: b7e4a91c3d52
+Create Date: 2026-10-18 11:42:09.530117
+
+"""
+from decimal import Decimal
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3d8f15a6e27'
+down_revision = 'b7e4a91c3d52'
+branch_labels = None
+depends_on = None
+
+
+projects = sa.table(
+    'projects',
+    sa.column('id', sa.Integer), sa.column('user_id', sa.Integer), sa.column('start_date', sa.Date),
+)
+summaries = sa.table(
+    'project_summaries',
+    sa.column('id', sa.Integer), sa.column('project_id', sa.Integer), sa.column('approved', sa.Boolean),
+    sa.column('grand_total', sa.Numeric(12, 2)), sa.column('total_submitted', sa.Numeric(12, 2)),
+    sa.column('approved_amount', sa.Numeric(12, 2)), sa.column('price_per_charger', sa.Numeric(12, 2)),
+    sa.column('created_at', sa.TIMESTAMP),
+)
+labor = sa.table(
+    'labor_cost_estimations',
+    sa.column('id', sa.Integer), sa.column('project_id', sa.Integer), sa.column('chargers_count', sa.Integer),
+    sa.column('created_at', sa.TIMESTAMP),
+)
+
+
+def _money(value):
+    return Decimal(value or 0).quantize(Decimal('0.01'))
+
+
+def _is_latest(table):
+    """Matches the newest row of ``table`` for the outer project, by (created_at, id)"""
+    newest = table.alias()
+    return table.c.id == sa.select(newest.c.id).where(newest.c.project_id == projects.c.id).order_by(
+        newest.c.created_at.desc(), newest.c.id.desc()
+    ).limit(1).correlate(projects).scalar_subquery()
+
+
+def _backfill(rollups):
+    """Same aggregates as analytics.compute_rollups, written with Core so the migration doesn't import the app"""
+    bind = op.get_bind()
+    year = sa.extract('year', projects.c.start_date)
+    counted_price = sa.and_(summaries.c.price_per_charger.isnot(None), summaries.c.price_per_charger > 0)
+
+    rows = []
+    for (user_id, row_year, projects_count, summaries_count, approved, rejected, grand_total, submitted,
+         approved_amount, price_total, price_count, chargers) in bind.execute(
+        sa.select(
+            projects.c.user_id, year,
+            sa.func.count(projects.c.id),
+            sa.func.count(summaries.c.id),
+            sa.func.sum(sa.case((summaries.c.approved.is_(True), 1), else_=0)),
+            sa.func.sum(sa.case((summaries.c.approved.is_(False), 1), else_=0)),
+            sa.func.sum(summaries.c.grand_total),
+            sa.func.sum(summaries.c.total_submitted),
+            sa.func.sum(summaries.c.approved_amount),
+            sa.func.sum(sa.case((counted_price, summaries.c.price_per_charger), else_=0)),
+            sa.func.sum(sa.case((counted_price, 1), else_=0)),
+            sa.func.sum(labor.c.chargers_count),
+        )
+        .select_from(projects.outerjoin(summaries, _is_latest(summaries)).outerjoin(labor, _is_latest(labor)))
+        .group_by(projects.c.user_id, year)
+    ):
+        rows.append({
+            'user_id': user_id,
+            'year': int(row_year),
+            'projects_count': projects_count,
+            'summaries_count': summaries_count,
+            'approved_count': approved or 0,
+            'rejected_count': rejected or 0,
+            'chargers_count': int(chargers or 0),
+            'grand_total': _money(grand_total),
+            'total_submitted': _money(submitted),
+            'approved_amount': _money(approved_amount),
+            'price_per_charger_total': _money(price_total),
+            'price_per_charger_count': price_count or 0,
+        })
+
+    if rows:
+        op.bulk_insert(rollups, rows)
+
+
+def upgrade():
+    rollups = op.create_table(
+        'portfolio_rollups',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('year', sa.Integer(), nullable=False),
+        sa.Column('projects_count', sa.Integer(), nullable=False),
+        sa.Column('summaries_count', sa.Integer(), nullable=False),
+        sa.Column('approved_count', sa.Integer(), nullable=False),
+        sa.Column('rejected_count', sa.Integer(), nullable=False),
+        sa.Column('chargers_count', sa.Integer(), nullable=False),
+        sa.Column('grand_total', sa.Numeric(precision=14, scale=2), nullable=False),
+        sa.Column('total_submitted', sa.Numeric(precision=14, scale=2), nullable=False),
+        sa.Column('approved_amount', sa.Numeric(precision=14, scale=2), nullable=False),
+        sa.Column('price_per_charger_total', sa.Numeric(precision=14, scale=2), nullable=False),
+        sa.Column('price_per_charger_count', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.TIMESTAMP(), server_default=sa.func.now(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id', 'year', name='uq_portfolio_rollups_user_year')
+    )
+    _backfill(rollups)
+
+
+def downgrade():
+    op.drop_table('portfolio_rollups')
@@ -0,0 +1,63 @@
+"""indexes for hot foreign keys and latest-row lookups
+
+Revision ID: d9a2c64b7f18
+Revises: c3d8f15a6e27
+Create Date: 2026-10-18 12:20:37.904416
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd9a2c64b7f18'
+down_revision = 'c3d8f15a6e27'
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    ('ix_misc_equipment_entries_misc_equipment_estimation_id', 'misc_equipment_entries', ['misc_equipment_estimation_id']),
+    ('ix_labor_cost_entries_labor_cost_estimation_id', 'labor_cost_entries', ['labor_cost_estimation_id']),
+    ('ix_union_positions_union_id', 'union_positions', ['union_id']),
+    ('ix_construction_prices_material_id_created_at', 'construction_prices', ['material_id', 'created_at']),
+    ('ix_union_wage_rates_position_id_effective_date', 'union_wage_rates', ['position_id', 'effective_date']),
+    ('ix_cost_estimations_project_id_created_at', 'cost_estimations', ['project_id', 'created_at']),
+    ('ix_misc_equipment_estimations_project_id_created_at', 'misc_equipment_estimations', ['project_id', 'created_at']),
+    ('ix_labor_cost_estimations_project_id_created_at', 'labor_cost_estimations', ['project_id', 'created_at']),
+    ('ix_project_summaries_project_id_created_at', 'project_summaries', ['project_id', 'created_at']),
+]
+
+
+def _drop_invalid(name):
+    """An interrupted CREATE INDEX CONCURRENTLY leaves an invalid index behind that IF NOT EXISTS would keep"""
+    invalid = op.get_bind().execute(sa.text(
+        "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+        "WHERE c.relname = :name AND NOT i.indisvalid"
+    ), {'name': name}).first()
+    if invalid:
+        op.drop_index(name, postgresql_concurrently=True)
+
+
+def upgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, unique=False)
+        return
+
+    # CONCURRENTLY builds without blocking writes but can't run inside a transaction
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            _drop_invalid(name)
+            op.create_index(name, table, columns, unique=False, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        for name, table, columns in reversed(INDEXES):
+            op.drop_index(name, table_name=table)
+        return
+
+    with op.get_context().autocommit_block():
+        for name, table, columns in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,47 @@
+"""(user_id, start_date) index for the projects listing's year filter
+
+Revision ID: e4b8d07a2c95
+Revises: d9a2c64b7f18
+Create Date: 2026-10-18 12:58:14.226930
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e4b8d07a2c95'
+down_revision = 'd9a2c64b7f18'
+branch_labels = None
+depends_on = None
+
+
+def _drop_invalid(name):
+    """Drop an invalid index left by an interrupted concurrent build, which IF NOT EXISTS would otherwise skip"""
+    invalid = op.get_bind().execute(sa.text(
+        "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+        "WHERE c.relname = :name AND NOT i.indisvalid"
+    ), {'name': name}).first()
+    if invalid:
+        op.drop_index(name, postgresql_concurrently=True)
+
+
+def upgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        op.create_index('ix_projects_user_id_start_date', 'projects', ['user_id', 'start_date'], unique=False)
+        return
+
+    # Same online build as the hot path indexes: CONCURRENTLY needs to run outside a transaction
+    with op.get_context().autocommit_block():
+        _drop_invalid('ix_projects_user_id_start_date')
+        op.create_index('ix_projects_user_id_start_date', 'projects', ['user_id', 'start_date'], unique=False,
+                        postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        op.drop_index('ix_projects_user_id_start_date', table_name='projects')
+        return
+
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_projects_user_id_start_date', table_name='projects', postgresql_concurrently=True, if_exists=True)
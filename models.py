@@ -1,5 +1,4 @@
 from database import db
-from sqlalchemy.sql.expression import text
 from sqlalchemy.sql.sqltypes import TIMESTAMP
 
 
@@ -10,7 +9,7 @@ class User(db.Model):
     email = db.Column(db.String(32), unique=True, nullable=False)
     username = db.Column(db.String(32), nullable=False)
     password = db.Column(db.String(255), nullable=False)
-    created_at = db.Column(TIMESTAMP, nullable=False, server_default=text('now()'))
+    created_at = db.Column(TIMESTAMP, nullable=False, server_default=db.func.now())
 
     # One-to-many relationship: One User -> Many Projects
     projects = db.relationship('Project', backref='user', lazy='dynamic')
@@ -25,7 +24,7 @@ class Project(db.Model):
     start_date = db.Column(db.Date, nullable=False)
     p_type = db.Column(db.String(64))
     status = db.Column(db.String(32), nullable=False, default="started")  # Track the status
-    created_at = db.Column(TIMESTAMP, nullable=False, server_default=text('now()'))
+    created_at = db.Column(TIMESTAMP, nullable=False, server_default=db.func.now())
 
     # Relationships
     cost_estimations = db.relationship('CostEstimation', backref='project', lazy='dynamic')
@@ -36,23 +35,36 @@ class Project(db.Model):
     # Foreign key to User
     user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete="CASCADE"), nullable=False, index=True)
 
+    # Trigram indexes serving the dashboard search (Postgres pg_trgm)
+    __table_args__ = (
+        db.Index('ix_projects_address_trgm', 'address', postgresql_using='gin', postgresql_ops={'address': 'gin_trgm_ops'}),
+        db.Index('ix_projects_company_trgm', 'company', postgresql_using='gin', postgresql_ops={'company': 'gin_trgm_ops'}),
+        # The listing's year filter is a start_date range within one user's projects
+        db.Index('ix_projects_user_id_start_date', 'user_id', 'start_date'),
+    )
+
 
 class CostEstimation(db.Model):
     __tablename__ = "cost_estimations"
 
     id = db.Column(db.Integer, primary_key=True)
-    tax_percentage = db.Column(db.Float)
-    tax_amount = db.Column(db.Float)
-    grand_total = db.Column(db.Float)
-    awg_total = db.Column(db.Float)  # New field for AWG total
-    conduit_total = db.Column(db.Float)  # New field for Conduit total
-    created_at = db.Column(TIMESTAMP, nullable=False, server_default=text('now()'))
+    tax_percentage = db.Column(db.Numeric(8, 4))
+    tax_amount = db.Column(db.Numeric(12, 2))
+    grand_total = db.Column(db.Numeric(12, 2))
+    awg_total = db.Column(db.Numeric(12, 2))  # New field for AWG total
+    conduit_total = db.Column(db.Numeric(12, 2))  # New field for Conduit total
+    created_at = db.Column(TIMESTAMP, nullable=False, server_default=db.func.now())
 
     # Foreign key to Project
     project_id = db.Column(db.Integer, db.ForeignKey('projects.id', ondelete="CASCADE"), nullable=False, index=True)
     # One-to-many: One CostEstimation -> Many EstimationEntries
     entries = db.relationship("EstimationEntry", backref="cost_estimation", cascade="all, delete-orphan")
 
+    # Serves the newest-estimation-per-project lookups
+    __table_args__ = (
+        db.Index('ix_cost_estimations_project_id_created_at', 'project_id', 'created_at'),
+    )
+
 
 class EstimationEntry(db.Model):
     __tablename__ = "estimation_entries"
@@ -60,12 +72,12 @@ class EstimationEntry(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     type = db.Column(db.String(50))  # "AWG" or "Conduit"
     name = db.Column(db.String(50))  # e.g., "AWG 10", "1/2 Conduit"
-    cost = db.Column(db.Float, default=0.0)
+    cost = db.Column(db.Numeric(12, 2), default=0.0)
     length = db.Column(db.Float, default=0.0)
-    subtotal = db.Column(db.Float, default=0.0)
+    subtotal = db.Column(db.Numeric(12, 2), default=0.0)
     notes_awg = db.Column(db.String(300))
     notes_conduit = db.Column(db.String(300))
-    created_at = db.Column(TIMESTAMP, nullable=False, server_default=text('now()'))
+    created_at = db.Column(TIMESTAMP, nullable=False, server_default=db.func.now())
 
     cost_estimation_id = db.Column(db.Integer, db.ForeignKey("cost_estimations.id", ondelete="CASCADE"), nullable=False, index=True)
 
@@ -77,18 +89,23 @@ class MiscEquipmentEstimation(db.Model):
     __tablename__ = "misc_equipment_estimations"
 
     id = db.Column(db.Integer, primary_key=True)
-    tax_percentage = db.Column(db.Float)
-    tax_amount = db.Column(db.Float)
-    grand_total = db.Column(db.Float)
-    misc_total = db.Column(db.Float)  # New field for Miscellaneous total
-    equipment_total = db.Column(db.Float)  # New field for Equipment total
-    created_at = db.Column(TIMESTAMP, nullable=False, server_default=text('now()'))
+    tax_percentage = db.Column(db.Numeric(8, 4))
+    tax_amount = db.Column(db.Numeric(12, 2))
+    grand_total = db.Column(db.Numeric(12, 2))
+    misc_total = db.Column(db.Numeric(12, 2))  # New field for Miscellaneous total
+    equipment_total = db.Column(db.Numeric(12, 2))  # New field for Equipment total
+    created_at = db.Column(TIMESTAMP, nullable=False, server_default=db.func.now())
     
     # Foreign key to Project
     project_id = db.Column(db.Integer, db.ForeignKey('projects.id', ondelete="CASCADE"), nullable=False, index=True)
     # Relationship to store miscellaneous and equipment entries
     entries = db.relationship("MiscEquipmentEntry", backref="misc_equipment_estimation", cascade="all, delete-orphan")
 
+    # Serves the newest-estimation-per-project lookups
+    __table_args__ = (
+        db.Index('ix_misc_equipment_estimations_project_id_created_at', 'project_id', 'created_at'),
+    )
+
 
 class MiscEquipmentEntry(db.Model):
     __tablename__ = "misc_equipment_entries"
@@ -96,14 +113,14 @@ class MiscEquipmentEntry(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     type = db.Column(db.String(50))  # "Miscellaneous" or "Equipment"
     name = db.Column(db.String(50))  # e.g., "Bollards", "Switch Board"
-    cost = db.Column(db.Float)
+    cost = db.Column(db.Numeric(12, 2))
     quantity = db.Column(db.Float)
-    subtotal = db.Column(db.Float)
+    subtotal = db.Column(db.Numeric(12, 2))
     notes_misc = db.Column(db.String(300))
     notes_equip = db.Column(db.String(300))
-    created_at = db.Column(TIMESTAMP, nullable=False, server_default=text('now()'))
+    created_at = db.Column(TIMESTAMP, nullable=False, server_default=db.func.now())
 
-    misc_equipment_estimation_id = db.Column(db.Integer, db.ForeignKey("misc_equipment_estimations.id", ondelete="CASCADE"), nullable=False)
+    misc_equipment_estimation_id = db.Column(db.Integer, db.ForeignKey("misc_equipment_estimations.id", ondelete="CASCADE"), nullable=False, index=True)
 
     def __repr__(self):
         return f"<MiscEquipmentEntry {self.id}>"
@@ -114,32 +131,37 @@ class LaborCostEstimation(db.Model):
 
     id = db.Column(db.Integer, primary_key=True)
     chargers_count = db.Column(db.Integer)
-    charger_price = db.Column(db.Float)
-    labor_total = db.Column(db.Float)  # New field for Labor total
-    low_voltage_total = db.Column(db.Float)  # New field for Low Voltage total
-    grand_total = db.Column(db.Float)
-    created_at = db.Column(TIMESTAMP, nullable=False, server_default=text('now()'))
+    charger_price = db.Column(db.Numeric(12, 2))
+    labor_total = db.Column(db.Numeric(12, 2))  # New field for Labor total
+    low_voltage_total = db.Column(db.Numeric(12, 2))  # New field for Low Voltage total
+    grand_total = db.Column(db.Numeric(12, 2))
+    created_at = db.Column(TIMESTAMP, nullable=False, server_default=db.func.now())
     
     # Foreign key to Project
     project_id = db.Column(db.Integer, db.ForeignKey('projects.id', ondelete="CASCADE"), nullable=False, index=True)
     # Relationship to store labor entries
     entries = db.relationship("LaborCostEntry", backref="labor_cost_estimation", cascade="all, delete-orphan")
 
+    # Serves the newest-estimation-per-project lookups
+    __table_args__ = (
+        db.Index('ix_labor_cost_estimations_project_id_created_at', 'project_id', 'created_at'),
+    )
+
 
 class LaborCostEntry(db.Model):
     __tablename__ = "labor_cost_entries"
 
     id = db.Column(db.Integer, primary_key=True)
     position = db.Column(db.String(50))  # e.g., "Project Manager", "Journeyman Wireman"
-    rate = db.Column(db.Float)          # Hourly rate
+    rate = db.Column(db.Numeric(12, 2))          # Hourly rate
     workers = db.Column(db.Integer)     # Number of workers
     hours = db.Column(db.Float)         # Hours per day
     days = db.Column(db.Float)          # Number of working days
-    subtotal = db.Column(db.Float)      # Calculated subtotal
+    subtotal = db.Column(db.Numeric(12, 2))      # Calculated subtotal
     notes = db.Column(db.String(300))   # Optional notes
-    created_at = db.Column(TIMESTAMP, nullable=False, server_default=text('now()'))
+    created_at = db.Column(TIMESTAMP, nullable=False, server_default=db.func.now())
 
-    labor_cost_estimation_id = db.Column(db.Integer, db.ForeignKey("labor_cost_estimations.id", ondelete="CASCADE"), nullable=False)
+    labor_cost_estimation_id = db.Column(db.Integer, db.ForeignKey("labor_cost_estimations.id", ondelete="CASCADE"), nullable=False, index=True)
 
     def __repr__(self):
         return f"<LaborCostEntry {self.id}>"
@@ -150,90 +172,95 @@ class ProjectSummary(db.Model):
 
     id = db.Column(db.Integer, primary_key=True)
     # AWG Fields
-    awg_base_cost = db.Column(db.Float, default=0.0)
-    awg_markup = db.Column(db.Float, default=1.0)
-    awg_subtotal = db.Column(db.Float, default=0.0)
-    awg_profit = db.Column(db.Float, default=0.0)
+    awg_base_cost = db.Column(db.Numeric(12, 2), default=0.0)
+    awg_markup = db.Column(db.Numeric(8, 4), default=1.0)
+    awg_subtotal = db.Column(db.Numeric(12, 2), default=0.0)
+    awg_profit = db.Column(db.Numeric(12, 2), default=0.0)
     
     # Conduit Fields
-    conduit_base_cost = db.Column(db.Float, default=0.0)
-    conduit_markup = db.Column(db.Float, default=1.0)
-    conduit_subtotal = db.Column(db.Float, default=0.0)
-    conduit_profit = db.Column(db.Float, default=0.0)
+    conduit_base_cost = db.Column(db.Numeric(12, 2), default=0.0)
+    conduit_markup = db.Column(db.Numeric(8, 4), default=1.0)
+    conduit_subtotal = db.Column(db.Numeric(12, 2), default=0.0)
+    conduit_profit = db.Column(db.Numeric(12, 2), default=0.0)
     
     # Miscellaneous Fields
-    misc_base_cost = db.Column(db.Float, default=0.0)
-    misc_markup = db.Column(db.Float, default=1.0)
-    misc_subtotal = db.Column(db.Float, default=0.0)
-    misc_profit = db.Column(db.Float, default=0.0)
+    misc_base_cost = db.Column(db.Numeric(12, 2), default=0.0)
+    misc_markup = db.Column(db.Numeric(8, 4), default=1.0)
+    misc_subtotal = db.Column(db.Numeric(12, 2), default=0.0)
+    misc_profit = db.Column(db.Numeric(12, 2), default=0.0)
     
     # Equipment Fields
-    equipment_base_cost = db.Column(db.Float, default=0.0)
-    equipment_markup = db.Column(db.Float, default=1.0)
-    equipment_subtotal = db.Column(db.Float, default=0.0)
-    equipment_profit = db.Column(db.Float, default=0.0)
+    equipment_base_cost = db.Column(db.Numeric(12, 2), default=0.0)
+    equipment_markup = db.Column(db.Numeric(8, 4), default=1.0)
+    equipment_subtotal = db.Column(db.Numeric(12, 2), default=0.0)
+    equipment_profit = db.Column(db.Numeric(12, 2), default=0.0)
     
     # Labor Fields
-    labor_base_cost = db.Column(db.Float, default=0.0)
-    labor_markup = db.Column(db.Float, default=1.0)
-    labor_subtotal = db.Column(db.Float, default=0.0)
-    labor_profit = db.Column(db.Float, default=0.0)
+    labor_base_cost = db.Column(db.Numeric(12, 2), default=0.0)
+    labor_markup = db.Column(db.Numeric(8, 4), default=1.0)
+    labor_subtotal = db.Column(db.Numeric(12, 2), default=0.0)
+    labor_profit = db.Column(db.Numeric(12, 2), default=0.0)
     
     # Low Voltage Fields
-    low_voltage_base_cost = db.Column(db.Float, default=0.0)
-    low_voltage_markup = db.Column(db.Float, default=1.0)
-    low_voltage_subtotal = db.Column(db.Float, default=0.0)
-    low_voltage_profit = db.Column(db.Float, default=0.0)
+    low_voltage_base_cost = db.Column(db.Numeric(12, 2), default=0.0)
+    low_voltage_markup = db.Column(db.Numeric(8, 4), default=1.0)
+    low_voltage_subtotal = db.Column(db.Numeric(12, 2), default=0.0)
+    low_voltage_profit = db.Column(db.Numeric(12, 2), default=0.0)
     
     # Permits Fields
-    permits_base_cost = db.Column(db.Float, default=0.0)
-    permits_markup = db.Column(db.Float, default=1.0)
-    permits_subtotal = db.Column(db.Float, default=0.0)
-    permits_profit = db.Column(db.Float, default=0.0)
+    permits_base_cost = db.Column(db.Numeric(12, 2), default=0.0)
+    permits_markup = db.Column(db.Numeric(8, 4), default=1.0)
+    permits_subtotal = db.Column(db.Numeric(12, 2), default=0.0)
+    permits_profit = db.Column(db.Numeric(12, 2), default=0.0)
     
     # Income Tax Fields
-    tax_base_cost = db.Column(db.Float, default=0.0)
-    tax_percentage = db.Column(db.Float, default=0.0)
-    tax_subtotal = db.Column(db.Float, default=0.0)
+    tax_base_cost = db.Column(db.Numeric(12, 2), default=0.0)
+    tax_percentage = db.Column(db.Numeric(8, 4), default=0.0)
+    tax_subtotal = db.Column(db.Numeric(12, 2), default=0.0)
     
     # Overhead Fields
-    overhead_base_cost = db.Column(db.Float, default=0.0)
-    overhead_percentage = db.Column(db.Float, default=0.0)
-    overhead_subtotal = db.Column(db.Float, default=0.0)
+    overhead_base_cost = db.Column(db.Numeric(12, 2), default=0.0)
+    overhead_percentage = db.Column(db.Numeric(8, 4), default=0.0)
+    overhead_subtotal = db.Column(db.Numeric(12, 2), default=0.0)
     
     # Totals
-    grand_subtotal = db.Column(db.Float, default=0.0)
-    grand_total = db.Column(db.Float, default=0.0)
+    grand_subtotal = db.Column(db.Numeric(12, 2), default=0.0)
+    grand_total = db.Column(db.Numeric(12, 2), default=0.0)
     
     # Charger Information
-    price_per_charger = db.Column(db.Float, default=0.0)
-    price_per_charger_submitted = db.Column(db.Float, default=0.0)
+    price_per_charger = db.Column(db.Numeric(12, 2), default=0.0)
+    price_per_charger_submitted = db.Column(db.Numeric(12, 2), default=0.0)
     
     # Approval
     approved = db.Column(db.Boolean, nullable=True)
 
     # Amounts
-    total_submitted = db.Column(db.Float, default=0.0)
-    approved_amount = db.Column(db.Float, default=0.0)
+    total_submitted = db.Column(db.Numeric(12, 2), default=0.0)
+    approved_amount = db.Column(db.Numeric(12, 2), default=0.0)
     
     # Notes
     notes = db.Column(db.Text)
     
     # Timestamp
-    created_at = db.Column(TIMESTAMP, nullable=False, server_default=text('now()'))
+    created_at = db.Column(TIMESTAMP, nullable=False, server_default=db.func.now())
     updated_at = db.Column(db.DateTime, nullable=False, server_default=db.func.now(), onupdate=db.func.now())
 
     # Foreign key to Project
     project_id = db.Column(db.Integer, db.ForeignKey('projects.id', ondelete="CASCADE"), nullable=False, index=True)
 
+    # Serves the newest-summary-per-project lookups
+    __table_args__ = (
+        db.Index('ix_project_summaries_project_id_created_at', 'project_id', 'created_at'),
+    )
+
 
 class MaterialSupplier(db.Model):
     __tablename__ = "material_suppliers"
     
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(50), unique=True, nullable=False)  # e.g., "J & S", "The Home Depot"
-    created_at = db.Column(TIMESTAMP, nullable=False, server_default=text('now()'))
-    updated_at = db.Column(TIMESTAMP, nullable=False, server_default=text('now()'), onupdate=text('now()'))
+    created_at = db.Column(TIMESTAMP, nullable=False, server_default=db.func.now())
+    updated_at = db.Column(TIMESTAMP, nullable=False, server_default=db.func.now(), onupdate=db.func.now())
     
     # Relationships
     wire_prices = db.relationship('WirePrice', backref='supplier', lazy='dynamic')
@@ -245,8 +272,8 @@ class WirePrice(db.Model):
     
     id = db.Column(db.Integer, primary_key=True)
     awg = db.Column(db.String(20), nullable=False)  # e.g., "10", "8", "4/0", "250 MCM"
-    price_per_foot = db.Column(db.Float, nullable=False)
-    updated_at = db.Column(TIMESTAMP, nullable=False, server_default=text('now()'), onupdate=text('now()'))
+    price_per_foot = db.Column(db.Numeric(12, 2), nullable=False)
+    updated_at = db.Column(TIMESTAMP, nullable=False, server_default=db.func.now(), onupdate=db.func.now())
     
     # Foreign key to Supplier
     supplier_id = db.Column(db.Integer, db.ForeignKey('material_suppliers.id', ondelete="CASCADE"), nullable=False, index=True)
@@ -262,8 +289,8 @@ class ConduitPrice(db.Model):
     
     id = db.Column(db.Integer, primary_key=True)
     size = db.Column(db.String(20), nullable=False)  # e.g., "3/4''", "1''", "2'' Rigid"
-    price_per_foot = db.Column(db.Float, nullable=False)
-    updated_at = db.Column(TIMESTAMP, nullable=False, server_default=text('now()'), onupdate=text('now()'))
+    price_per_foot = db.Column(db.Numeric(12, 2), nullable=False)
+    updated_at = db.Column(TIMESTAMP, nullable=False, server_default=db.func.now(), onupdate=db.func.now())
     
     # Foreign key to Supplier
     supplier_id = db.Column(db.Integer, db.ForeignKey('material_suppliers.id', ondelete="CASCADE"), nullable=False, index=True)
@@ -279,8 +306,8 @@ class ConstructionMaterial(db.Model):
     
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False, unique=True)
-    created_at = db.Column(TIMESTAMP, nullable=False, server_default=text('now()'))
-    updated_at = db.Column(TIMESTAMP, nullable=False, server_default=text('now()'), onupdate=text('now()'))
+    created_at = db.Column(TIMESTAMP, nullable=False, server_default=db.func.now())
+    updated_at = db.Column(TIMESTAMP, nullable=False, server_default=db.func.now(), onupdate=db.func.now())
     
     # Updated relationship with explicit order_by and lazy loading options
     prices = db.relationship(
@@ -295,9 +322,14 @@ class ConstructionPrice(db.Model):
     
     id = db.Column(db.Integer, primary_key=True)
     material_id = db.Column(db.Integer, db.ForeignKey('construction_materials.id'), nullable=False)
-    price = db.Column(db.Float, nullable=False)  # price per unit
-    created_at = db.Column(TIMESTAMP, nullable=False, server_default=text('now()'))
-    updated_at = db.Column(TIMESTAMP, nullable=False, server_default=text('now()'), onupdate=text('now()'))
+    price = db.Column(db.Numeric(12, 2), nullable=False)  # price per unit
+    created_at = db.Column(TIMESTAMP, nullable=False, server_default=db.func.now())
+    updated_at = db.Column(TIMESTAMP, nullable=False, server_default=db.func.now(), onupdate=db.func.now())
+
+    # Covers the material foreign key and the latest-price-per-material lookup
+    __table_args__ = (
+        db.Index('ix_construction_prices_material_id_created_at', 'material_id', 'created_at'),
+    )
     
 
 class Union(db.Model):
@@ -305,8 +337,8 @@ class Union(db.Model):
     
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(50), nullable=False)
-    created_at = db.Column(TIMESTAMP, nullable=False, server_default=text('now()'))
-    updated_at = db.Column(TIMESTAMP, nullable=False, server_default=text('now()'), onupdate=text('now()'))
+    created_at = db.Column(TIMESTAMP, nullable=False, server_default=db.func.now())
+    updated_at = db.Column(TIMESTAMP, nullable=False, server_default=db.func.now(), onupdate=db.func.now())
     
     # Updated relationships with proper loading options
     positions = db.relationship(
@@ -329,9 +361,9 @@ class UnionPosition(db.Model):
     name = db.Column(db.String(50), nullable=False)
     is_apprentice = db.Column(db.Boolean, default=False)
     apprentice_year = db.Column(db.Integer, nullable=True)
-    created_at = db.Column(TIMESTAMP, nullable=False, server_default=text('now()'))
-    updated_at = db.Column(TIMESTAMP, nullable=False, server_default=text('now()'), onupdate=text('now()'))
-    union_id = db.Column(db.Integer, db.ForeignKey('unions.id'), nullable=False)
+    created_at = db.Column(TIMESTAMP, nullable=False, server_default=db.func.now())
+    updated_at = db.Column(TIMESTAMP, nullable=False, server_default=db.func.now(), onupdate=db.func.now())
+    union_id = db.Column(db.Integer, db.ForeignKey('unions.id'), nullable=False, index=True)
     
     # Updated relationships
     union = db.relationship('Union', back_populates='positions')
@@ -349,10 +381,10 @@ class UnionWageRate(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     union_id = db.Column(db.Integer, db.ForeignKey('unions.id'), nullable=False)
     position_id = db.Column(db.Integer, db.ForeignKey('union_positions.id'), nullable=False)
-    base_rate = db.Column(db.Float, nullable=False)  # Hourly rate
+    base_rate = db.Column(db.Numeric(12, 2), nullable=False)  # Hourly rate
     effective_date = db.Column(db.Date, nullable=False)
-    created_at = db.Column(TIMESTAMP, nullable=False, server_default=text('now()'))
-    updated_at = db.Column(TIMESTAMP, nullable=False, server_default=text('now()'), onupdate=text('now()'))
+    created_at = db.Column(TIMESTAMP, nullable=False, server_default=db.func.now())
+    updated_at = db.Column(TIMESTAMP, nullable=False, server_default=db.func.now(), onupdate=db.func.now())
     
     # Relationships 
     union = db.relationship('Union', back_populates='wage_rates')
@@ -361,4 +393,33 @@ class UnionWageRate(db.Model):
     __table_args__ = (
         db.UniqueConstraint('union_id', 'position_id', 'effective_date', 
                           name='_union_position_date_uc'),
-    )
\ No newline at end of file
+        # Rates of one position by date: latest rate and as-of lookups
+        db.Index('ix_union_wage_rates_position_id_effective_date', 'position_id', 'effective_date'),
+    )
+
+class PortfolioRollup(db.Model):
+    """Per-user, per-year portfolio totals, kept current by analytics.refresh_rollups"""
+    __tablename__ = 'portfolio_rollups'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete="CASCADE"), nullable=False)
+    year = db.Column(db.Integer, nullable=False)  # Year of the projects' start date
+
+    projects_count = db.Column(db.Integer, nullable=False, default=0)
+    summaries_count = db.Column(db.Integer, nullable=False, default=0)
+    approved_count = db.Column(db.Integer, nullable=False, default=0)
+    rejected_count = db.Column(db.Integer, nullable=False, default=0)
+    chargers_count = db.Column(db.Integer, nullable=False, default=0)
+
+    grand_total = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    total_submitted = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    approved_amount = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    # Sum and count of the non-zero prices per charger, for the average
+    price_per_charger_total = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    price_per_charger_count = db.Column(db.Integer, nullable=False, default=0)
+
+    updated_at = db.Column(TIMESTAMP, nullable=False, server_default=db.func.now(), onupdate=db.func.now())
+
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'year', name='uq_portfolio_rollups_user_year'),
+    )
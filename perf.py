@@ -0,0 +1,481 @@
+import glob
+import hmac
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+from logging.handlers import RotatingFileHandler
+
+import click
+
+from flask import Blueprint
+from flask import Response
+from flask import abort
+from flask import current_app
+from flask import g
+from flask import has_request_context
+from flask import request
+from sqlalchemy import event
+from sqlalchemy import inspect
+from sqlalchemy.engine import Engine
+
+from database import db, pool_status
+
+
+bp = Blueprint("perf", __name__, cli_group="perf")
+
+# When set, /metrics requires "Authorization: Bearer <token>"
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+# Add a Server-Timing header with app and database time to every response
+SERVER_TIMING = os.getenv("PERF_SERVER_TIMING", "false").lower() in ('1', 'true', 'yes', 'on')
+# Log a warning for any request running more statements than this (0 disables)
+QUERY_WARN_THRESHOLD = int(os.getenv("PERF_QUERY_WARN_THRESHOLD", "25"))
+
+# Opt-in slow-query log: statements slower than SLOW_QUERY_MS (0 disables) go to a
+# rotating JSONL file, and a sampled share of slow SELECTs also get their plan
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "0"))
+SLOW_QUERY_LOG = os.getenv("SLOW_QUERY_LOG", "logs/slow_queries.jsonl")
+SLOW_QUERY_LOG_BYTES = int(os.getenv("SLOW_QUERY_LOG_BYTES", str(10 * 1024 * 1024)))
+SLOW_QUERY_LOG_BACKUPS = int(os.getenv("SLOW_QUERY_LOG_BACKUPS", "5"))
+SLOW_QUERY_EXPLAIN_SAMPLE = float(os.getenv("SLOW_QUERY_EXPLAIN_SAMPLE", "0"))
+
+# Upper bounds of the request duration (seconds) and queries-per-request histograms
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 250)
+
+
+class RequestStats:
+    """What the current request has spent so far, kept on flask.g"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.rows = 0
+
+
+class Histogram:
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.buckets = [0] * len(bounds)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.total += value
+        for i, bound in enumerate(self.bounds):
+            if value <= bound:
+                self.buckets[i] += 1
+
+    def snapshot(self):
+        return list(zip(self.bounds, self.buckets)), self.count, self.total
+
+
+class EndpointStats:
+    def __init__(self):
+        self.statuses = {}
+        self.duration = Histogram(DURATION_BUCKETS)
+        self.query_count = Histogram(QUERY_COUNT_BUCKETS)
+        self.queries = 0
+        self.db_time = 0.0
+        self.rows = 0
+
+
+class EndpointRegistry:
+    """Per-endpoint totals for this worker process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = {}
+
+    def record(self, endpoint, method, status, wall_time, stats):
+        with self._lock:
+            entry = self._endpoints.setdefault((endpoint, method), EndpointStats())
+            entry.statuses[status] = entry.statuses.get(status, 0) + 1
+            entry.duration.observe(wall_time)
+            entry.query_count.observe(stats.queries)
+            entry.queries += stats.queries
+            entry.db_time += stats.db_time
+            entry.rows += stats.rows
+
+    def snapshot(self):
+        with self._lock:
+            return [
+                (endpoint, method, dict(entry.statuses), entry.duration.snapshot(), entry.query_count.snapshot(),
+                 entry.queries, entry.db_time, entry.rows)
+                for (endpoint, method), entry in sorted(self._endpoints.items())
+            ]
+
+
+endpoints = EndpointRegistry()
+
+
+def _current_stats():
+    if has_request_context():
+        return g.get('perf_stats')
+    return None
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context.perf_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, 'perf_started', None)
+    if started is None:
+        return
+    duration = time.perf_counter() - started
+
+    stats = _current_stats()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_time += duration
+        # rowcount is the number of rows a SELECT returned on psycopg2, -1 where the driver doesn't know
+        if cursor.rowcount and cursor.rowcount > 0:
+            stats.rows += cursor.rowcount
+
+    if SLOW_QUERY_MS and duration * 1000 >= SLOW_QUERY_MS:
+        _record_slow_query(conn, statement, parameters, executemany, duration)
+
+
+_slow_log = None
+_slow_log_lock = threading.Lock()
+
+
+def _slow_query_logger():
+    """JSONL logger for slow statements, created on first use"""
+    global _slow_log
+    with _slow_log_lock:
+        if _slow_log is None:
+            directory = os.path.dirname(SLOW_QUERY_LOG)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            handler = RotatingFileHandler(SLOW_QUERY_LOG, maxBytes=SLOW_QUERY_LOG_BYTES, backupCount=SLOW_QUERY_LOG_BACKUPS)
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            logger = logging.getLogger('estimator.slow_queries')
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+            logger.addHandler(handler)
+            _slow_log = logger
+        return _slow_log
+
+
+def parameter_shape(parameters):
+    """Types of the bound parameters without their values, which may hold customer data"""
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [parameter_shape(value) if isinstance(value, (dict, list, tuple)) else type(value).__name__ for value in parameters]
+    return type(parameters).__name__
+
+
+def _explain(conn, statement, parameters):
+    """EXPLAIN (ANALYZE, BUFFERS) plan of a SELECT, run inside a savepoint on a separate cursor"""
+    cursor = conn.connection.cursor()
+    try:
+        # ANALYZE runs the statement again; the savepoint keeps a failure or a
+        # statement timeout from aborting the request's transaction
+        cursor.execute("SAVEPOINT perf_explain")
+        try:
+            cursor.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + statement, parameters)
+            plan = cursor.fetchone()[0]
+        except Exception as e:
+            cursor.execute("ROLLBACK TO SAVEPOINT perf_explain")
+            return {"error": str(e)}
+        cursor.execute("RELEASE SAVEPOINT perf_explain")
+        return plan[0] if isinstance(plan, list) else plan
+    finally:
+        cursor.close()
+
+
+def _record_slow_query(conn, statement, parameters, executemany, duration):
+    record = {
+        "at": time.strftime('%Y-%m-%dT%H:%M:%S'),
+        "duration_ms": round(duration * 1000, 2),
+        "endpoint": request.endpoint if has_request_context() else None,
+        "method": request.method if has_request_context() else None,
+        "statement": statement,
+        "parameters": parameter_shape(parameters[0] if executemany and parameters else parameters),
+        "executemany": executemany,
+        "pid": os.getpid()
+    }
+    if executemany:
+        record["batch_size"] = len(parameters)
+
+    is_select = statement.lstrip().upper().startswith('SELECT')
+    if (SLOW_QUERY_EXPLAIN_SAMPLE and is_select and not executemany
+            and conn.dialect.name == 'postgresql' and random.random() < SLOW_QUERY_EXPLAIN_SAMPLE):
+        record["plan"] = _explain(conn, statement, parameters)
+
+    _slow_query_logger().info(json.dumps(record, default=str))
+
+
+@bp.record_once
+def _listen_to_engines(state):
+    # Engine-class listeners cover the app's engine and any created later
+    event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+
+
+@bp.before_app_request
+def _start_request():
+    g.perf_stats = RequestStats()
+
+
+@bp.after_app_request
+def _finish_request(response):
+    stats = g.pop('perf_stats', None)
+    if stats is None:
+        return response
+
+    wall_time = time.perf_counter() - stats.started
+    # Unmatched URLs share one label so scanners can't grow the series without bound
+    endpoint = request.endpoint or 'unmatched'
+    endpoints.record(endpoint, request.method, response.status_code, wall_time, stats)
+
+    if QUERY_WARN_THRESHOLD and stats.queries > QUERY_WARN_THRESHOLD:
+        current_app.logger.warning(
+            f"{request.method} {request.path} ({endpoint}) ran {stats.queries} queries "
+            f"in {stats.db_time * 1000:.1f}ms of {wall_time * 1000:.1f}ms"
+        )
+
+    if SERVER_TIMING:
+        response.headers.add(
+            'Server-Timing',
+            f'app;dur={wall_time * 1000:.1f}, db;dur={stats.db_time * 1000:.1f};desc="{stats.queries} queries"'
+        )
+
+    return response
+
+
+def _format_value(value):
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    pairs = ','.join(
+        '{}="{}"'.format(key, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for key, value in labels.items()
+    )
+    return '{' + pairs + '}'
+
+
+class MetricsWriter:
+    """Builds a Prometheus text exposition, one HELP/TYPE header per metric"""
+
+    def __init__(self):
+        self.lines = []
+        self._declared = set()
+
+    def sample(self, name, kind, help_text, value, labels=None):
+        if name not in self._declared:
+            self._declared.add(name)
+            self.lines.append(f"# HELP {name} {help_text}")
+            self.lines.append(f"# TYPE {name} {kind}")
+        self.lines.append(f"{name}{_labels(labels)} {_format_value(value)}")
+
+    def histogram(self, name, help_text, buckets, count, total, labels=None):
+        labels = dict(labels or {})
+        if name not in self._declared:
+            self._declared.add(name)
+            self.lines.append(f"# HELP {name} {help_text}")
+            self.lines.append(f"# TYPE {name} histogram")
+        for bound, bucket_count in buckets:
+            self.lines.append(f"{name}_bucket{_labels(dict(labels, le=_format_value(float(bound))))} {bucket_count}")
+        self.lines.append(f"{name}_bucket{_labels(dict(labels, le='+Inf'))} {count}")
+        self.lines.append(f"{name}_sum{_labels(labels)} {_format_value(float(total))}")
+        self.lines.append(f"{name}_count{_labels(labels)} {count}")
+
+    def render(self):
+        return '\n'.join(self.lines) + '\n'
+
+
+def _write_pool_metrics(writer):
+    status = pool_status(db.engine)
+    if status is None:
+        return
+
+    writer.sample('estimator_db_pool_size', 'gauge', 'Connections the pool keeps open', status['size'])
+    writer.sample('estimator_db_pool_max_overflow', 'gauge', 'Connections the pool may open beyond its size', status['max_overflow'])
+    writer.sample('estimator_db_pool_checked_out', 'gauge', 'Connections currently in use', status['checked_out'])
+    writer.sample('estimator_db_pool_checked_in', 'gauge', 'Idle connections in the pool', status['checked_in'])
+    writer.sample('estimator_db_pool_overflow', 'gauge', 'Overflow connections currently open', status['overflow'])
+    writer.sample('estimator_db_pool_saturation', 'gauge', 'Checked out connections over pool size plus overflow', status['saturation'])
+
+    checkout = status['checkout']
+    if checkout:
+        writer.histogram(
+            'estimator_db_pool_checkout_wait_seconds',
+            'Time spent waiting for a pooled connection',
+            checkout['buckets'], checkout['count'], checkout['sum']
+        )
+        writer.sample('estimator_db_pool_checkout_timeouts_total', 'counter', 'Checkouts that gave up after pool_timeout', checkout['timeouts'])
+
+
+def _write_endpoint_metrics(writer):
+    # The exposition format wants each metric's samples together, so write metric by metric
+    snapshot = endpoints.snapshot()
+    labelled = [({'endpoint': endpoint, 'method': method}, rest) for endpoint, method, *rest in snapshot]
+
+    for labels, (statuses, *_) in labelled:
+        for status, count in sorted(statuses.items()):
+            writer.sample('estimator_http_requests_total', 'counter', 'Requests served', count, dict(labels, status=status))
+    for labels, (_, duration, *_) in labelled:
+        writer.histogram('estimator_http_request_duration_seconds', 'Wall time of each request', *duration, labels=labels)
+    for labels, (_, _, query_count, *_) in labelled:
+        writer.histogram('estimator_db_queries_per_request', 'SQL statements run by each request', *query_count, labels=labels)
+    for labels, (_, _, _, queries, db_time, rows) in labelled:
+        writer.sample('estimator_db_queries_total', 'counter', 'SQL statements run', queries, labels)
+    for labels, (_, _, _, queries, db_time, rows) in labelled:
+        writer.sample('estimator_db_query_seconds_total', 'counter', 'Time spent executing SQL', db_time, labels)
+    for labels, (_, _, _, queries, db_time, rows) in labelled:
+        writer.sample('estimator_db_rows_total', 'counter', 'Rows returned or affected by SQL statements', rows, labels)
+
+
+@bp.route("/metrics")
+def metrics():
+    """Prometheus metrics for this worker process; every gunicorn worker reports its own"""
+    if METRICS_TOKEN:
+        supplied = request.headers.get('Authorization', '')
+        if not hmac.compare_digest(supplied, f"Bearer {METRICS_TOKEN}"):
+            abort(401)
+
+    writer = MetricsWriter()
+    writer.sample('estimator_process_id', 'gauge', 'Process id of the worker serving this scrape', os.getpid())
+    _write_pool_metrics(writer)
+    _write_endpoint_metrics(writer)
+
+    return Response(writer.render(), mimetype='text/plain; version=0.0.4')
+
+
+def _read_slow_queries(path):
+    """Records from the slow-query log and its rotated backups, oldest first"""
+    files = sorted(glob.glob(path + '.*'), key=lambda name: -int(name.rsplit('.', 1)[1]) if name.rsplit('.', 1)[1].isdigit() else 0)
+    for name in files + [path]:
+        if not os.path.exists(name):
+            continue
+        with open(name) as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        continue
+
+
+def _plan_summary(plan):
+    if not isinstance(plan, dict) or 'Plan' not in plan:
+        return None
+    root = plan['Plan']
+    return f"{root.get('Node Type')} actual {root.get('Actual Total Time')}ms, {root.get('Actual Rows')} rows"
+
+
+@bp.cli.command("slow-queries")
+@click.option("--file", "path", default=SLOW_QUERY_LOG, show_default=True, help="Slow-query log to read")
+@click.option("--top", default=10, show_default=True, help="Number of statements to show")
+@click.option("--sort", "sort_by", type=click.Choice(["total", "count", "max", "mean"]), default="total", show_default=True)
+def slow_queries(path, top, sort_by):
+    """Summarize the slowest statements in the slow-query log."""
+    groups = {}
+    for record in _read_slow_queries(path):
+        key = re.sub(r'\s+', ' ', record.get("statement", "")).strip()
+        group = groups.setdefault(key, {"count": 0, "total": 0.0, "max": 0.0, "endpoints": {}, "plan": None})
+        duration = record.get("duration_ms", 0.0)
+        group["count"] += 1
+        group["total"] += duration
+        group["max"] = max(group["max"], duration)
+        endpoint = record.get("endpoint") or "(no request)"
+        group["endpoints"][endpoint] = group["endpoints"].get(endpoint, 0) + 1
+        if record.get("plan"):
+            group["plan"] = record["plan"]
+
+    if not groups:
+        click.echo(f"No slow queries recorded in {path}")
+        return
+
+    for group in groups.values():
+        group["mean"] = group["total"] / group["count"]
+
+    ranked = sorted(groups.items(), key=lambda item: item[1][sort_by], reverse=True)[:top]
+    for rank, (statement, group) in enumerate(ranked, start=1):
+        endpoints_seen = ', '.join(
+            f"{name} ({count})" for name, count in sorted(group["endpoints"].items(), key=lambda item: -item[1])
+        )
+        click.echo(
+            f"#{rank}  {group['count']} calls, total {group['total']:.1f}ms, "
+            f"mean {group['mean']:.1f}ms, max {group['max']:.1f}ms"
+        )
+        click.echo(f"    endpoints: {endpoints_seen}")
+        plan = _plan_summary(group["plan"])
+        if plan:
+            click.echo(f"    last plan: {plan}")
+        click.echo(f"    {statement[:500]}")
+        click.echo()
+
+
+def unindexed_foreign_keys(inspector):
+    """(table, columns, referred table) of foreign keys that no index, unique constraint or primary key starts with"""
+    missing = []
+    for table in sorted(inspector.get_table_names()):
+        leading = [tuple(index['column_names']) for index in inspector.get_indexes(table)]
+        leading += [tuple(unique['column_names']) for unique in inspector.get_unique_constraints(table)]
+        leading.append(tuple(inspector.get_pk_constraint(table).get('constrained_columns') or ()))
+        for fk in inspector.get_foreign_keys(table):
+            columns = tuple(fk['constrained_columns'])
+            if not any(covering[:len(columns)] == columns for covering in leading):
+                missing.append((table, columns, fk['referred_table']))
+    return missing
+
+
+def sequential_scans(connection, min_rows, ratio):
+    """Tables of at least ``min_rows`` live rows read by sequential scan at least ``ratio`` times as often as by index"""
+    rows = connection.execute(db.text(
+        "SELECT relname, seq_scan, seq_tup_read, COALESCE(idx_scan, 0), n_live_tup "
+        "FROM pg_stat_user_tables WHERE n_live_tup >= :min_rows AND seq_scan > 0 "
+        "ORDER BY seq_tup_read DESC"
+    ), {'min_rows': min_rows})
+    return [row for row in rows if row[1] >= ratio * row[3]]
+
+
+@bp.cli.command("index-audit")
+@click.option("--min-rows", default=1000, show_default=True, help="Ignore sequential scans of tables smaller than this")
+@click.option("--ratio", default=1.0, show_default=True, help="Flag tables scanned sequentially at least this many times per index scan")
+@click.option("--strict", is_flag=True, help="Exit with status 1 when anything is flagged")
+def index_audit(min_rows, ratio, strict):
+    """Flag foreign keys without an index and tables Postgres keeps scanning sequentially."""
+    flagged = 0
+
+    missing = unindexed_foreign_keys(inspect(db.engine))
+    click.echo(f"Foreign keys without a supporting index: {len(missing)}")
+    for table, columns, referred in missing:
+        click.echo(f"    {table}({', '.join(columns)}) -> {referred}")
+    flagged += len(missing)
+
+    if db.engine.dialect.name != 'postgresql':
+        click.echo("Sequential scan statistics need Postgres; skipped")
+    else:
+        with db.engine.connect() as connection:
+            scans = sequential_scans(connection, min_rows, ratio)
+        click.echo(f"Tables of {min_rows}+ rows mostly read by sequential scan: {len(scans)}")
+        for table, seq_scan, seq_tup_read, idx_scan, live_rows in scans:
+            click.echo(
+                f"    {table}: {seq_scan} seq scans reading {seq_tup_read} rows, "
+                f"{idx_scan} index scans, {live_rows} live rows"
+            )
+        flagged += len(scans)
+        click.echo("Scan counters accumulate from the last statistics reset")
+
+    if strict and flagged:
+        raise SystemExit(1)
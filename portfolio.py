@@ -1,3 +1,10 @@
+import base64
+import csv
+import io
+import json
+import os
+from types import SimpleNamespace
+
 from flask import Blueprint
 from datetime import datetime
 from flask import flash
@@ -8,10 +15,18 @@ from flask import url_for
 from flask import jsonify
 from auth import login_required
 from flask import Flask, request, jsonify
+from sqlalchemy import insert
 from sqlalchemy.orm import joinedload
 from flask import current_app
-from models import CostEstimation, Project, EstimationEntry, MiscEquipmentEstimation, MiscEquipmentEntry, LaborCostEstimation, LaborCostEntry, ProjectSummary, MaterialSupplier, WirePrice, ConduitPrice, ConstructionMaterial, ConstructionPrice, Union, UnionWageRate
-from database import db
+from models import CostEstimation, Project, EstimationEntry, MiscEquipmentEstimation, MiscEquipmentEntry, LaborCostEstimation, LaborCostEntry, ProjectSummary, MaterialSupplier, WirePrice, ConduitPrice, ConstructionMaterial, ConstructionPrice, Union, UnionPosition, UnionWageRate, PortfolioRollup
+from database import db, latest_row_per
+import analytics
+import price_history
+import search
+import wage_rates
+from estimator import calc
+from bulk import upsert
+from pricing import get_price_matrix, get_catalog, invalidate_catalog, price_cache, WIRE, CONDUIT, CONSTRUCTION, UNION_RATES
 from datetime import datetime
 
 
@@ -33,37 +48,13 @@ def search_projects():
     if not search_query:
         return jsonify({})
     
-    # Query only projects belonging to the current user
-    projects = db.session.query(
-        Project.id,
-        Project.address,
-        Project.company,
-        Project.p_type,
-        LaborCostEstimation.chargers_count
-    ).join(
-        LaborCostEstimation,
-        Project.id == LaborCostEstimation.project_id
-    ).filter(
-        Project.address.ilike(f'%{search_query}%'),  # Case-insensitive LIKE
-        Project.user_id == user_id  # This is the crucial security filter
-    ).all()
-    
-    # Convert results to dictionary format
-    results = [
-        {
-            "id": p.id,
-            "address": p.address,
-            "company": p.company,
-            "p_type": p.p_type,
-            "chargers_count": p.chargers_count
-        }
-        for p in projects
-    ]
+    # Similarity-ranked matches on address or company, limited to the user's projects
+    limit = max(1, min(request.args.get('limit', type=int, default=search.SEARCH_LIMIT), 100))
+    results = search.search_projects(user_id, search_query, limit=limit)
     
     return jsonify(results)
 
 
-
 @bp.route("/portfolio/new_project", methods=["GET", "POST"])
 @login_required
 def new_project():  
@@ -112,7 +103,9 @@ def new_project():
             created_at=datetime.utcnow()
         )
         db.session.add(labor_estimation)
+        analytics.refresh_rollups(user_id, start_date.year)
         db.session.commit()
+        search.invalidate_user_search(user_id)
 
         # Return the project ID to the frontend
         return jsonify({"project_id": new_project.id, "status": new_project.status}), 201
@@ -137,10 +130,6 @@ def estimate_awg_cond():
         awg_data = data.get('awgData', [])  # Default to empty list
         conduit_data = data.get('conduitData', [])  # Default to empty list
         tax = data.get('tax', 0)  # Default to 0
-        tax_amount = data.get('taxAmount', 0)  # Default to 0
-        grand_total = data.get('grandTotal', 0)  # Default to 0
-        awg_total = data.get('awgTotal', 0)  # Default to 0
-        conduit_total = data.get('conduitTotal', 0)  # Default to 0
         notes_awg = data.get('notes_awg', '')  # Default to empty string
         notes_conduit = data.get('notes_conduit', '')  # Default to empty string
 
@@ -162,46 +151,60 @@ def estimate_awg_cond():
             return jsonify({'success': False, 'message': 'Project not found'}), 404
 
         try:
-            # Create a new CostEstimation record
+            created_at = datetime.utcnow()
+
+            # The browser's totals are only a preview; recompute them from the entries
+            totals = calc.section_totals(
+                [("AWG", awg.get('cost'), awg.get('length')) for awg in awg_data]
+                + [("Conduit", conduit.get('cost'), conduit.get('length')) for conduit in conduit_data],
+                calc.WIRE_CATEGORIES,
+                tax
+            )
+            _check_client_total('AWG/Conduit grand total', project.id, data.get('grandTotal'), totals['grand_total'])
+            lines = iter(totals['lines'])
+
+            # Create a new CostEstimation record; flush (not commit) to get its id
+            # so the estimation and its entries land in a single transaction
             cost_estimation = CostEstimation(
-                tax_percentage=tax,
-                tax_amount=tax_amount,
-                grand_total=grand_total,
-                awg_total=awg_total,
-                conduit_total=conduit_total,
-                created_at=datetime.utcnow(),
+                tax_percentage=totals['tax_percentage'],
+                tax_amount=totals['tax_amount'],
+                grand_total=totals['grand_total'],
+                awg_total=totals['totals']['AWG'],
+                conduit_total=totals['totals']['Conduit'],
+                created_at=created_at,
                 project_id=project.id
             )
             db.session.add(cost_estimation)
-            db.session.commit()
-
-            # Save AWG entries if they exist
-            for awg in awg_data:
-                entry = EstimationEntry(
-                    type="AWG",
-                    name=awg.get('name', ''),
-                    cost=awg.get('cost', 0),
-                    length=awg.get('length', 0),
-                    subtotal=awg.get('subtotal', 0),
-                    notes_awg=notes_awg,
-                    cost_estimation_id=cost_estimation.id,
-                    created_at=datetime.utcnow()
-                )
-                db.session.add(entry)
-
-            # Save Conduit entries if they exist
-            for conduit in conduit_data:
-                entry = EstimationEntry(
-                    type="Conduit",
-                    name=conduit.get('name', ''),
-                    cost=conduit.get('cost', 0),
-                    length=conduit.get('length', 0),
-                    subtotal=conduit.get('subtotal', 0),
-                    notes_conduit=notes_conduit,
-                    cost_estimation_id=cost_estimation.id,
-                    created_at=datetime.utcnow()
-                )
-                db.session.add(entry)
+            db.session.flush()
+
+            # AWG and Conduit entries, written with one bulk INSERT
+            entries = [
+                {
+                    'type': "AWG",
+                    'name': awg.get('name', ''),
+                    'cost': cost,
+                    'length': float(length),
+                    'subtotal': subtotal,
+                    'notes_awg': notes_awg,
+                    'cost_estimation_id': cost_estimation.id,
+                    'created_at': created_at
+                }
+                for awg, (cost, length, subtotal) in zip(awg_data, lines)
+            ] + [
+                {
+                    'type': "Conduit",
+                    'name': conduit.get('name', ''),
+                    'cost': cost,
+                    'length': float(length),
+                    'subtotal': subtotal,
+                    'notes_conduit': notes_conduit,
+                    'cost_estimation_id': cost_estimation.id,
+                    'created_at': created_at
+                }
+                for conduit, (cost, length, subtotal) in zip(conduit_data, lines)
+            ]
+            if entries:
+                db.session.execute(insert(EstimationEntry), entries)
 
             # Update project status
             project.status = "wire_conduit_submitted"
@@ -211,6 +214,7 @@ def estimate_awg_cond():
                 'success': True,
                 'message': 'Wire & Conduit Estimation submitted',
                 'status': project.status,
+                'grand_total': totals['grand_total'],
             }), 201
 
         except Exception as e:
@@ -246,10 +250,6 @@ def estimate_misc_equip():
         misc_data = data.get('miscData', [])  # Default to empty list
         equipment_data = data.get('equipmentData', [])  # Default to empty list
         tax = data.get('tax', 0)  # Default to 0
-        tax_amount = data.get('taxAmount', 0)  # Default to 0
-        grand_total = data.get('grandTotal', 0)  # Default to 0
-        misc_total = data.get('miscTotal', 0)  # Default to 0
-        equipment_total = data.get('equipmentTotal', 0)  # Default to 0
         notes_misc = data.get('notes_misc', '')  # Default to empty string
         notes_equip = data.get('notes_equip', '')  # Default to empty string
 
@@ -271,46 +271,60 @@ def estimate_misc_equip():
             return jsonify({'success': False, 'message': 'Project not found'}), 404
 
         try:    
-            # Create a new MiscEquipmentEstimation record
+            created_at = datetime.utcnow()
+
+            # The browser's totals are only a preview; recompute them from the entries
+            totals = calc.section_totals(
+                [("Miscellaneous", misc.get('cost'), misc.get('quantity')) for misc in misc_data]
+                + [("Equipment", equip.get('cost'), equip.get('quantity')) for equip in equipment_data],
+                calc.MISC_CATEGORIES,
+                tax
+            )
+            _check_client_total('Misc/Equipment grand total', project.id, data.get('grandTotal'), totals['grand_total'])
+            lines = iter(totals['lines'])
+
+            # Create a new MiscEquipmentEstimation record; flush (not commit) to get
+            # its id so the estimation and its entries land in a single transaction
             misc_equipment_estimation = MiscEquipmentEstimation(
-                tax_percentage=tax,
-                tax_amount=tax_amount,
-                grand_total=grand_total,
-                misc_total=misc_total,
-                equipment_total=equipment_total,
-                created_at=datetime.utcnow(),
+                tax_percentage=totals['tax_percentage'],
+                tax_amount=totals['tax_amount'],
+                grand_total=totals['grand_total'],
+                misc_total=totals['totals']['Miscellaneous'],
+                equipment_total=totals['totals']['Equipment'],
+                created_at=created_at,
                 project_id=project.id
             )
             db.session.add(misc_equipment_estimation)
-            db.session.commit()
-
-            # Save Miscellaneous entries if they exist
-            for misc in misc_data:
-                entry = MiscEquipmentEntry(
-                    type="Miscellaneous",
-                    name=misc.get('name', ''),
-                    cost=misc.get('cost', 0),
-                    quantity=misc.get('quantity', 0),
-                    subtotal=misc.get('subtotal', 0),
-                    notes_misc=notes_misc,
-                    misc_equipment_estimation_id=misc_equipment_estimation.id,
-                    created_at=datetime.utcnow()
-                )
-                db.session.add(entry)
-
-            # Save Equipment entries if they exist
-            for equip in equipment_data:
-                entry = MiscEquipmentEntry(
-                    type="Equipment",
-                    name=equip.get('name', ''),
-                    cost=equip.get('cost', 0),
-                    quantity=equip.get('quantity', 0),
-                    subtotal=equip.get('subtotal', 0),
-                    notes_equip=notes_equip,
-                    misc_equipment_estimation_id=misc_equipment_estimation.id,
-                    created_at=datetime.utcnow()
-                )
-                db.session.add(entry)
+            db.session.flush()
+
+            # Miscellaneous and Equipment entries, written with one bulk INSERT
+            entries = [
+                {
+                    'type': "Miscellaneous",
+                    'name': misc.get('name', ''),
+                    'cost': cost,
+                    'quantity': float(quantity),
+                    'subtotal': subtotal,
+                    'notes_misc': notes_misc,
+                    'misc_equipment_estimation_id': misc_equipment_estimation.id,
+                    'created_at': created_at
+                }
+                for misc, (cost, quantity, subtotal) in zip(misc_data, lines)
+            ] + [
+                {
+                    'type': "Equipment",
+                    'name': equip.get('name', ''),
+                    'cost': cost,
+                    'quantity': float(quantity),
+                    'subtotal': subtotal,
+                    'notes_equip': notes_equip,
+                    'misc_equipment_estimation_id': misc_equipment_estimation.id,
+                    'created_at': created_at
+                }
+                for equip, (cost, quantity, subtotal) in zip(equipment_data, lines)
+            ]
+            if entries:
+                db.session.execute(insert(MiscEquipmentEntry), entries)
 
             # Update project status
             project.status = "misc_equipment_submitted"
@@ -320,6 +334,7 @@ def estimate_misc_equip():
                 'success': True,
                 'message': 'Miscellaneous & Equipment Estimation submitted',
                 'status': project.status,
+                'grand_total': totals['grand_total'],
             }), 201
 
         except Exception as e:
@@ -354,77 +369,104 @@ def estimate_labor_cost():
         project_id = data.get('project_id')
         labor_data = data.get('laborData')
         low_voltage_data = data.get('lowVoltageData')
-        labor_total = data.get('laborTotal')
-        low_voltage_total = data.get('lowVoltageTotal')
-        grand_total = data.get('grandTotal')
 
-        # Validate required fields (but allow low_voltage_total to be 0)
-        if None in [project_id, labor_data, low_voltage_data, labor_total, grand_total] or low_voltage_total is None:
+        # Validate required fields; the totals are recomputed below, not taken from the client
+        if None in [project_id, labor_data, low_voltage_data]:
             return jsonify({'success': False, 'message': 'Missing required fields'}), 400
 
-        # Explicitly validate low_voltage_total can be >= 0
-        if low_voltage_total < 0:
-            return jsonify({'success': False, 'message': 'Low voltage total cannot be negative'}), 400
-
         # Validate Labor data
-        if not isinstance(labor_data, list):
+        if not isinstance(labor_data, list) or not isinstance(low_voltage_data, dict):
             return jsonify({'success': False, 'message': 'Invalid data format for Labor entries'}), 400
+
+        # Explicitly validate the charger price can be >= 0
+        try:
+            charger_price = calc.parse_decimal(low_voltage_data.get('chargerPrice', 0))
+        except ValueError:
+            return jsonify({'success': False, 'message': 'Invalid charger price'}), 400
+        if charger_price < 0:
+            return jsonify({'success': False, 'message': 'Low voltage total cannot be negative'}), 400
         
-        # Find the project
-        project = Project.query.get(project_id)
-        if not project:
+        # Find the project with its summary and the existing labor estimation, if any
+        graph = _load_project_graph(project_id, entries=False)
+        if not graph:
             return jsonify({'success': False, 'message': 'Project not found'}), 404
-        
-        # Get the existing labor estimation or create a new one
-        labor_cost_estimation = LaborCostEstimation.query.filter_by(project_id=project_id).first()
+        project = graph.project
+        labor_cost_estimation = graph.labor_cost
         
         try:
+            # The chargers count is set when the project is created; only a new
+            # estimation (which shouldn't happen in normal flow) takes it from the client
+            if labor_cost_estimation:
+                chargers_count = labor_cost_estimation.chargers_count
+            else:
+                chargers_count = int(calc.to_decimal(low_voltage_data.get('chargersCount')))
+
+            # Recompute the totals from the entries instead of trusting the browser's preview
+            labor_data = [
+                labor for labor in labor_data
+                if any([labor.get('rate'), labor.get('workers'), labor.get('hours'), labor.get('days')])
+            ]
+            totals = calc.labor_totals(
+                [(labor.get('rate'), labor.get('workers'), labor.get('hours'), labor.get('days')) for labor in labor_data],
+                chargers_count,
+                charger_price
+            )
+            _check_client_total('Labor grand total', project.id, data.get('grandTotal'), totals['grand_total'])
+
             if labor_cost_estimation:
                 # Update existing labor estimation
-                labor_cost_estimation.labor_total = labor_total
-                labor_cost_estimation.low_voltage_total = low_voltage_total
-                labor_cost_estimation.grand_total = grand_total
-                labor_cost_estimation.charger_price = low_voltage_data.get('chargerPrice')
+                labor_cost_estimation.labor_total = totals['labor_total']
+                labor_cost_estimation.low_voltage_total = totals['low_voltage_total']
+                labor_cost_estimation.grand_total = totals['grand_total']
+                labor_cost_estimation.charger_price = totals['charger_price']
                 labor_cost_estimation.updated_at = datetime.utcnow()
             else:
-                # Create new labor estimation (shouldn't happen in normal flow)
                 labor_cost_estimation = LaborCostEstimation(
-                    labor_total=labor_total,
-                    low_voltage_total=low_voltage_total,
-                    grand_total=grand_total,
-                    chargers_count=low_voltage_data.get('chargersCount'),
-                    charger_price=low_voltage_data.get('chargerPrice'),
+                    labor_total=totals['labor_total'],
+                    low_voltage_total=totals['low_voltage_total'],
+                    grand_total=totals['grand_total'],
+                    chargers_count=chargers_count,
+                    charger_price=totals['charger_price'],
                     created_at=datetime.utcnow(),
                     project_id=project.id
                 )
                 db.session.add(labor_cost_estimation)
+                db.session.flush()
                 
             # Clear existing labor entries
             LaborCostEntry.query.filter_by(labor_cost_estimation_id=labor_cost_estimation.id).delete()
 
             # Save new Labor entries
-            for labor in labor_data:
-                if any([labor.get('rate'), labor.get('workers'), labor.get('hours'), labor.get('days')]):
-                    entry = LaborCostEntry(
-                        position=labor.get('position'),
-                        rate=labor.get('rate'),
-                        workers=labor.get('workers'),
-                        hours=labor.get('hours'),
-                        days=labor.get('days'),
-                        subtotal=labor.get('subtotal'),
-                        labor_cost_estimation_id=labor_cost_estimation.id,
-                        created_at=datetime.utcnow()
-                    )
-                    db.session.add(entry)
+            for labor, (rate, workers, hours, days, subtotal) in zip(labor_data, totals['lines']):
+                entry = LaborCostEntry(
+                    position=labor.get('position'),
+                    rate=rate,
+                    workers=workers,
+                    hours=float(hours),
+                    days=float(days),
+                    subtotal=subtotal,
+                    labor_cost_estimation_id=labor_cost_estimation.id,
+                    created_at=datetime.utcnow()
+                )
+                db.session.add(entry)
+
+            # Keep an existing summary in step with the new labor totals
+            if graph.summary:
+                db.session.flush()
+                graph.labor_cost = labor_cost_estimation
+                _update_summary_totals(graph)
 
             # Update project status
             project.status = "labor_cost_submitted"
+            analytics.refresh_rollups(project.user_id, project.start_date.year)
             db.session.commit()
+            search.invalidate_user_search(project.user_id)
 
             return jsonify({
                 'success': True,
                 'message': 'Labor Cost Estimation submitted',
                 'status': project.status,
+                'grand_total': totals['grand_total'],
             }), 201
 
         except Exception as e:
@@ -464,12 +506,10 @@ def get_estimation_data():
     if not project_id:
         return jsonify({'success': False, 'message': 'Project ID required'}), 400
     
-    #project = Project.query.get(project_id)
-    
-    # Get all estimation data for this project
-    cost_estimation = CostEstimation.query.filter_by(project_id=project_id).first()
-    misc_estimation = MiscEquipmentEstimation.query.filter_by(project_id=project_id).first()
-    labor_estimation = LaborCostEstimation.query.filter_by(project_id=project_id).first()
+    # Get the latest estimations of this project, the same ones save_summary prices
+    cost_estimation = _latest_estimation(CostEstimation, project_id, entries=False)
+    misc_estimation = _latest_estimation(MiscEquipmentEstimation, project_id, entries=False)
+    labor_estimation = _latest_estimation(LaborCostEstimation, project_id, entries=False)
     
     if not all([cost_estimation, misc_estimation, labor_estimation]):
         return jsonify({'success': False, 'message': 'Estimations not found'}), 404
@@ -517,10 +557,13 @@ def save_summary():
                 }
             }), 400
         
+        graph = _load_project_graph(data['project_id'], entries=False)
+        if not graph:
+            return jsonify({'success': False, 'message': 'Project not found'}), 404
+        project = graph.project
+
         # Find existing summary or create new one
-        summary = ProjectSummary.query.filter_by(project_id=data['project_id']).first()
-        if not summary:
-            summary = ProjectSummary(project_id=data['project_id'])
+        summary = _get_or_create_summary(graph)
 
 
         # List of all expected fields from your formData
@@ -574,7 +617,7 @@ def save_summary():
                             # Handle unexpected values
                             setattr(summary, field, None)
                     elif any(x in field for x in ['_cost', '_subtotal', '_profit', '_total', '_percentage']):
-                        setattr(summary, field, float(data[field]))
+                        setattr(summary, field, calc.parse_decimal(data[field]))
                     else:
                         setattr(summary, field, data[field])
                 except (ValueError, TypeError) as e:
@@ -588,15 +631,21 @@ def save_summary():
                     }), 400
 
         try:
-            db.session.add(summary)
+            # Only the markups, percentages, permits and submitted amounts come from the
+            # form; base costs and every derived figure are recomputed here
+            _refresh_estimation_base_costs(graph)
+            _update_summary_totals(graph)
+            _check_client_total('Summary grand total', project.id, data.get('grand_total'), summary.grand_total)
+
             # Update project status
-            project = Project.query.get(data['project_id'])
             project.status = "completed"
+            analytics.refresh_rollups(project.user_id, project.start_date.year)
             db.session.commit()
             return jsonify({
                 'success': True,
                 'message': 'Summary saved successfully',
                 'status': project.status,
+                'grand_total': summary.grand_total,
             }), 201
         except Exception as e:
             db.session.rollback()
@@ -634,9 +683,63 @@ def save_summary():
     return render_template("portfolio/estimate_summary.html", project_id=project_id)
 
 
+PROJECT_SORTS = {
+    'start_date': lambda summary: Project.start_date,
+    'grand_total': lambda summary: db.func.coalesce(summary.c.grand_total, 0.0),
+    'price_per_charger': lambda summary: db.func.coalesce(summary.c.price_per_charger, 0.0),
+}
+
+
+def _encode_cursor(sort, value, project_id):
+    value = value.isoformat() if sort == 'start_date' else float(value)
+    raw = json.dumps([value, project_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def _decode_cursor(sort, cursor):
+    """Return (value, project_id) from a cursor, or None if it is malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        value, project_id = json.loads(raw)
+        if sort == 'start_date':
+            value = datetime.strptime(value, '%Y-%m-%d').date()
+        else:
+            value = float(value)
+        return value, int(project_id)
+    except (ValueError, TypeError):
+        return None
+
+
+# The latest summary's approved flag of each listing state; projects without a summary are pending
+APPROVAL_STATES = {True: 'approved', False: 'not_approved', None: 'pending'}
+FACET_COUNTS = ('total', 'approved', 'not_approved', 'pending')
+
+
+def _year_counts(user_id):
+    """
+    Projects per start year, newest year first, read from the portfolio
+    rollups, which every project write refreshes in its own transaction
+    """
+    rows = db.session.query(PortfolioRollup.year, PortfolioRollup.projects_count).filter(
+        PortfolioRollup.user_id == user_id, PortfolioRollup.projects_count > 0
+    ).order_by(PortfolioRollup.year.desc()).all()
+    return dict(rows)
+
+
+def _approval_counts(query, summary):
+    """Projects matched by the listing query, in total and per approval state of their latest summary"""
+    counts = dict.fromkeys(FACET_COUNTS, 0)
+    for approved, count in query.with_entities(summary.c.approved, db.func.count()).group_by(summary.c.approved):
+        counts['total'] += count
+        counts[APPROVAL_STATES[approved]] += count
+    return counts
+
+
 @bp.route("/portfolio/projects")
 @login_required
 def projects():
+    user_id = session["user_id"]
+
     # Get current year
     current_year = datetime.now().year
     
@@ -644,86 +747,136 @@ def projects():
     year_filter = request.args.get('year', type=str, default=str(current_year))
     approval_status = request.args.get('approval', type=str)
 
-    # Base query
-    query = Project.query.filter_by(user_id=session["user_id"])
+    # Sorting and keyset pagination
+    sort = request.args.get('sort', 'start_date')
+    if sort not in PROJECT_SORTS:
+        sort = 'start_date'
+    order = 'asc' if request.args.get('order') == 'asc' else 'desc'
+    page_size = current_app.config.get('PROJECTS_PAGE_SIZE', 25)
+    per_page = max(1, min(request.args.get('per_page', type=int, default=page_size), 100))
+    after = request.args.get('after')
+    before = request.args.get('before')
+
+    # Newest labor estimation and summary of each project, probed only for the
+    # rows the page reads, carrying only the columns the listing shows
+    labor, labor_on = latest_row_per(
+        Project.id,
+        LaborCostEstimation.project_id,
+        [LaborCostEstimation.created_at.desc(), LaborCostEstimation.id.desc()],
+        [LaborCostEstimation.id, LaborCostEstimation.chargers_count]
+    )
+    summary, summary_on = latest_row_per(
+        Project.id,
+        ProjectSummary.project_id,
+        [ProjectSummary.created_at.desc(), ProjectSummary.id.desc()],
+        [
+            ProjectSummary.id,
+            ProjectSummary.approved,
+            ProjectSummary.approved_amount,
+            ProjectSummary.total_submitted,
+            ProjectSummary.grand_total,
+            ProjectSummary.price_per_charger,
+            ProjectSummary.price_per_charger_submitted
+        ]
+    )
+
+    # Single listing query over scalar columns, no ORM hydration
+    query = db.session.query(
+        Project.id,
+        Project.address,
+        Project.company,
+        Project.start_date,
+        Project.p_type,
+        Project.status,
+        labor.c.chargers_count,
+        summary.c.id.label('summary_id'),
+        summary.c.approved,
+        summary.c.approved_amount,
+        summary.c.total_submitted,
+        summary.c.price_per_charger,
+        summary.c.price_per_charger_submitted
+    ).select_from(Project).outerjoin(
+        labor, labor_on
+    ).outerjoin(
+        summary, summary_on
+    ).filter(Project.user_id == user_id)
     
     # Apply year filter ONLY if not "ALL"
+    year = None
     if year_filter.lower() != 'all':
         try:
             year = int(year_filter)  # Ensure it's a valid integer
-            query = query.filter(db.extract('year', Project.start_date) == year)
-        except ValueError:
+            in_year = analytics.starts_in(year)
+        except (ValueError, OverflowError):
             # Fallback to current year if invalid year provided
-            query = query.filter(db.extract('year', Project.start_date) == current_year)
+            year = current_year
+            in_year = analytics.starts_in(year)
+        query = query.filter(in_year)
+
+    # Counted before the approval filter so the dropdown shows every state
+    approval_counts = _approval_counts(query, summary)
+    total_count = approval_counts.get(approval_status, approval_counts['total'])
 
     # Apply approval status filter if specified
     if approval_status:
         if approval_status == 'approved':
-            query = query.join(ProjectSummary).filter(ProjectSummary.approved == True)
+            query = query.filter(summary.c.approved == True)
         elif approval_status == 'not_approved':
-            query = query.join(ProjectSummary).filter(ProjectSummary.approved == False)
+            query = query.filter(summary.c.approved == False)
         elif approval_status == 'pending':
-            # Use outerjoin to include projects without summaries
-            query = query.outerjoin(ProjectSummary).filter(
-                db.or_(
-                    ProjectSummary.approved.is_(None),
-                    ProjectSummary.id.is_(None)  # Projects with no summary at all
-                )
-            )
-    
-    # Order and execute query
-    projects = query.order_by(Project.start_date.desc()).all()
-    
-    # Get distinct years for filter dropdown
-    years = db.session.query(
-        db.extract('year', Project.start_date).label('year')
-    ).filter_by(
-        user_id=session["user_id"]
-    ).distinct().order_by(
-        db.desc('year')
-    ).all()
-    
-    # Convert to list of integers
-    year_list = [int(year[0]) for year in years if year[0] is not None]
-    
-    # Batch load all necessary related data
-    project_ids = [p.id for p in projects]
+            # Include projects without summaries
+            query = query.filter(summary.c.approved.is_(None))
+
+    # Keyset pagination on (sort value, id)
+    sort_column = PROJECT_SORTS[sort](summary)
+    key = db.tuple_(sort_column, Project.id)
+    cursor = _decode_cursor(sort, before or after) if (before or after) else None
+    backwards = bool(before and cursor)
+    descending = (order == 'desc') != backwards
+
+    if cursor:
+        query = query.filter(key < db.tuple_(*cursor) if descending else key > db.tuple_(*cursor))
+
+    ordering = [sort_column.desc(), Project.id.desc()] if descending else [sort_column.asc(), Project.id.asc()]
+    rows = query.add_columns(sort_column.label('sort_value')).order_by(*ordering).limit(per_page + 1).all()
+
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backwards:
+        rows.reverse()
+
+    next_cursor = prev_cursor = None
+    if rows:
+        first_cursor = _encode_cursor(sort, rows[0].sort_value, rows[0].id)
+        last_cursor = _encode_cursor(sort, rows[-1].sort_value, rows[-1].id)
+        if backwards:
+            next_cursor = last_cursor
+            prev_cursor = first_cursor if has_more else None
+        else:
+            next_cursor = last_cursor if has_more else None
+            prev_cursor = first_cursor if cursor else None
     
-    # Get most recent cost estimations
-    latest_cost_estimations = get_latest_for_each_project(CostEstimation, project_ids)
-    latest_misc_estimations = get_latest_for_each_project(MiscEquipmentEstimation, project_ids)
-    latest_labor_estimations = get_latest_for_each_project(LaborCostEstimation, project_ids)
+    year_counts = _year_counts(user_id)
 
-    # Get most recent project summaries
-    latest_summaries = get_latest_for_each_project(ProjectSummary, project_ids)
-    
-    # Create mappings
-    cost_map = {est.project_id: est for est in latest_cost_estimations}
-    misc_map = {est.project_id: est for est in latest_misc_estimations}
-    labor_map = {est.project_id: est for est in latest_labor_estimations}
-    summary_map = {summary.project_id: summary for summary in latest_summaries}
-    
     # Prepare project data
-    project_list = []
-    for project in projects:
-        project_summary = summary_map.get(project.id)
-        project_data = {
-            'id': project.id,
-            'address': project.address,
-            'company': project.company,
-            'start_date': project.start_date,
-            'p_type': project.p_type,
-            'status': project.status,
-            'chargers_count': labor_map.get(project.id, {}).chargers_count if labor_map.get(project.id)
-             else None,
-            'approved': project_summary.approved if (project_summary and project_summary.approved is not None) else None,
-            'project_summary_exists': project_summary is not None,
-            'approved_amount': project_summary.approved_amount if project_summary else None,
-            'total_submitted': project_summary.total_submitted if project_summary else None,
-            'price_per_charger': project_summary.price_per_charger if project_summary else None,
-            'price_per_charger_submitted': project_summary.price_per_charger_submitted if project_summary else None
+    project_list = [
+        {
+            'id': row.id,
+            'address': row.address,
+            'company': row.company,
+            'start_date': row.start_date,
+            'p_type': row.p_type,
+            'status': row.status,
+            'chargers_count': row.chargers_count,
+            'approved': row.approved,
+            'project_summary_exists': row.summary_id is not None,
+            'approved_amount': row.approved_amount,
+            'total_submitted': row.total_submitted,
+            'price_per_charger': row.price_per_charger,
+            'price_per_charger_submitted': row.price_per_charger_submitted
         }
-        project_list.append(project_data)
+        for row in rows
+    ]
 
 
     # Ensure selected_year is properly set for the template
@@ -736,36 +889,21 @@ def projects():
     return render_template(
         "portfolio/listing_projects.html", 
         projects=project_list,
-        years=year_list,
+        years=list(year_counts),
+        year_counts=year_counts,
+        approval_counts=approval_counts,
         selected_year=year_filter,  # <-- Use year_filter instead
         current_year=current_year,
-        selected_approval=approval_status
+        selected_approval=approval_status,
+        selected_sort=sort,
+        selected_order=order,
+        per_page=per_page,
+        total_count=total_count,
+        next_cursor=next_cursor,
+        prev_cursor=prev_cursor
     )
 
 
-def get_latest_for_each_project(model, project_ids):
-    """Helper function to get most recent record for each project"""
-    if not project_ids:
-        return []
-        
-    subq = db.session.query(
-        model.project_id,
-        db.func.max(model.created_at).label('max_created_at')
-    ).filter(
-        model.project_id.in_(project_ids)
-    ).group_by(
-        model.project_id
-    ).subquery()
-    
-    return db.session.query(model).join(
-        subq,
-        db.and_(
-            model.project_id == subq.c.project_id,
-            model.created_at == subq.c.max_created_at
-        )
-    ).all()
-
-
 @bp.route("/portfolio/resume_project/<int:project_id>")
 @login_required
 def resume_project(project_id):
@@ -794,7 +932,10 @@ def resume_project(project_id):
 @login_required
 def project_review(project_id):
     try:
-        project = Project.query.get_or_404(project_id)
+        graph = _load_project_graph(project_id)
+        if not graph:
+            abort(404)
+        project = graph.project
         data = {
             'project': project,
             'cost_estimation': None,
@@ -804,7 +945,7 @@ def project_review(project_id):
         }
 
         # Handle Cost Estimation - Filter in Python
-        cost_estimation = project.cost_estimations.order_by(CostEstimation.created_at.desc()).first()
+        cost_estimation = graph.cost_estimation
         if cost_estimation:
             awg_entries = [e for e in cost_estimation.entries if e.type == 'AWG']
             conduit_entries = [e for e in cost_estimation.entries if e.type == 'Conduit']
@@ -821,7 +962,7 @@ def project_review(project_id):
             data['cost_estimation'] = cost_estimation_data
 
         # Handle Misc Equipment - Filter in Python
-        misc_equipment = project.misc_equipment_estimations.order_by(MiscEquipmentEstimation.created_at.desc()).first()
+        misc_equipment = graph.misc_equipment
         if misc_equipment:
             misc_entries = [e for e in misc_equipment.entries if e.type == 'Miscellaneous']
             equip_entries = [e for e in misc_equipment.entries if e.type == 'Equipment']
@@ -837,7 +978,7 @@ def project_review(project_id):
             data['misc_equipment'] = misc_equipment_data
 
         # Handle Labor Cost (updated section)
-        labor_cost = project.labor_cost_estimations.order_by(LaborCostEstimation.created_at.desc()).first()
+        labor_cost = graph.labor_cost
         if labor_cost:
             labor_cost_data = {
                 'entries': labor_cost.entries,
@@ -847,26 +988,14 @@ def project_review(project_id):
             
             data['labor_cost'] = labor_cost_data
 
-        # Handle Summary - ensure we have one
-        summary = project.summaries.first()
-        if not summary:
-            # Create a new summary if none exists
-            summary = ProjectSummary(project_id=project.id)
-            db.session.add(summary)
-            db.session.commit()
-
-        # Refresh base costs from related tables
-        _refresh_summary_base_costs(project, summary)
-        
-        # Recalculate all derived values
-        _recalculate_summary_totals(summary)
-        
-        # Commit any changes made to the summary
-        db.session.commit()
+        # Handle Summary - derive totals on a detached copy so viewing never writes
+        summary = _summary_snapshot(graph.summary, project.id)
+        _refresh_summary_base_costs(summary, labor_cost)
+        _recalculate_summary_totals(summary, labor_cost.chargers_count if labor_cost else 0)
         
         data['summary'] = summary
 
-        return render_template("portfolio/project_review.html", **data, project_id=project_id)
+        return render_template("portfolio/project_review.html", **data, stored_summary=graph.summary, project_id=project_id)
 
     except Exception as e:
         db.session.rollback()
@@ -880,6 +1009,7 @@ def project_review(project_id):
 def update_basic_info(project_id):
     try:
         project = Project.query.get_or_404(project_id)
+        previous_year = project.start_date.year
         
         # Update fields from form data
         project.address = request.form.get('address')
@@ -887,7 +1017,10 @@ def update_basic_info(project_id):
         project.start_date = datetime.strptime(request.form.get('start_date'), '%Y-%m-%d').date()
         project.p_type = request.form.get('p_type')
         
+        # A new start date can move the project to another year's rollup
+        analytics.refresh_rollups(project.user_id, previous_year, project.start_date.year)
         db.session.commit()
+        search.invalidate_user_search(project.user_id)
         flash('Basic information updated successfully!', 'success')
         return redirect(url_for('portfolio.project_review', project_id=project_id))
     
@@ -901,71 +1034,59 @@ def update_basic_info(project_id):
 @bp.route("/update_cost_estimation/<int:project_id>", methods=["POST"])
 @login_required
 def update_cost_estimation(project_id):
-    def normalize_float(value, default=0.0):
-        try:
-            return round(float(value), 2)
-        except (ValueError, TypeError):
-            return default
-
     try:
-        project = Project.query.get_or_404(project_id)
-        cost_estimation = project.cost_estimations.first()
+        graph = _load_project_graph(project_id)
+        if not graph:
+            abort(404)
+        project = graph.project
+        cost_estimation = graph.cost_estimation
 
         if not cost_estimation:
             flash('No cost estimation found for this project', 'danger')
             return redirect(url_for('portfolio.project_review', project_id=project_id))
 
-        p_summary = project.summaries.first()
+        p_summary = _get_or_create_summary(graph)
 
-        if not p_summary:
-            flash('No project summaries found for this project', 'danger')
-            return redirect(url_for('portfolio.project_review', project_id=project_id))
-
-        awg_total = 0.0
-        conduit_total = 0.0
-        
         # Get notes from form
         notes_awg = request.form.get('notes_awg', '')
         notes_conduit = request.form.get('notes_conduit', '')
-        
-        # Update entries with normalized values
-        for entry in cost_estimation.entries:
+
+        # Recalculate every entry and the section totals in one pass
+        prefixes = calc.WIRE_CATEGORIES
+        entries = [entry for entry in cost_estimation.entries if entry.type in prefixes]
+        totals = calc.section_totals(
+            [
+                (
+                    entry.type,
+                    request.form.get(f'{prefixes[entry.type]}_cost_{entry.id}'),
+                    request.form.get(f'{prefixes[entry.type]}_length_{entry.id}')
+                )
+                for entry in entries
+            ],
+            prefixes,
+            request.form.get('tax_percentage')
+        )
+
+        for entry, (cost, length, subtotal) in zip(entries, totals['lines']):
+            entry.cost = cost
+            entry.length = float(length)
+            entry.subtotal = subtotal
             if entry.type == 'AWG':
-                cost = normalize_float(request.form.get(f'awg_cost_{entry.id}'))
-                length = normalize_float(request.form.get(f'awg_length_{entry.id}'))
-                entry.cost = cost
-                entry.length = length
-                entry.subtotal = normalize_float(entry.cost * entry.length)
                 entry.notes_awg = notes_awg  # Set the same notes for all AWG entries
-                awg_total += entry.subtotal
-
-            elif entry.type == 'Conduit':
-                cost = normalize_float(request.form.get(f'conduit_cost_{entry.id}'))
-                length = normalize_float(request.form.get(f'conduit_length_{entry.id}'))
-                entry.cost = cost
-                entry.length = length
-                entry.subtotal = normalize_float(cost * length)
+            else:
                 entry.notes_conduit = notes_conduit  # Set the same notes for all Conduit entries
-                conduit_total += entry.subtotal
-            
-        # Update tax and totals
-        tax_percentage = normalize_float(request.form.get('tax_percentage'))
-        awg_base_cost = normalize_float(awg_total + (awg_total * (tax_percentage / 100)))
-        conduit_base_cost = normalize_float(conduit_total + (conduit_total * (tax_percentage / 100)))
-        subtotal = normalize_float(awg_total + conduit_total)
-        tax_amount = normalize_float(subtotal * (tax_percentage / 100))
-        grand_total = normalize_float(subtotal + tax_amount)
-        
-        cost_estimation.tax_percentage = tax_percentage
-        cost_estimation.awg_total = awg_total
-        p_summary.awg_base_cost = awg_base_cost 
-        cost_estimation.conduit_total = conduit_total
-        p_summary.conduit_base_cost = conduit_base_cost
-        cost_estimation.tax_amount = tax_amount
-        cost_estimation.grand_total = grand_total
-
-        # In update_cost_estimation route, just before commit:
-        _refresh_summary_base_costs(project, project.summaries.first())  
+
+        cost_estimation.tax_percentage = totals['tax_percentage']
+        cost_estimation.awg_total = totals['totals']['AWG']
+        cost_estimation.conduit_total = totals['totals']['Conduit']
+        cost_estimation.tax_amount = totals['tax_amount']
+        cost_estimation.grand_total = totals['grand_total']
+        p_summary.awg_base_cost = totals['base_costs']['AWG']
+        p_summary.conduit_base_cost = totals['base_costs']['Conduit']
+
+        # Persist the recalculated summary together with the changed inputs
+        _update_summary_totals(graph)
+        analytics.refresh_rollups(project.user_id, project.start_date.year)
         db.session.commit()
         flash('Cost estimation updated successfully!', 'success')
         return redirect(url_for('portfolio.project_review', project_id=project_id, _anchor='cost-estimation'))
@@ -980,70 +1101,58 @@ def update_cost_estimation(project_id):
 @bp.route("/update_misc_equipment/<int:project_id>", methods=["POST"])
 @login_required
 def update_misc_equipment(project_id):
-    def normalize_float(value, default=0.0):
-        try:
-            return round(float(value), 2)
-        except (ValueError, TypeError):
-            return default
-
     try:
-        project = Project.query.get_or_404(project_id)
-        misc_equip = project.misc_equipment_estimations.first()
+        graph = _load_project_graph(project_id)
+        if not graph:
+            abort(404)
+        project = graph.project
+        misc_equip = graph.misc_equipment
         
         if not misc_equip:
             flash('No miscellaneous/equipment estimation found for this project', 'danger')
             return redirect(url_for('portfolio.project_review', project_id=project_id, _anchor='misc-equipment'))
 
-        p_summary = project.summaries.first()
-
-        if not p_summary:
-            flash('No project summaries found for this project', 'danger')
-            return redirect(url_for('portfolio.project_review', project_id=project_id))
-        
-        misc_total = 0.0
-        equipment_total = 0.0
+        p_summary = _get_or_create_summary(graph)
 
         # Get notes from form
         notes_misc = request.form.get('notes_misc', '')
         notes_equip = request.form.get('notes_equip', '')
-        
-        # Update entries with normalized values
-        for entry in misc_equip.entries:
+
+        # Recalculate every entry and the section totals in one pass
+        prefixes = calc.MISC_CATEGORIES
+        entries = [entry for entry in misc_equip.entries if entry.type in prefixes]
+        totals = calc.section_totals(
+            [
+                (
+                    entry.type,
+                    request.form.get(f'{prefixes[entry.type]}_cost_{entry.id}'),
+                    request.form.get(f'{prefixes[entry.type]}_quantity_{entry.id}')
+                )
+                for entry in entries
+            ],
+            prefixes,
+            request.form.get('tax_percentage')
+        )
+
+        for entry, (cost, quantity, subtotal) in zip(entries, totals['lines']):
+            entry.cost = cost
+            entry.quantity = float(quantity)
+            entry.subtotal = subtotal
             if entry.type == 'Miscellaneous':
-                cost = normalize_float(request.form.get(f'misc_cost_{entry.id}'))
-                quantity = normalize_float(request.form.get(f'misc_quantity_{entry.id}'))
-                entry.cost = cost
-                entry.quantity = quantity
-                entry.subtotal = normalize_float(cost * quantity)
                 entry.notes_misc = notes_misc
-                misc_total += entry.subtotal
-            
-            elif entry.type == 'Equipment':
-                cost = normalize_float(request.form.get(f'equipment_cost_{entry.id}'))
-                quantity = normalize_float(request.form.get(f'equipment_quantity_{entry.id}')) 
-                entry.cost = cost
-                entry.quantity = quantity
-                entry.subtotal = normalize_float(cost * quantity)
+            else:
                 entry.notes_equip = notes_equip
-                equipment_total += entry.subtotal
-        
-        # Update tax and totals
-        tax_percentage = normalize_float(request.form.get('tax_percentage'))
-        misc_base_cost = normalize_float(misc_total + (misc_total * (tax_percentage / 100)))
-        equipment_base_cost = normalize_float(equipment_total + (equipment_total * (tax_percentage / 100)))
-        subtotal = normalize_float(misc_total + equipment_total)
-        tax_amount = normalize_float(subtotal * (tax_percentage / 100))
-        grand_total = normalize_float(subtotal + tax_amount)
-        
-        misc_equip.misc_total = misc_total
-        p_summary.misc_base_cost = misc_base_cost 
-        misc_equip.equipment_total = equipment_total
-        p_summary.equipment_base_cost = equipment_base_cost
-        misc_equip.tax_percentage = tax_percentage
-        misc_equip.tax_amount = tax_amount
-        misc_equip.grand_total = grand_total
-        
-        _refresh_summary_base_costs(project, project.summaries.first())
+
+        misc_equip.misc_total = totals['totals']['Miscellaneous']
+        misc_equip.equipment_total = totals['totals']['Equipment']
+        misc_equip.tax_percentage = totals['tax_percentage']
+        misc_equip.tax_amount = totals['tax_amount']
+        misc_equip.grand_total = totals['grand_total']
+        p_summary.misc_base_cost = totals['base_costs']['Miscellaneous']
+        p_summary.equipment_base_cost = totals['base_costs']['Equipment']
+
+        _update_summary_totals(graph)
+        analytics.refresh_rollups(project.user_id, project.start_date.year)
         db.session.commit()
         flash('Miscellaneous & Equipment updated successfully!', 'success')
         return redirect(url_for('portfolio.project_review', project_id=project_id, _anchor='misc-equipment'))
@@ -1058,56 +1167,59 @@ def update_misc_equipment(project_id):
 @bp.route("/update_labor_cost/<int:project_id>", methods=["POST"])
 @login_required
 def update_labor_cost(project_id):
-    def normalize_float(value, default=0.0):
-        try:
-            return round(float(value), 2)
-        except (ValueError, TypeError):
-            return default
-
     try:
-        project = Project.query.get_or_404(project_id)
-        labor_cost = project.labor_cost_estimations.first()
+        graph = _load_project_graph(project_id)
+        if not graph:
+            abort(404)
+        project = graph.project
+        labor_cost = graph.labor_cost
         
         if not labor_cost:
             flash('No labor cost estimation found for this project', 'danger')
             return redirect(url_for('portfolio.project_review', project_id=project_id, _anchor='labor-cost'))
-        
-        labor_total = 0.0
 
         # Get notes from form
         notes = request.form.get('notes', '')
-        
-        # Update labor entries with normalized values
-        for entry in labor_cost.entries:
-            rate = normalize_float(request.form.get(f'rate_{entry.id}'))
-            workers = int(request.form.get(f'workers_{entry.id}', 0))
-            hours = normalize_float(request.form.get(f'hours_{entry.id}'))
-            days = normalize_float(request.form.get(f'days_{entry.id}'))         
+
+        # Update charger information
+        chargers_count = int(request.form.get('chargers_count', 0))
+
+        # Recalculate every labor entry and the totals in one pass
+        entries = list(labor_cost.entries)
+        totals = calc.labor_totals(
+            [
+                (
+                    request.form.get(f'rate_{entry.id}'),
+                    request.form.get(f'workers_{entry.id}', 0),
+                    request.form.get(f'hours_{entry.id}'),
+                    request.form.get(f'days_{entry.id}')
+                )
+                for entry in entries
+            ],
+            chargers_count,
+            request.form.get('charger_price', 0)
+        )
+
+        for entry, (rate, workers, hours, days, subtotal) in zip(entries, totals['lines']):
             entry.rate = rate
             entry.workers = workers
-            entry.hours = hours
-            entry.days = days
-            entry.subtotal = normalize_float(rate * workers * hours * days)
+            entry.hours = float(hours)
+            entry.days = float(days)
+            entry.subtotal = subtotal
             entry.notes = notes
-            labor_total += entry.subtotal
-        
-        # Update charger information
-        chargers_count = int(request.form.get('chargers_count', 0))
-        charger_price = normalize_float(request.form.get('charger_price', 0))
-        
-        # Calculate totals
-        low_voltage_total = normalize_float(chargers_count * charger_price)
-        grand_total = normalize_float(labor_total + low_voltage_total)
-        
+
         # Update model
         labor_cost.chargers_count = chargers_count
-        labor_cost.charger_price = charger_price
-        labor_cost.labor_total = labor_total
-        labor_cost.low_voltage_total = low_voltage_total
-        labor_cost.grand_total = grand_total
+        labor_cost.charger_price = totals['charger_price']
+        labor_cost.labor_total = totals['labor_total']
+        labor_cost.low_voltage_total = totals['low_voltage_total']
+        labor_cost.grand_total = totals['grand_total']
         
-        _refresh_summary_base_costs(project, project.summaries.first())
+        _get_or_create_summary(graph)
+        _update_summary_totals(graph)
+        analytics.refresh_rollups(project.user_id, project.start_date.year)
         db.session.commit()
+        search.invalidate_user_search(project.user_id)
         flash('Labor cost updated successfully!', 'success')
         return redirect(url_for('portfolio.project_review', project_id=project_id, _anchor='labor-cost'))
     
@@ -1121,48 +1233,48 @@ def update_labor_cost(project_id):
 @bp.route("/update_summary/<int:project_id>", methods=["POST"])
 @login_required
 def update_summary(project_id):
-    def validate_positive_float(value, field_name, max_value=None, min_value=None):
+    def validate_positive_float(value, field_name, max_value=None, min_value=None, round_to=calc.money):
         try:
-            num = float(value)
-            if num < 0:
-                raise ValueError(f"{field_name} must be positive")
-            if max_value is not None and num > max_value:
-                raise ValueError(f"{field_name} must be ≤ {max_value}")
-            if min_value is not None and num < min_value:
-                raise ValueError(f"{field_name} must be ≥ {min_value}")
-            return round(num, 2)
-        except (ValueError, TypeError):
+            num = calc.parse_decimal(value)
+        except ValueError:
             raise ValueError(f"Invalid {field_name}: must be a number")
+        if num < 0:
+            raise ValueError(f"{field_name} must be positive")
+        if max_value is not None and num > max_value:
+            raise ValueError(f"{field_name} must be ≤ {max_value}")
+        if min_value is not None and num < min_value:
+            raise ValueError(f"{field_name} must be ≥ {min_value}")
+        return round_to(num)
 
     def validate_tax_percentage(value):
-        return validate_positive_float(value, "Tax percentage", max_value=100)
+        return validate_positive_float(value, "Tax percentage", max_value=100, round_to=calc.rate)
 
     try:
-        project = Project.query.get_or_404(project_id)
-        summary = project.summaries.first()
-        
-        if not summary:
-            flash('No project summary found', 'danger')
-            return redirect(url_for('portfolio.project_review', project_id=project_id, _anchor='project-summary'))
+        graph = _load_project_graph(project_id, entries=False)
+        if not graph:
+            abort(404)
+        project = graph.project
+        summary = _get_or_create_summary(graph)
+        labor_cost = graph.labor_cost
 
         # Refresh base costs from related tables before updating
-        _refresh_summary_base_costs(project, summary)
+        _refresh_summary_base_costs(summary, labor_cost)
 
         # Update markups and percentages
-        summary.awg_markup = validate_positive_float(request.form.get('awg_markup'), "AWG markup", min_value=1.0)
-        summary.conduit_markup = validate_positive_float(request.form.get('conduit_markup'), "Conduit markup", min_value=1.0)
-        summary.misc_markup = validate_positive_float(request.form.get('misc_markup'), "Misc markup", min_value=1.0)
-        summary.equipment_markup = validate_positive_float(request.form.get('equipment_markup'), "Equipment markup", min_value=1.0)
-        summary.labor_markup = validate_positive_float(request.form.get('labor_markup'), "Labor markup", min_value=1.0)
-        summary.low_voltage_markup = validate_positive_float(request.form.get('low_voltage_markup'), "Low voltage markup", min_value=1.0)
-        summary.permits_markup = validate_positive_float(request.form.get('permits_markup'), "Permits markup", min_value=1.0)
+        summary.awg_markup = validate_positive_float(request.form.get('awg_markup'), "AWG markup", min_value=1.0, round_to=calc.rate)
+        summary.conduit_markup = validate_positive_float(request.form.get('conduit_markup'), "Conduit markup", min_value=1.0, round_to=calc.rate)
+        summary.misc_markup = validate_positive_float(request.form.get('misc_markup'), "Misc markup", min_value=1.0, round_to=calc.rate)
+        summary.equipment_markup = validate_positive_float(request.form.get('equipment_markup'), "Equipment markup", min_value=1.0, round_to=calc.rate)
+        summary.labor_markup = validate_positive_float(request.form.get('labor_markup'), "Labor markup", min_value=1.0, round_to=calc.rate)
+        summary.low_voltage_markup = validate_positive_float(request.form.get('low_voltage_markup'), "Low voltage markup", min_value=1.0, round_to=calc.rate)
+        summary.permits_markup = validate_positive_float(request.form.get('permits_markup'), "Permits markup", min_value=1.0, round_to=calc.rate)
         
         # Handle editable permits base cost
         if 'permits_base_cost' in request.form:
             summary.permits_base_cost = validate_positive_float(request.form.get('permits_base_cost'), "Permits base cost", min_value=0)
 
         summary.tax_percentage = validate_tax_percentage(request.form.get('tax_percentage'))
-        summary.overhead_percentage = validate_positive_float(request.form.get('overhead_percentage'), "Overhead percentage")
+        summary.overhead_percentage = validate_positive_float(request.form.get('overhead_percentage'), "Overhead percentage", round_to=calc.rate)
 
         # Update approval status
         approved_value = request.form.get('approved')
@@ -1184,8 +1296,9 @@ def update_summary(project_id):
         summary.notes = request.form.get('notes', '')
 
         # Recalculate all values (including price_per_charger)
-        _recalculate_summary_totals(summary)
+        _recalculate_summary_totals(summary, labor_cost.chargers_count if labor_cost else 0)
 
+        analytics.refresh_rollups(project.user_id, project.start_date.year)
         db.session.commit()
         flash('Project summary updated successfully!', 'success')
         
@@ -1200,109 +1313,126 @@ def update_summary(project_id):
     
     return redirect(url_for('portfolio.project_review', project_id=project_id, _anchor='project-summary'))
 
-def _refresh_summary_base_costs(project, summary):
-    """Refresh base costs from related tables"""
-    # Get latest cost estimation
-    project_summary = project.summaries.first()  # Changed from project_summaries to summaries
-    if project_summary:
-        summary.awg_base_cost = project_summary.awg_base_cost or 0
-        summary.conduit_base_cost = project_summary.conduit_base_cost or 0
-        summary.misc_base_cost = project_summary.misc_base_cost or 0
-        summary.equipment_base_cost = project_summary.equipment_base_cost or 0
-    
-    # Get latest labor cost estimation
-    labor_cost = project.labor_cost_estimations.first()
+def _apply_summary_defaults(summary):
+    """Fill unset fields with the column defaults, which SQLAlchemy only applies on INSERT"""
+    for column in ProjectSummary.__table__.columns:
+        if getattr(summary, column.key, None) is None and column.default is not None and column.default.is_scalar:
+            setattr(summary, column.key, column.default.arg)
+    return summary
+
+
+def _summary_snapshot(summary, project_id):
+    """Detached copy of a summary (or of a blank one) whose totals can be recomputed without writing"""
+    snapshot = SimpleNamespace(**{
+        column.key: getattr(summary, column.key) if summary else None
+        for column in ProjectSummary.__table__.columns
+    })
+    snapshot.project_id = project_id
+    return _apply_summary_defaults(snapshot)
+
+
+def _latest_id(model, project_id):
+    """
+    Scalar subquery of the id of a project's newest row of ``model`` (an
+    estimation or summary), the same row the listing shows. ``project_id``
+    may be a value or a column to correlate with.
+    """
+    return db.select(model.id).where(model.project_id == project_id).order_by(
+        model.created_at.desc(), model.id.desc()
+    ).limit(1).correlate_except(model).scalar_subquery()
+
+
+def _latest_estimation(model, project_id, entries=True):
+    """A project's most recent estimation (or summary) of one kind, with its entries joined in when asked"""
+    query = model.query.filter(model.id == _latest_id(model, project_id))
+    if entries:
+        query = query.options(joinedload(model.entries))
+    return query.first()
+
+
+def _load_project_graph(project_id, entries=True):
+    """
+    A project with its latest summary and its latest cost, misc/equipment and
+    labor estimations, in four queries whatever the number of entries.
+    Returns None when the project doesn't exist. Routes pass this to the
+    summary helpers so nothing along the way goes back to the database for
+    the same rows.
+    """
+    row = db.session.query(Project, ProjectSummary).outerjoin(
+        ProjectSummary, ProjectSummary.id == _latest_id(ProjectSummary, Project.id)
+    ).filter(Project.id == project_id).first()
+    if row is None:
+        return None
+
+    project, summary = row
+    return SimpleNamespace(
+        project=project,
+        summary=summary,
+        cost_estimation=_latest_estimation(CostEstimation, project.id, entries),
+        misc_equipment=_latest_estimation(MiscEquipmentEstimation, project.id, entries),
+        labor_cost=_latest_estimation(LaborCostEstimation, project.id, entries),
+    )
+
+
+def _get_or_create_summary(graph):
+    """Return the project's summary, adding a new one to the session if it has none"""
+    if not graph.summary:
+        graph.summary = _apply_summary_defaults(ProjectSummary(project_id=graph.project.id))
+        db.session.add(graph.summary)
+    return graph.summary
+
+
+def _update_summary_totals(graph):
+    """Refresh base costs and recalculate a persisted summary after one of its inputs changed"""
+    summary, labor_cost = graph.summary, graph.labor_cost
+    _apply_summary_defaults(summary)
+    _refresh_summary_base_costs(summary, labor_cost)
+    _recalculate_summary_totals(summary, labor_cost.chargers_count if labor_cost else 0)
+
+
+def _refresh_estimation_base_costs(graph):
+    """Refresh the AWG, conduit, misc and equipment base costs (section total plus its tax)"""
+    summary = graph.summary
+    sections = (
+        (graph.cost_estimation, calc.WIRE_CATEGORIES, ('awg_total', 'conduit_total')),
+        (graph.misc_equipment, calc.MISC_CATEGORIES, ('misc_total', 'equipment_total')),
+    )
+    for estimation, categories, total_fields in sections:
+        if not estimation:
+            continue
+        tax_percentage = calc.rate(estimation.tax_percentage)
+        for category, total_field in zip(categories.values(), total_fields):
+            base_cost = calc.with_tax(calc.to_decimal(getattr(estimation, total_field)), tax_percentage)
+            setattr(summary, f'{category}_base_cost', base_cost)
+
+
+def _check_client_total(label, project_id, client_value, server_value):
+    """Log when the browser's preview of a total disagrees with the server's figure"""
+    client_value = calc.to_decimal(client_value, None)
+    if client_value is not None and abs(calc.money(client_value) - server_value) > calc.CENT:
+        current_app.logger.warning(
+            f"{label} for project {project_id}: client sent {client_value}, server computed {server_value}"
+        )
+
+
+def _refresh_summary_base_costs(summary, labor_cost):
+    """Refresh base costs from the labor cost estimation"""
     if labor_cost:
         summary.labor_base_cost = labor_cost.labor_total or 0
         summary.low_voltage_base_cost = labor_cost.low_voltage_total or 0
-        summary.chargers_count = labor_cost.chargers_count or 0
         
-def _recalculate_summary_totals(summary):
-    """Recalculate all derived values in the summary with float normalization"""
-    def normalize_float(value, default=0.0):
-        try:
-            return round(float(value), 2)
-        except (ValueError, TypeError):
-            return default
-
-    # Calculate category subtotals and profits with normalization
-    summary.awg_subtotal = normalize_float(summary.awg_base_cost * summary.awg_markup)
-    summary.awg_profit = normalize_float(summary.awg_subtotal - summary.awg_base_cost)
-    
-    summary.conduit_subtotal = normalize_float(summary.conduit_base_cost * summary.conduit_markup)
-    summary.conduit_profit = normalize_float(summary.conduit_subtotal - summary.conduit_base_cost)
-    
-    summary.misc_subtotal = normalize_float(summary.misc_base_cost * summary.misc_markup)
-    summary.misc_profit = normalize_float(summary.misc_subtotal - summary.misc_base_cost)
-    
-    summary.equipment_subtotal = normalize_float(summary.equipment_base_cost * summary.equipment_markup)
-    summary.equipment_profit = normalize_float(summary.equipment_subtotal - summary.equipment_base_cost)
-    
-    summary.labor_subtotal = normalize_float(summary.labor_base_cost * summary.labor_markup)
-    summary.labor_profit = normalize_float(summary.labor_subtotal - summary.labor_base_cost)
-    
-    summary.low_voltage_subtotal = normalize_float(summary.low_voltage_base_cost * summary.low_voltage_markup)
-    summary.low_voltage_profit = normalize_float(summary.low_voltage_subtotal - summary.low_voltage_base_cost)
-    
-    summary.permits_subtotal = normalize_float(summary.permits_base_cost * summary.permits_markup)
-    summary.permits_profit = normalize_float(summary.permits_subtotal - summary.permits_base_cost)
-    
-    # Calculate totals with normalization
-    taxable_profit = normalize_float(
-        summary.awg_profit + 
-        summary.conduit_profit + 
-        summary.misc_profit + 
-        summary.equipment_profit + 
-        summary.labor_profit + 
-        summary.low_voltage_profit + 
-        summary.permits_profit
-    )
-    
-    summary.tax_base_cost = taxable_profit
-    summary.tax_subtotal = normalize_float(taxable_profit * (summary.tax_percentage / 100))
-    
-    grand_subtotal = normalize_float(
-        summary.awg_subtotal + 
-        summary.conduit_subtotal + 
-        summary.misc_subtotal + 
-        summary.equipment_subtotal + 
-        summary.labor_subtotal + 
-        summary.low_voltage_subtotal + 
-        summary.permits_subtotal
+def _recalculate_summary_totals(summary, chargers_count):
+    """Recalculate all derived values in the summary"""
+    totals = calc.summary_totals(
+        {category: getattr(summary, f'{category}_base_cost') for category in calc.SUMMARY_CATEGORIES},
+        {category: getattr(summary, f'{category}_markup') for category in calc.SUMMARY_CATEGORIES},
+        summary.tax_percentage,
+        summary.overhead_percentage,
+        chargers_count,
+        summary.total_submitted
     )
-    
-    summary.grand_subtotal = grand_subtotal
-    summary.overhead_base_cost = grand_subtotal
-    summary.overhead_subtotal = normalize_float(grand_subtotal * (summary.overhead_percentage / 100))
-    summary.grand_total = normalize_float(grand_subtotal + summary.tax_subtotal + summary.overhead_subtotal)
-    
-    # Calculate price_per_charger (excluding low voltage)
-    if hasattr(summary, 'chargers_count') and summary.chargers_count > 0:
-        # Calculate total without low voltage (matches frontend logic)
-        total_without_low_voltage = normalize_float(
-            summary.grand_total - 
-            getattr(summary, 'low_voltage_subtotal', 0)
-        )
-        summary.price_per_charger = normalize_float(
-            total_without_low_voltage / summary.chargers_count
-        )
-    else:
-        summary.price_per_charger = 0.0
-
-    # Calculate price_per_charger_submitted
-    if summary.total_submitted and summary.project.labor_cost_estimations.first():
-        chargers_count = summary.project.labor_cost_estimations.first().chargers_count
-        if chargers_count > 0:
-            # Check if low_voltage_base_cost is zero
-            if summary.low_voltage_base_cost == 0:
-                summary.price_per_charger_submitted = normalize_float(summary.total_submitted / chargers_count)
-            else:
-                total_submitted_without_low_voltage = normalize_float(summary.total_submitted - summary.low_voltage_base_cost)
-                summary.price_per_charger_submitted = normalize_float(total_submitted_without_low_voltage / chargers_count)
-        else:
-            summary.price_per_charger_submitted = 0
-    else:
-        summary.price_per_charger_submitted = 0
+    for field, value in totals.items():
+        setattr(summary, field, value)
 
 
 @bp.route("/portfolio/projects/delete/<int:project_id>", methods=["POST"])
@@ -1322,8 +1452,11 @@ def delete_project(project_id):
         ProjectSummary.query.filter_by(project_id=project_id).delete()
         
         # Now delete the project
+        year = project.start_date.year
         db.session.delete(project)
+        analytics.refresh_rollups(session["user_id"], year)
         db.session.commit()
+        search.invalidate_user_search(session["user_id"])
         flash("Project deleted successfully", "success")
     except Exception as e:
         db.session.rollback()
@@ -1337,76 +1470,49 @@ def delete_project(project_id):
 @login_required
 def material_prices():
     """Render the material prices management page"""
-    suppliers = MaterialSupplier.query.order_by(MaterialSupplier.name).all()
-    construction_materials = ConstructionMaterial.query.order_by(ConstructionMaterial.name).all()
-    
-    # Preload latest prices for materials
-    for material in construction_materials:
-        material.latest_price = db.session.query(ConstructionPrice).filter_by(
-            material_id=material.id
-        ).order_by(ConstructionPrice.created_at.desc()).first()
-    
-    # Load unions with their positions and LATEST wage rates
-    unions = Union.query.options(
-        db.joinedload(Union.positions)
-    ).order_by(Union.name).all()
-
-    processed_unions = []
-    for union in unions:
-        union_data = {
-            'id': union.id,
-            'name': union.name,
-            'positions': []
-        }
-
-        for position in union.positions:
-            # Get the most recent wage rate for this position
-            latest_rate = db.session.query(UnionWageRate).filter_by(
-                position_id=position.id
-            ).order_by(UnionWageRate.effective_date.desc()).first()
-
-            union_data['positions'].append({
-                'id': position.id,
-                'name': position.name,
-                'is_apprentice': position.is_apprentice,
-                'apprentice_year': position.apprentice_year,
-                'rate': latest_rate.base_rate if latest_rate else None,
-                'effective_date': latest_rate.effective_date if latest_rate else None
-            })
+    wire_catalog = get_catalog(WIRE)
+    suppliers = [
+        {'id': supplier_id, 'name': supplier['name']}
+        for supplier_id, supplier in wire_catalog.items()
+    ]
 
-        processed_unions.append(union_data)
-    
     return render_template(
         "portfolio/material_prices.html",
         suppliers=suppliers,
-        construction_materials=construction_materials,
-        unions=processed_unions
+        construction_materials=get_catalog(CONSTRUCTION),
+        unions=get_catalog(UNION_RATES),
+        price_matrix=get_price_matrix()
     )
 
 
-def get_wire_price(supplier_id, awg):
-    """Helper function to get wire price for template"""
-    price = WirePrice.query.filter_by(supplier_id=supplier_id, awg=awg).first()
-    return price.price_per_foot if price else None
-
-def get_conduit_price(supplier_id, size):
-    """Helper function to get conduit price for template"""
-    price = ConduitPrice.query.filter_by(supplier_id=supplier_id, size=size).first()
-    return price.price_per_foot if price else None
+def _supplier_price_rows(data, key_name):
+    """Turn {supplier_id: {key: price}} into upsert rows, validating suppliers with one query"""
+    supplier_ids = {supplier_id for (supplier_id,) in db.session.query(MaterialSupplier.id)}
+    rows = []
+    skipped = 0
 
-def get_supplier_wire_update(supplier_id):
-    """Helper function to get latest wire update time for template"""
-    latest = db.session.query(
-        db.func.to_char(db.func.max(WirePrice.updated_at), 'YYYY-MM-DD HH24:MI:SS')
-    ).filter_by(supplier_id=supplier_id).scalar()
-    return latest or "Never"
+    for supplier_id, prices in data.items():
+        try:
+            supplier_id = int(supplier_id)
+        except (ValueError, TypeError):
+            supplier_id = None
+        if supplier_id not in supplier_ids or not isinstance(prices, dict):
+            current_app.logger.warning(f"Skipping prices for unknown supplier: {supplier_id}")
+            skipped += len(prices) if isinstance(prices, dict) else 1
+            continue
+
+        for key, price in prices.items():
+            if price is None:
+                skipped += 1
+                continue
+            try:
+                price = calc.money(calc.parse_decimal(price))
+            except ValueError:
+                skipped += 1
+                continue
+            rows.append({'supplier_id': supplier_id, key_name: key, 'price_per_foot': price})
 
-def get_supplier_conduit_update(supplier_id):
-    """Helper function to get latest conduit update time for template"""
-    latest = db.session.query(
-        db.func.to_char(db.func.max(ConduitPrice.updated_at), 'YYYY-MM-DD HH24:MI:SS')
-    ).filter_by(supplier_id=supplier_id).scalar()
-    return latest or "Never"
+    return rows, skipped
 
 
 @bp.route("/portfolio/api/wire_prices", methods=["GET", "POST"])
@@ -1419,33 +1525,24 @@ def wire_prices_api():
             if not data:
                 return jsonify({"success": False, "message": "No data provided"}), 400
             
-            for supplier_id, prices in data.items():
-                supplier = MaterialSupplier.query.get(supplier_id)
-                if not supplier:
-                    continue
-                
-                for awg, price in prices.items():
-                    if price is None:
-                        continue
-                        
-                    # Find existing price or create new
-                    wire_price = WirePrice.query.filter_by(
-                        supplier_id=supplier_id,
-                        awg=awg
-                    ).first()
-                    
-                    if wire_price:
-                        wire_price.price_per_foot = price
-                    else:
-                        wire_price = WirePrice(
-                            supplier_id=supplier_id,
-                            awg=awg,
-                            price_per_foot=price
-                        )
-                        db.session.add(wire_price)
+            rows, skipped = _supplier_price_rows(data, 'awg')
+            inserted, updated, unchanged, duplicates = upsert(
+                WirePrice, rows,
+                index_elements=['supplier_id', 'awg'],
+                update_columns=['price_per_foot'],
+                constraint='_supplier_awg_uc'
+            )
             
             db.session.commit()
-            return jsonify({"success": True, "message": "Wire prices updated successfully"})
+            invalidate_catalog(WIRE)
+            return jsonify({
+                "success": True,
+                "message": "Wire prices updated successfully",
+                "inserted": inserted,
+                "updated": updated,
+                "unchanged": unchanged,
+                "skipped": skipped + duplicates
+            })
             
         except Exception as e:
             db.session.rollback()
@@ -1453,17 +1550,7 @@ def wire_prices_api():
             return jsonify({"success": False, "message": f"Error updating prices: {str(e)}"}), 500
     
     # GET request - return all wire prices
-    suppliers = MaterialSupplier.query.order_by(MaterialSupplier.name).all()
-    result = {}
-    
-    for supplier in suppliers:
-        result[supplier.id] = {
-            "name": supplier.name,
-            "prices": {price.awg: price.price_per_foot for price in supplier.wire_prices},
-            "updated_at": max([price.updated_at for price in supplier.wire_prices], default=None)
-        }
-    
-    return jsonify(result)
+    return jsonify(get_catalog(WIRE))
 
 @bp.route("/portfolio/api/conduit_prices", methods=["GET", "POST"])
 @login_required
@@ -1475,33 +1562,24 @@ def conduit_prices_api():
             if not data:
                 return jsonify({"success": False, "message": "No data provided"}), 400
             
-            for supplier_id, prices in data.items():
-                supplier = MaterialSupplier.query.get(supplier_id)
-                if not supplier:
-                    continue
-                
-                for size, price in prices.items():
-                    if price is None:
-                        continue
-                        
-                    # Find existing price or create new
-                    conduit_price = ConduitPrice.query.filter_by(
-                        supplier_id=supplier_id,
-                        size=size
-                    ).first()
-                    
-                    if conduit_price:
-                        conduit_price.price_per_foot = price
-                    else:
-                        conduit_price = ConduitPrice(
-                            supplier_id=supplier_id,
-                            size=size,
-                            price_per_foot=price
-                        )
-                        db.session.add(conduit_price)
+            rows, skipped = _supplier_price_rows(data, 'size')
+            inserted, updated, unchanged, duplicates = upsert(
+                ConduitPrice, rows,
+                index_elements=['supplier_id', 'size'],
+                update_columns=['price_per_foot'],
+                constraint='_supplier_size_uc'
+            )
             
             db.session.commit()
-            return jsonify({"success": True, "message": "Conduit prices updated successfully"})
+            invalidate_catalog(CONDUIT)
+            return jsonify({
+                "success": True,
+                "message": "Conduit prices updated successfully",
+                "inserted": inserted,
+                "updated": updated,
+                "unchanged": unchanged,
+                "skipped": skipped + duplicates
+            })
             
         except Exception as e:
             db.session.rollback()
@@ -1509,17 +1587,7 @@ def conduit_prices_api():
             return jsonify({"success": False, "message": f"Error updating prices: {str(e)}"}), 500
     
     # GET request - return all conduit prices
-    suppliers = MaterialSupplier.query.order_by(MaterialSupplier.name).all()
-    result = {}
-    
-    for supplier in suppliers:
-        result[supplier.id] = {
-            "name": supplier.name,
-            "prices": {price.size: price.price_per_foot for price in supplier.conduit_prices},
-            "updated_at": max([price.updated_at for price in supplier.conduit_prices], default=None)
-        }
-    
-    return jsonify(result)
+    return jsonify(get_catalog(CONDUIT))
 
 
 @bp.route("/portfolio/api/construction_prices", methods=["GET", "POST"])
@@ -1548,6 +1616,7 @@ def construction_prices_api():
                 db.session.add(new_price)
             
             db.session.commit()
+            invalidate_catalog(CONSTRUCTION)
             return jsonify({"success": True, "message": "Construction prices updated successfully"})
             
         except Exception as e:
@@ -1556,38 +1625,157 @@ def construction_prices_api():
             return jsonify({"success": False, "message": f"Error updating prices: {str(e)}"}), 500
     
     # GET request - return all construction materials with their latest prices
-    materials = ConstructionMaterial.query.options(
-        db.joinedload(ConstructionMaterial.prices)
-    ).order_by(ConstructionMaterial.name).all()
-    
     result = {}
-    for material in materials:
-        latest_price = material.prices.order_by(ConstructionPrice.created_at.desc()).first()
-        result[material.id] = {
-            "name": material.name,
-            "price": latest_price.price if latest_price else None,
-            "updated_at": latest_price.updated_at if latest_price else None
+    for material in get_catalog(CONSTRUCTION):
+        latest_price = material["latest_price"]
+        result[material["id"]] = {
+            "name": material["name"],
+            "price": latest_price["price"] if latest_price else None,
+            "updated_at": latest_price["updated_at"] if latest_price else None
         }
     
     return jsonify(result)
 
+@bp.route("/portfolio/api/price_cache", methods=["GET"])
+@login_required
+def price_cache_stats():
+    """Hit/miss counters and versions of the in-process price catalogs"""
+    return jsonify(price_cache.stats())
+
 @bp.route("/portfolio/api/construction_price_history/<int:material_id>", methods=["GET"])
 @login_required
 def construction_price_history(material_id):
-    """Get price history for a construction material"""
+    """
+    Price history for a construction material, newest first. Optional
+    ``from``/``to`` bound created_at (YYYY-MM-DD or ISO datetime), ``limit``
+    caps the page and ``cursor`` continues from a previous page's
+    ``next_cursor``. With ``bucket`` set to day, week or month the prices are
+    summarized per bucket as count/min/avg/max/last.
+    """
     material = ConstructionMaterial.query.get_or_404(material_id)
-    prices = material.prices.order_by(ConstructionPrice.created_at.desc()).all()
-    
+
+    bucket = request.args.get('bucket')
+    if bucket is not None and bucket not in price_history.BUCKETS:
+        return jsonify({"success": False, "message": "bucket must be one of day, week or month"}), 400
+
+    try:
+        start = price_history.parse_bound(request.args['from']) if request.args.get('from') else None
+        end = price_history.parse_bound(request.args['to'], end=True) if request.args.get('to') else None
+    except ValueError:
+        return jsonify({"success": False, "message": "Invalid from/to. Use YYYY-MM-DD or an ISO datetime"}), 400
+
+    limit = max(1, min(request.args.get('limit', type=int, default=price_history.DEFAULT_LIMIT), price_history.MAX_LIMIT))
+    cursor = None
+    if request.args.get('cursor'):
+        cursor = price_history.decode_cursor(request.args['cursor'], 1 if bucket else 2)
+        if cursor is None:
+            return jsonify({"success": False, "message": "Invalid cursor"}), 400
+
+    if bucket:
+        buckets, next_cursor = price_history.price_buckets(material_id, bucket, start, end, limit, cursor)
+        return jsonify({
+            "material": material.name,
+            "bucket": bucket,
+            "buckets": buckets,
+            "next_cursor": next_cursor
+        })
+
+    prices, next_cursor = price_history.price_page(material_id, start, end, limit, cursor)
     return jsonify({
         "material": material.name,
         "prices": [{
             "price": price.price,
             "created_at": price.created_at.isoformat(),
             "updated_at": price.updated_at.isoformat()
-        } for price in prices]
+        } for price in prices],
+        "next_cursor": next_cursor
     })
 
 
+def _parse_union_rate_row(row, unions, positions):
+    """Validate one rate-sheet row, returning (values, errors)"""
+    errors = []
+    values = {}
+
+    try:
+        values['union_id'] = int(row.get('union_id'))
+        if values['union_id'] not in unions:
+            errors.append(f"Union not found: {values['union_id']}")
+    except (ValueError, TypeError):
+        errors.append("union_id must be an integer")
+
+    try:
+        values['position_id'] = int(row.get('position_id'))
+        position_union = positions.get(values['position_id'])
+        if position_union is None:
+            errors.append(f"Position not found: {values['position_id']}")
+        elif 'union_id' in values and position_union != values['union_id']:
+            errors.append(f"Position {values['position_id']} does not belong to union {values['union_id']}")
+    except (ValueError, TypeError):
+        errors.append("position_id must be an integer")
+
+    try:
+        values['base_rate'] = calc.money(calc.parse_decimal(row.get('rate')))
+        if values['base_rate'] < 0:
+            errors.append("rate cannot be negative")
+    except (ValueError, TypeError):
+        errors.append("rate must be a number")
+
+    try:
+        values['effective_date'] = datetime.strptime(str(row.get('effective_date')).strip(), '%Y-%m-%d').date()
+    except ValueError:
+        errors.append("Invalid effective_date. Use YYYY-MM-DD")
+
+    return values, errors
+
+
+def _validate_union_rate_rows(rows):
+    """
+    Check a whole rate sheet against prefetched unions and positions.
+    Returns (valid_rows, errors) where errors are reported per row number.
+    """
+    unions = {union_id for (union_id,) in db.session.query(Union.id)}
+    positions = dict(db.session.query(UnionPosition.id, UnionPosition.union_id).all())
+
+    valid_rows = []
+    errors = []
+    seen = {}
+
+    for number, row in enumerate(rows, start=1):
+        if not isinstance(row, dict):
+            errors.append({"row": number, "errors": ["Row must be an object"]})
+            continue
+
+        values, row_errors = _parse_union_rate_row(row, unions, positions)
+        if not row_errors:
+            key = (values['union_id'], values['position_id'], values['effective_date'])
+            if key in seen:
+                row_errors.append(f"Duplicate of row {seen[key]}")
+            else:
+                seen[key] = number
+
+        if row_errors:
+            errors.append({"row": number, "errors": row_errors})
+        else:
+            valid_rows.append(values)
+
+    return valid_rows, errors
+
+
+def _upsert_union_rates(rows):
+    """
+    Write validated rows with one upsert on _union_position_date_uc. Returns
+    (inserted, updated, unchanged, duplicates); validation already rejects
+    duplicate rows. Does not commit.
+    """
+    return upsert(
+        UnionWageRate, rows,
+        index_elements=['union_id', 'position_id', 'effective_date'],
+        update_columns=['base_rate'],
+        constraint='_union_position_date_uc'
+    )
+
+
 @bp.route("/portfolio/api/union_rates", methods=["POST"])
 @login_required
 def union_rates_api():
@@ -1596,54 +1784,151 @@ def union_rates_api():
         if not data:
             return jsonify({"success": False, "message": "No data provided"}), 400
 
+        # Flatten {union_id: {position_id: {rate, effective_date}}} into sheet rows
+        rows = []
         for union_id, positions in data.items():
-            # Validate union exists
-            if not Union.query.get(union_id):
-                current_app.logger.warning(f"Union not found: {union_id}")
+            if not isinstance(positions, dict):
                 continue
-
             for position_id, rate_data in positions.items():
-                try:
-                    # Validate required fields
-                    if not rate_data or 'rate' not in rate_data or 'effective_date' not in rate_data:
-                        current_app.logger.warning(f"Missing fields in position {position_id}")
-                        continue
-
-                    # Parse and validate date
-                    try:
-                        effective_date = datetime.strptime(rate_data['effective_date'], '%Y-%m-%d').date()
-                    except ValueError:
-                        return jsonify({
-                            "success": False,
-                            "message": f"Invalid date format for position {position_id}. Use YYYY-MM-DD"
-                        }), 400
-
-                    # Find or create rate
-                    rate = UnionWageRate.query.filter_by(
-                        union_id=union_id,
-                        position_id=position_id,
-                        effective_date=effective_date
-                    ).first()
-
-                    if rate:
-                        rate.base_rate = float(rate_data['rate'])
-                    else:
-                        rate = UnionWageRate(
-                            union_id=int(union_id),
-                            position_id=int(position_id),
-                            base_rate=float(rate_data['rate']),
-                            effective_date=effective_date
-                        )
-                        db.session.add(rate)
-
-                except (ValueError, KeyError) as e:
-                    current_app.logger.error(f"Error processing position {position_id}: {str(e)}")
+                # Blank inputs are sent as null rates and mean "leave unchanged"
+                if not rate_data or rate_data.get('rate') is None:
                     continue
+                rows.append({
+                    'union_id': union_id,
+                    'position_id': position_id,
+                    'rate': rate_data.get('rate'),
+                    'effective_date': rate_data.get('effective_date')
+                })
+
+        valid_rows, errors = _validate_union_rate_rows(rows)
+        if errors:
+            return jsonify({
+                "success": False,
+                "message": "; ".join(f"Row {e['row']}: {', '.join(e['errors'])}" for e in errors),
+                "errors": errors
+            }), 400
 
+        inserted, updated, unchanged, _ = _upsert_union_rates(valid_rows)
         db.session.commit()
-        return jsonify({"success": True, "message": "Union rates updated successfully"})
+        invalidate_catalog(UNION_RATES)
+        wage_rates.invalidate()
+        return jsonify({
+            "success": True,
+            "message": "Union rates updated successfully",
+            "inserted": inserted,
+            "updated": updated,
+            "unchanged": unchanged
+        })
 
     except Exception as e:
         db.session.rollback()
         current_app.logger.error(f"Error updating union rates: {str(e)}", exc_info=True)
-        return jsonify({"success": False, "message": str(e)}), 500
\ No newline at end of file
+        return jsonify({"success": False, "message": str(e)}), 500
+
+
+@bp.route("/portfolio/api/union_rates/import", methods=["POST"])
+@login_required
+def union_rates_import():
+    """
+    Bulk-load a rate sheet given as a JSON list of rows or as CSV, each row
+    with union_id, position_id, rate and effective_date. Valid rows are
+    written; invalid ones are reported back by row number.
+    """
+    try:
+        if 'file' in request.files:
+            rows = list(csv.DictReader(io.StringIO(request.files['file'].read().decode('utf-8-sig'))))
+        elif request.mimetype == 'text/csv':
+            rows = list(csv.DictReader(io.StringIO(request.get_data(as_text=True))))
+        else:
+            data = request.get_json(silent=True)
+            rows = data.get('rows') if isinstance(data, dict) else data
+
+        if not rows or not isinstance(rows, list):
+            return jsonify({"success": False, "message": "No rows provided"}), 400
+
+        valid_rows, errors = _validate_union_rate_rows(rows)
+        if not valid_rows:
+            return jsonify({
+                "success": False,
+                "message": "No valid rows to import",
+                "rows": len(rows),
+                "errors": errors
+            }), 400
+
+        inserted, updated, unchanged, _ = _upsert_union_rates(valid_rows)
+        db.session.commit()
+        invalidate_catalog(UNION_RATES)
+        wage_rates.invalidate()
+        return jsonify({
+            "success": True,
+            "message": "Union rate sheet imported",
+            "rows": len(rows),
+            "inserted": inserted,
+            "updated": updated,
+            "unchanged": unchanged,
+            "errors": errors
+        })
+
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Error importing union rates: {str(e)}", exc_info=True)
+        return jsonify({"success": False, "message": str(e)}), 500
+
+
+@bp.route("/portfolio/api/union_rates/as_of", methods=["GET"])
+@login_required
+def union_rate_as_of():
+    """The rate of one position in force on a date (default today)"""
+    try:
+        position_id = int(request.args.get('position_id'))
+        on_date = request.args.get('date')
+        on_date = datetime.strptime(on_date, '%Y-%m-%d').date() if on_date else datetime.utcnow().date()
+    except (ValueError, TypeError):
+        return jsonify({"success": False, "message": "Provide an integer position_id and a date as YYYY-MM-DD"}), 400
+
+    found = wage_rates.rate_on(position_id, on_date)
+    if found is None:
+        return jsonify({"success": False, "message": f"No rate in force for position {position_id} on {on_date}"}), 404
+
+    rate, effective_date = found
+    return jsonify({
+        "success": True,
+        "position_id": position_id,
+        "date": on_date.isoformat(),
+        "rate": rate,
+        "effective_date": effective_date.isoformat()
+    })
+
+
+@bp.route("/portfolio/api/union_rates/resolve", methods=["POST"])
+@login_required
+def union_rates_resolve():
+    """
+    Resolve a union's rates for the labor entries of many projects at each
+    project's start date. Takes {"union_id": ..., "project_ids": [...]}.
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        union_id = int(data.get('union_id'))
+        project_ids = [int(project_id) for project_id in data.get('project_ids') or []]
+    except (ValueError, TypeError):
+        return jsonify({"success": False, "message": "Provide an integer union_id and a list of project_ids"}), 400
+
+    if not wage_rates.get_history().has_union(union_id):
+        return jsonify({"success": False, "message": f"Union not found: {union_id}"}), 404
+
+    resolved = wage_rates.resolve_projects(union_id, project_ids, user_id=session["user_id"])
+    return jsonify({
+        "success": True,
+        "union_id": union_id,
+        "projects": {
+            str(project_id): {
+                "start_date": project["start_date"].isoformat(),
+                "entries": [
+                    dict(entry, effective_date=entry["effective_date"].isoformat() if entry["effective_date"] else None)
+                    for entry in project["entries"]
+                ]
+            }
+            for project_id, project in resolved.items()
+        }
+    })
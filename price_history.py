@@ -0,0 +1,155 @@
+"""
+Construction material price history, bounded and downsampled.
+
+Every construction price POST appends a row, so a material's history grows
+without limit. Reads here are limited to a created_at range and a page size
+and walk the (material_id, created_at) index newest first. Pages continue
+from an opaque cursor. Bucketed reads return min/avg/max/last per day, ISO
+week (starting Monday) or month. On Postgres the buckets are grouped in SQL
+with date_trunc; other engines stream the rows and group them here.
+"""
+
+import base64
+import json
+from datetime import datetime, timedelta
+
+from sqlalchemy.dialects.postgresql import aggregate_order_by, array_agg
+
+from database import db, dialect_name
+from estimator import calc
+from models import ConstructionPrice
+
+BUCKETS = ('day', 'week', 'month')
+DEFAULT_LIMIT = 500
+MAX_LIMIT = 1000
+
+
+def parse_bound(value, end=False):
+    """
+    A YYYY-MM-DD date or ISO datetime range bound. A bare ``to`` date covers
+    that whole day, so it becomes the following midnight (the range is
+    half-open). Raises ValueError for anything else.
+    """
+    if len(value) == 10:
+        day = datetime.strptime(value, '%Y-%m-%d')
+        return day + timedelta(days=1) if end else day
+    return datetime.fromisoformat(value)
+
+
+def encode_cursor(*values):
+    raw = json.dumps([value.isoformat() if isinstance(value, datetime) else value for value in values]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor, size):
+    """The ``size`` values of a cursor, datetimes first, or None if it is malformed"""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        if not isinstance(values, list) or len(values) != size:
+            return None
+        return [datetime.fromisoformat(values[0])] + [int(value) for value in values[1:]]
+    except (ValueError, TypeError):
+        return None
+
+
+def _in_range(query, start, end):
+    if start is not None:
+        query = query.filter(ConstructionPrice.created_at >= start)
+    if end is not None:
+        query = query.filter(ConstructionPrice.created_at < end)
+    return query
+
+
+def price_page(material_id, start=None, end=None, limit=DEFAULT_LIMIT, cursor=None):
+    """
+    Up to ``limit`` prices, newest first, and the cursor of the next page
+    (None on the last). ``cursor`` is the (created_at, id) the previous page
+    stopped at.
+    """
+    query = _in_range(db.session.query(
+        ConstructionPrice.id, ConstructionPrice.price, ConstructionPrice.created_at, ConstructionPrice.updated_at
+    ).filter(ConstructionPrice.material_id == material_id), start, end)
+    if cursor:
+        query = query.filter(db.tuple_(ConstructionPrice.created_at, ConstructionPrice.id) < db.tuple_(*cursor))
+
+    rows = query.order_by(ConstructionPrice.created_at.desc(), ConstructionPrice.id.desc()).limit(limit + 1).all()
+    next_cursor = encode_cursor(rows[limit - 1].created_at, rows[limit - 1].id) if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+
+def bucket_start(moment, bucket):
+    """Midnight starting the day, Monday-based week or month ``moment`` falls in, like Postgres date_trunc"""
+    day = moment.date() if isinstance(moment, datetime) else moment
+    if bucket == 'week':
+        day -= timedelta(days=day.weekday())
+    elif bucket == 'month':
+        day = day.replace(day=1)
+    return datetime.combine(day, datetime.min.time())
+
+
+def _buckets_postgres(query, bucket, limit):
+    # A literal unit (validated against BUCKETS) so SELECT, GROUP BY and ORDER BY share one expression
+    start = db.func.date_trunc(db.literal_column(f"'{bucket}'"), ConstructionPrice.created_at)
+    # The newest price of each bucket: first element of the bucket's prices ordered newest first
+    last = array_agg(aggregate_order_by(
+        ConstructionPrice.price, ConstructionPrice.created_at.desc(), ConstructionPrice.id.desc()
+    ))[1]
+    return query.with_entities(
+        start.label('start'),
+        db.func.count(),
+        db.func.min(ConstructionPrice.price),
+        db.func.avg(ConstructionPrice.price),
+        db.func.max(ConstructionPrice.price),
+        last
+    ).group_by(start).order_by(start.desc()).limit(limit + 1).all()
+
+
+def _buckets_streamed(query, bucket, limit):
+    """Same rows as the Postgres query, grouping prices read newest first until limit + 1 buckets are seen"""
+    rows = query.with_entities(ConstructionPrice.price, ConstructionPrice.created_at).order_by(
+        ConstructionPrice.created_at.desc(), ConstructionPrice.id.desc()
+    )
+
+    buckets = []
+    for price, created_at in rows.yield_per(1000):
+        start = bucket_start(created_at, bucket)
+        if not buckets or buckets[-1][0] != start:
+            if len(buckets) > limit:
+                break
+            # Prices arrive newest first, so the first one seen is the bucket's last
+            buckets.append([start, 0, price, 0, price, price])
+        entry = buckets[-1]
+        entry[1] += 1
+        entry[2] = min(entry[2], price)
+        entry[3] += price
+        entry[4] = max(entry[4], price)
+    for entry in buckets:
+        entry[3] = entry[3] / entry[1]
+    return buckets
+
+
+def price_buckets(material_id, bucket, start=None, end=None, limit=DEFAULT_LIMIT, cursor=None):
+    """
+    Up to ``limit`` buckets, newest first, each with count, min, avg, max
+    and last price, and the cursor of the next page. ``cursor`` is the start
+    of the oldest bucket on the previous page.
+    """
+    query = _in_range(ConstructionPrice.query.filter(ConstructionPrice.material_id == material_id), start, end)
+    if cursor:
+        query = query.filter(ConstructionPrice.created_at < cursor[0])
+
+    if dialect_name() == 'postgresql':
+        rows = _buckets_postgres(query, bucket, limit)
+    else:
+        rows = _buckets_streamed(query, bucket, limit)
+
+    next_cursor = encode_cursor(rows[limit - 1][0]) if len(rows) > limit else None
+    buckets = [{
+        "start": (row_start.date() if isinstance(row_start, datetime) else row_start).isoformat(),
+        "count": count,
+        "min": low,
+        "avg": calc.money(average),
+        "max": high,
+        "last": last,
+    } for row_start, count, low, average, high, last in rows[:limit]]
+    return buckets, next_cursor
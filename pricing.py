@@ -0,0 +1,200 @@
+import os
+
+from flask import g
+
+from cache import VersionedCache
+from database import db, latest_rows
+from models import MaterialSupplier, WirePrice, ConduitPrice, ConstructionMaterial, ConstructionPrice, Union, UnionPosition, UnionWageRate
+
+
+# Catalog names, one namespace each in the price cache
+WIRE = 'wire'
+CONDUIT = 'conduit'
+CONSTRUCTION = 'construction'
+UNION_RATES = 'union_rates'
+
+# Prices change a few times a week, so every worker keeps its own copy of the
+# catalogs; POST handlers invalidate them and the TTL bounds cross-worker staleness
+price_cache = VersionedCache(ttl=int(os.getenv("PRICE_CACHE_TTL", "300")))
+
+
+def _load_supplier_catalog(model, key_column):
+    """Suppliers ordered by name, each with its {gauge/size: price} map and latest update"""
+    suppliers = db.session.query(
+        MaterialSupplier.id,
+        MaterialSupplier.name
+    ).order_by(MaterialSupplier.name).all()
+
+    catalog = {
+        supplier.id: {"name": supplier.name, "prices": {}, "updated_at": None}
+        for supplier in suppliers
+    }
+
+    rows = db.session.query(
+        model.supplier_id,
+        key_column,
+        model.price_per_foot,
+        model.updated_at
+    ).all()
+
+    for supplier_id, key, price, updated_at in rows:
+        entry = catalog.get(supplier_id)
+        if entry is None:
+            continue
+        entry["prices"][key] = price
+        if updated_at and (entry["updated_at"] is None or updated_at > entry["updated_at"]):
+            entry["updated_at"] = updated_at
+
+    return catalog
+
+
+def load_wire_catalog():
+    return _load_supplier_catalog(WirePrice, WirePrice.awg)
+
+
+def load_conduit_catalog():
+    return _load_supplier_catalog(ConduitPrice, ConduitPrice.size)
+
+
+def load_construction_catalog():
+    """Construction materials ordered by name with their latest price, in one statement"""
+    latest = latest_rows(
+        ConstructionPrice.material_id,
+        (ConstructionPrice.created_at.desc(), ConstructionPrice.id.desc()),
+        (ConstructionPrice.material_id, ConstructionPrice.price, ConstructionPrice.updated_at)
+    )
+    rows = db.session.query(
+        ConstructionMaterial.id,
+        ConstructionMaterial.name,
+        latest.c.price,
+        latest.c.updated_at
+    ).outerjoin(latest, latest.c.material_id == ConstructionMaterial.id).order_by(ConstructionMaterial.name).all()
+
+    return [
+        {
+            "id": material_id,
+            "name": name,
+            "latest_price": {
+                "price": price,
+                "updated_at": updated_at
+            } if price is not None else None
+        }
+        for material_id, name, price, updated_at in rows
+    ]
+
+
+def load_union_rates_catalog():
+    """Unions with their positions and the latest wage rate of each position, in one statement"""
+    latest = latest_rows(
+        UnionWageRate.position_id,
+        (UnionWageRate.effective_date.desc(), UnionWageRate.id.desc()),
+        (UnionWageRate.position_id, UnionWageRate.base_rate, UnionWageRate.effective_date)
+    )
+    rows = db.session.query(
+        Union.id,
+        Union.name,
+        UnionPosition.id.label('position_id'),
+        UnionPosition.name.label('position_name'),
+        UnionPosition.is_apprentice,
+        UnionPosition.apprentice_year,
+        latest.c.base_rate,
+        latest.c.effective_date
+    ).outerjoin(UnionPosition, UnionPosition.union_id == Union.id).outerjoin(
+        latest, latest.c.position_id == UnionPosition.id
+    ).order_by(Union.name, Union.id, UnionPosition.name).all()
+
+    catalog = []
+    unions = {}
+    for row in rows:
+        union_data = unions.get(row.id)
+        if union_data is None:
+            union_data = unions[row.id] = {
+                'id': row.id,
+                'name': row.name,
+                'positions': []
+            }
+            catalog.append(union_data)
+
+        if row.position_id is not None:
+            union_data['positions'].append({
+                'id': row.position_id,
+                'name': row.position_name,
+                'is_apprentice': row.is_apprentice,
+                'apprentice_year': row.apprentice_year,
+                'rate': row.base_rate,
+                'effective_date': row.effective_date
+            })
+
+    return catalog
+
+
+_LOADERS = {
+    WIRE: load_wire_catalog,
+    CONDUIT: load_conduit_catalog,
+    CONSTRUCTION: load_construction_catalog,
+    UNION_RATES: load_union_rates_catalog,
+}
+
+
+def get_catalog(name):
+    """Return a cached catalog, loading it from the database on a miss or after invalidation"""
+    return price_cache.get(name, _LOADERS[name])
+
+
+def invalidate_catalog(name):
+    """Call after committing a price change so the next read reloads the catalog"""
+    price_cache.invalidate(name)
+    g.pop('price_matrix', None)
+
+
+class PriceMatrix:
+    """Every supplier's wire and conduit prices, read in memory"""
+
+    def __init__(self, wire_catalog, conduit_catalog):
+        self.wire_catalog = wire_catalog
+        self.conduit_catalog = conduit_catalog
+
+    @classmethod
+    def load(cls):
+        """Build the supplier x gauge/size matrix from the cached catalogs"""
+        return cls(get_catalog(WIRE), get_catalog(CONDUIT))
+
+    def wire_price(self, supplier_id, awg):
+        return self.wire_catalog.get(supplier_id, {}).get("prices", {}).get(awg)
+
+    def conduit_price(self, supplier_id, size):
+        return self.conduit_catalog.get(supplier_id, {}).get("prices", {}).get(size)
+
+    def wire_update(self, supplier_id):
+        return _format_update(self.wire_catalog.get(supplier_id, {}).get("updated_at"))
+
+    def conduit_update(self, supplier_id):
+        return _format_update(self.conduit_catalog.get(supplier_id, {}).get("updated_at"))
+
+
+def _format_update(value):
+    return value.strftime('%Y-%m-%d %H:%M:%S') if value else "Never"
+
+
+def get_price_matrix():
+    """Return the price matrix for the current request, loading it on first use"""
+    if 'price_matrix' not in g:
+        g.price_matrix = PriceMatrix.load()
+    return g.price_matrix
+
+
+def get_wire_price(supplier_id, awg):
+    """Helper function to get wire price for template"""
+    return get_price_matrix().wire_price(supplier_id, awg)
+
+def get_conduit_price(supplier_id, size):
+    """Helper function to get conduit price for template"""
+    return get_price_matrix().conduit_price(supplier_id, size)
+
+def get_supplier_wire_update(supplier_id):
+    """Helper function to get latest wire update time for template"""
+    return get_price_matrix().wire_update(supplier_id)
+
+def get_supplier_conduit_update(supplier_id):
+    """Helper function to get latest conduit update time for template"""
+    return get_price_matrix().conduit_update(supplier_id)
@@ -0,0 +1,372 @@
+"""
+What-if repricing across a portfolio.
+
+Given price or rate changes (a supplier's wire gauge or conduit size, a
+construction material, a union position) this loads the estimation entries
+of every project in scope with one query per table, applies the changes in
+memory and recomputes each project with estimator.calc. Nothing is written.
+
+Estimation entries keep only the item name and the cost that was entered,
+not the supplier or union it came from. A change scoped to a supplier or a
+union position therefore matches the entries for that item whose cost is
+that supplier's (or position's) current price.
+"""
+
+import json
+import re
+from collections import OrderedDict
+
+import click
+
+from flask import Blueprint
+from flask import current_app
+from flask import jsonify
+from flask import request
+from flask import session
+
+from auth import login_required
+from database import db, latest_row_per
+from estimator import calc
+from models import (
+    Project, ProjectSummary, CostEstimation, EstimationEntry, MiscEquipmentEstimation, MiscEquipmentEntry,
+    LaborCostEstimation, LaborCostEntry
+)
+from pricing import get_catalog, WIRE, CONDUIT, CONSTRUCTION, UNION_RATES
+
+
+bp = Blueprint("repricing", __name__, cli_group="repricing")
+
+DELTA_TYPES = ("wire", "conduit", "material", "union_rate")
+
+# Delta type that reprices each kind of estimation entry
+ENTRY_KINDS = {"AWG": "wire", "Conduit": "conduit", "Miscellaneous": "material", "Equipment": "material"}
+# Position of the repriced value in each section's calc entry tuples
+COST_FIELD = {"wire": 1, "misc": 1, "labor": 0}
+
+
+def normalize_name(name):
+    """Compare item names loosely: "AWG 4/0" matches "4/0" and 1'' matches 1\""""
+    name = (name or "").lower().replace("awg", "")
+    return re.sub(r"[\s'\"]+", "", name)
+
+
+class Delta:
+    """One price or rate change and the entries it applies to"""
+
+    def __init__(self, kind, name, match_cost=None, price=None, percent=None):
+        self.kind = kind
+        self.name = name
+        self.key = normalize_name(name)
+        self.match_cost = match_cost
+        self.price = price
+        self.percent = percent
+
+    def matches(self, kind, name, cost):
+        if kind != self.kind or normalize_name(name) != self.key:
+            return False
+        return self.match_cost is None or calc.money(cost) == self.match_cost
+
+    def apply(self, cost):
+        if self.price is not None:
+            return self.price
+        return calc.money(calc.to_decimal(cost) * (calc.HUNDRED + self.percent) / calc.HUNDRED)
+
+    def describe(self):
+        change = f"${self.price}" if self.price is not None else f"{self.percent:+}%"
+        scope = f" priced at ${self.match_cost}" if self.match_cost is not None else ""
+        return f"{self.kind} {self.name}{scope} -> {change}"
+
+
+def _supplier_price(catalog_name, supplier_id, key):
+    supplier = get_catalog(catalog_name).get(supplier_id)
+    if supplier is None:
+        raise ValueError(f"Supplier {supplier_id} not found")
+    for name, price in supplier["prices"].items():
+        if normalize_name(name) == normalize_name(key):
+            return name, calc.money(price)
+    raise ValueError(f"Supplier {supplier_id} has no price for {key}")
+
+
+def parse_delta(raw):
+    """Build a Delta from a request or CLI dict; raises ValueError with a user-facing message"""
+    if not isinstance(raw, dict):
+        raise ValueError("Each delta must be an object")
+    kind = raw.get("type")
+    if kind not in DELTA_TYPES:
+        raise ValueError(f"Delta type must be one of {', '.join(DELTA_TYPES)}")
+
+    if ("price" in raw) == ("percent" in raw):
+        raise ValueError("Each delta needs either a price or a percent")
+    price = percent = None
+    if "price" in raw:
+        price = calc.money(calc.parse_decimal(raw["price"]))
+        if price < 0:
+            raise ValueError("Price cannot be negative")
+    else:
+        percent = calc.parse_decimal(raw["percent"])
+
+    match_cost = None
+    if kind in ("wire", "conduit"):
+        name = raw.get("gauge") if kind == "wire" else raw.get("size")
+        if not name:
+            raise ValueError(f"A {kind} delta needs a {'gauge' if kind == 'wire' else 'size'}")
+        if raw.get("supplier_id") is not None:
+            catalog = WIRE if kind == "wire" else CONDUIT
+            name, match_cost = _supplier_price(catalog, int(raw["supplier_id"]), name)
+
+    elif kind == "material":
+        name = raw.get("name")
+        if raw.get("material_id") is not None:
+            material = next((m for m in get_catalog(CONSTRUCTION) if m["id"] == int(raw["material_id"])), None)
+            if material is None:
+                raise ValueError(f"Material {raw['material_id']} not found")
+            name = material["name"]
+        if not name:
+            raise ValueError("A material delta needs a material_id or a name")
+
+    else:
+        name = raw.get("position")
+        if raw.get("position_id") is not None:
+            position = next(
+                (p for union in get_catalog(UNION_RATES) for p in union["positions"] if p["id"] == int(raw["position_id"])),
+                None
+            )
+            if position is None:
+                raise ValueError(f"Union position {raw['position_id']} not found")
+            name = position["name"]
+            if position["rate"] is not None:
+                match_cost = calc.money(position["rate"])
+        if not name:
+            raise ValueError("A union_rate delta needs a position_id or a position")
+
+    return Delta(kind, name, match_cost=match_cost, price=price, percent=percent)
+
+
+def _scope(user_id, include_closed):
+    """
+    Each project's newest summary by (created_at, id), the one the listing
+    shows; open projects are those whose newest summary is not yet approved
+    or rejected
+    """
+    latest = db.select(ProjectSummary.id).where(ProjectSummary.project_id == Project.id).order_by(
+        ProjectSummary.created_at.desc(), ProjectSummary.id.desc()
+    ).limit(1).correlate(Project).scalar_subquery()
+    query = db.session.query(ProjectSummary.id, ProjectSummary.project_id).join(
+        Project, Project.id == ProjectSummary.project_id
+    ).filter(ProjectSummary.id == latest)
+    if user_id is not None:
+        query = query.filter(Project.user_id == user_id)
+    if not include_closed:
+        query = query.filter(ProjectSummary.approved.is_(None))
+    return query
+
+
+def _latest_estimations(scope, model, columns, entry_model, entry_key, entry_columns):
+    """
+    Each in-scope project's newest estimation of ``model`` with its entries,
+    in one query that reads only that estimation:
+    {project_id: {"row": ..., "entries": [...]}}
+    """
+    latest, onclause = latest_row_per(
+        scope.c.project_id,
+        model.project_id,
+        [model.created_at.desc(), model.id.desc()],
+        [model.id] + columns
+    )
+    rows = db.session.query(
+        scope.c.project_id,
+        *[latest.c[column.key] for column in columns],
+        entry_model.id.label("entry_id"),
+        *entry_columns
+    ).select_from(scope).join(latest, onclause).outerjoin(
+        entry_model, getattr(entry_model, entry_key) == latest.c.id
+    ).order_by(scope.c.project_id, entry_model.id)
+
+    grouped = {}
+    for row in rows:
+        current = grouped.setdefault(row.project_id, {"row": row, "entries": []})
+        if row.entry_id is not None:
+            current["entries"].append(row)
+    return grouped
+
+
+def load_portfolio(user_id=None, include_closed=False):
+    """
+    Estimation inputs of every project in scope, keyed by project id, with
+    one query per table. Each value holds the project's address and company,
+    the calc.project_totals inputs and the entries as (kind, name, cost) so
+    deltas can be matched against them.
+    """
+    scope = _scope(user_id, include_closed).subquery()
+
+    summaries = db.session.query(ProjectSummary, Project.address, Project.company).join(
+        Project, Project.id == ProjectSummary.project_id
+    ).filter(ProjectSummary.id.in_(db.select(scope.c.id))).order_by(ProjectSummary.project_id).all()
+
+    wire = _latest_estimations(
+        scope, CostEstimation, [CostEstimation.tax_percentage],
+        EstimationEntry, "cost_estimation_id",
+        [EstimationEntry.type, EstimationEntry.name, EstimationEntry.cost, EstimationEntry.length.label("quantity")]
+    )
+
+    misc = _latest_estimations(
+        scope, MiscEquipmentEstimation, [MiscEquipmentEstimation.tax_percentage],
+        MiscEquipmentEntry, "misc_equipment_estimation_id",
+        [MiscEquipmentEntry.type, MiscEquipmentEntry.name, MiscEquipmentEntry.cost, MiscEquipmentEntry.quantity]
+    )
+
+    labor = _latest_estimations(
+        scope, LaborCostEstimation, [LaborCostEstimation.chargers_count, LaborCostEstimation.charger_price],
+        LaborCostEntry, "labor_cost_estimation_id",
+        [LaborCostEntry.position, LaborCostEntry.rate, LaborCostEntry.workers, LaborCostEntry.hours, LaborCostEntry.days]
+    )
+
+    portfolio = OrderedDict()
+    for summary, address, company in summaries:
+        inputs = {"summary": {
+            "markups": {c: getattr(summary, f"{c}_markup") for c in calc.SUMMARY_CATEGORIES},
+            "base_costs": {c: getattr(summary, f"{c}_base_cost") for c in calc.SUMMARY_CATEGORIES},
+            "tax_percentage": summary.tax_percentage,
+            "overhead_percentage": summary.overhead_percentage,
+            "total_submitted": summary.total_submitted,
+        }}
+        items = []
+
+        for section, loaded in (("wire", wire), ("misc", misc)):
+            data = loaded.get(summary.project_id)
+            if data:
+                entries = data["entries"]
+                inputs[section] = {
+                    "entries": [(e.type, e.cost, e.quantity) for e in entries],
+                    "tax_percentage": data["row"].tax_percentage,
+                }
+                items.append((section, [(ENTRY_KINDS.get(e.type), e.name, e.cost) for e in entries]))
+
+        data = labor.get(summary.project_id)
+        if data:
+            entries = data["entries"]
+            inputs["labor"] = {
+                "entries": [(e.rate, e.workers, e.hours, e.days) for e in entries],
+                "chargers_count": data["row"].chargers_count,
+                "charger_price": data["row"].charger_price,
+            }
+            items.append(("labor", [("union_rate", e.position, e.rate) for e in entries]))
+        else:
+            inputs["summary"]["chargers_count"] = 0
+
+        portfolio[summary.project_id] = {
+            "address": address,
+            "company": company,
+            "inputs": inputs,
+            "items": items,
+        }
+    return portfolio
+
+
+def _repriced(inputs, items, deltas):
+    """A copy of a project's inputs with the deltas applied, and how many entries changed"""
+    changed = 0
+    repriced = dict(inputs)
+    for section, section_items in items:
+        field = COST_FIELD[section]
+        entries = []
+        for entry, (kind, name, cost) in zip(inputs[section]["entries"], section_items):
+            delta = next((d for d in deltas if d.matches(kind, name, cost)), None)
+            if delta is not None:
+                changed += 1
+                entry = entry[:field] + (delta.apply(cost),) + entry[field + 1:]
+            entries.append(entry)
+        repriced[section] = dict(inputs[section], entries=entries)
+    return repriced, changed
+
+
+def what_if(deltas, user_id=None, include_closed=False):
+    """Before/after grand total and price per charger of every project the deltas touch"""
+    portfolio = load_portfolio(user_id, include_closed)
+
+    before_inputs, after_inputs, changed_entries = {}, {}, {}
+    for project_id, project in portfolio.items():
+        repriced, changed = _repriced(project["inputs"], project["items"], deltas)
+        if changed:
+            before_inputs[project_id] = project["inputs"]
+            after_inputs[project_id] = repriced
+            changed_entries[project_id] = changed
+
+    before = calc.portfolio_totals(before_inputs)
+    after = calc.portfolio_totals(after_inputs)
+
+    projects = []
+    for project_id in after_inputs:
+        old, new = before[project_id]["summary"], after[project_id]["summary"]
+        projects.append({
+            "project_id": project_id,
+            "address": portfolio[project_id]["address"],
+            "company": portfolio[project_id]["company"],
+            "entries_changed": changed_entries[project_id],
+            "before": {"grand_total": old["grand_total"], "price_per_charger": old["price_per_charger"]},
+            "after": {"grand_total": new["grand_total"], "price_per_charger": new["price_per_charger"]},
+            "grand_total_change": new["grand_total"] - old["grand_total"],
+        })
+    projects.sort(key=lambda p: abs(p["grand_total_change"]), reverse=True)
+
+    return {
+        "deltas": [delta.describe() for delta in deltas],
+        "projects_scanned": len(portfolio),
+        "projects_affected": len(projects),
+        "grand_total_before": sum((p["before"]["grand_total"] for p in projects), calc.ZERO),
+        "grand_total_after": sum((p["after"]["grand_total"] for p in projects), calc.ZERO),
+        "projects": projects,
+    }
+
+
+def _parse_deltas(raw_deltas):
+    if not isinstance(raw_deltas, list) or not raw_deltas:
+        raise ValueError("Provide a non-empty list of deltas")
+    return [parse_delta(raw) for raw in raw_deltas]
+
+
+@bp.route("/portfolio/api/what_if", methods=["POST"])
+@login_required
+def what_if_api():
+    data = request.get_json(silent=True) or {}
+    try:
+        deltas = _parse_deltas(data.get("deltas"))
+    except (ValueError, TypeError) as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+
+    try:
+        result = what_if(deltas, user_id=session["user_id"], include_closed=bool(data.get("include_closed")))
+    except Exception as e:
+        current_app.logger.error(f"Error running what-if repricing: {str(e)}", exc_info=True)
+        return jsonify({'success': False, 'message': f'An error occurred: {str(e)}'}), 500
+
+    return jsonify({'success': True, **result})
+
+
+@bp.cli.command("what-if")
+@click.option("--delta", "raw_deltas", multiple=True, required=True,
+              help='JSON delta, e.g. \'{"type": "wire", "supplier_id": 1, "gauge": "4/0", "price": 5.25}\'')
+@click.option("--user-id", type=int, help="Only this user's projects (default: everyone's)")
+@click.option("--include-closed", is_flag=True, help="Also reprice approved and rejected projects")
+@click.option("--json", "as_json", is_flag=True, help="Print the full result as JSON")
+def what_if_command(raw_deltas, user_id, include_closed, as_json):
+    """Show how price or rate changes would move every project's totals"""
+    try:
+        deltas = _parse_deltas([json.loads(raw) for raw in raw_deltas])
+    except (ValueError, TypeError) as e:
+        raise click.BadParameter(str(e), param_hint="--delta")
+
+    result = what_if(deltas, user_id=user_id, include_closed=include_closed)
+    if as_json:
+        click.echo(current_app.json.dumps(result, indent=2))
+        return
+
+    for description in result["deltas"]:
+        click.echo(f"Delta: {description}")
+    click.echo(f"{result['projects_affected']} of {result['projects_scanned']} projects affected; "
+               f"grand total ${result['grand_total_before']:,} -> ${result['grand_total_after']:,}")
+    for project in result["projects"]:
+        before, after = project["before"], project["after"]
+        click.echo(f"  #{project['project_id']:<6} {project['address'][:40]:<40} "
+                   f"${before['grand_total']:>12,} -> ${after['grand_total']:>12,}  "
+                   f"per charger ${before['price_per_charger']:>10,} -> ${after['price_per_charger']:>10,}")
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Throughput of the app under each gunicorn worker model.
+
+Starts gunicorn once per mode with gunicorn_config.py, logs in, and drives a
+fixed mix of read endpoints from concurrent clients, then prints requests per
+second and latency percentiles for every mode:
+
+    LOADTEST_EMAIL=me@example.com LOADTEST_PASSWORD=... \
+        python scripts/load_profile.py --modes gthread gevent sync --concurrency 32
+
+The database is whatever DATABASE_URL (or the DATABASE_* variables) point at,
+so run it against a copy that holds realistic data.
+"""
+
+import argparse
+import http.cookiejar
+import json
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+# Read-only pages and JSON endpoints a signed-in user hits most
+DEFAULT_PATHS = [
+    "/",
+    "/portfolio/projects",
+    "/portfolio/search?q=main",
+    "/portfolio/api/wire_prices",
+    "/portfolio/api/conduit_prices",
+    "/portfolio/material_prices",
+]
+
+
+def wait_for_server(base_url, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(base_url + "/auth/login", timeout=1)
+            return True
+        except (urllib.error.URLError, ConnectionError):
+            time.sleep(0.2)
+    return False
+
+
+def login(base_url, email, password):
+    """Session cookie for the load-test user"""
+    jar = http.cookiejar.CookieJar()
+    opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(jar))
+    data = urllib.parse.urlencode({"email": email, "password": password}).encode()
+    opener.open(base_url + "/auth/login", data=data, timeout=10)
+    cookies = {cookie.name: cookie.value for cookie in jar}
+    if "session" not in cookies:
+        raise SystemExit("Login failed; check LOADTEST_EMAIL and LOADTEST_PASSWORD")
+    return f"session={cookies['session']}"
+
+
+def fetch(base_url, path, cookie):
+    request = urllib.request.Request(base_url + path, headers={"Cookie": cookie})
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=30) as response:
+            response.read()
+            ok = response.status < 400
+    except (urllib.error.URLError, ConnectionError):
+        ok = False
+    return time.perf_counter() - start, ok
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def run_mode(mode, args, email, password):
+    port = str(args.port)
+    base_url = f"http://127.0.0.1:{port}"
+    env = dict(os.environ, GUNICORN_WORKER_CLASS=mode, PORT=port)
+
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn_config.py", "wsgi:app"],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL if not args.verbose else None,
+    )
+    try:
+        if not wait_for_server(base_url):
+            return {"mode": mode, "error": "server did not start"}
+
+        cookie = login(base_url, email, password)
+        paths = [args.paths[i % len(args.paths)] for i in range(args.requests)]
+
+        # Warm caches and connections so every mode is measured in steady state
+        for path in args.paths:
+            fetch(base_url, path, cookie)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            results = list(pool.map(lambda path: fetch(base_url, path, cookie), paths))
+        elapsed = time.perf_counter() - start
+
+        latencies = [latency for latency, ok in results if ok]
+        return {
+            "mode": mode,
+            "requests": len(results),
+            "errors": sum(1 for _, ok in results if not ok),
+            "rps": round(len(results) / elapsed, 1),
+            "p50_ms": round(percentile(latencies, 0.50) * 1000, 1),
+            "p95_ms": round(percentile(latencies, 0.95) * 1000, 1),
+            "mean_ms": round(statistics.fmean(latencies) * 1000, 1) if latencies else 0.0,
+        }
+    finally:
+        server.send_signal(signal.SIGTERM)
+        try:
+            server.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--modes", nargs="+", default=["gthread", "gevent", "sync"])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--paths", nargs="+", default=DEFAULT_PATHS)
+    parser.add_argument("--json", help="Also write the results to this file")
+    parser.add_argument("--verbose", action="store_true", help="Show gunicorn's own log")
+    args = parser.parse_args()
+
+    email = os.getenv("LOADTEST_EMAIL")
+    password = os.getenv("LOADTEST_PASSWORD")
+    if not email or not password:
+        raise SystemExit("Set LOADTEST_EMAIL and LOADTEST_PASSWORD to a user of the target database")
+
+    results = [run_mode(mode, args, email, password) for mode in args.modes]
+
+    print(f"{'mode':<10}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'mean ms':>10}{'errors':>8}")
+    for result in results:
+        if "error" in result:
+            print(f"{result['mode']:<10}  {result['error']}")
+            continue
+        print(f"{result['mode']:<10}{result['rps']:>10}{result['p50_ms']:>10}{result['p95_ms']:>10}{result['mean_ms']:>10}{result['errors']:>8}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
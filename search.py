@@ -0,0 +1,246 @@
+import os
+import re
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+from cache import VersionedCache
+from database import db, dialect_name, latest_row_per
+from models import Project, LaborCostEstimation
+
+
+SEARCH_LIMIT = int(os.getenv("SEARCH_LIMIT", "20"))
+# Queries shorter than this are not searched; one character matches almost everything
+MIN_QUERY_LENGTH = 2
+# Same default as pg_trgm.similarity_threshold, so both engines agree on what matches
+SIMILARITY_THRESHOLD = 0.3
+
+# Per-user n-gram indexes for engines without pg_trgm
+_index_cache = VersionedCache(ttl=int(os.getenv("SEARCH_INDEX_TTL", "600")))
+
+# Recent query results kept per user, and how many users keep them
+RESULT_CACHE_SIZE = int(os.getenv("SEARCH_RESULT_CACHE_SIZE", "32"))
+RESULT_CACHE_USERS = int(os.getenv("SEARCH_RESULT_CACHE_USERS", "256"))
+RESULT_CACHE_TTL = int(os.getenv("SEARCH_RESULT_CACHE_TTL", "120"))
+
+_WORD_RE = re.compile(r'[^\W_]+')
+
+
+def trigrams(text):
+    """Trigrams of text the way pg_trgm builds them: per lowercased word, padded with two spaces in front and one behind"""
+    grams = set()
+    for word in _WORD_RE.findall((text or '').lower()):
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def similarity(query_grams, text_grams):
+    """pg_trgm similarity(): shared trigrams over the trigrams of both strings"""
+    if not query_grams or not text_grams:
+        return 0.0
+    shared = len(query_grams & text_grams)
+    return shared / (len(query_grams) + len(text_grams) - shared)
+
+
+def match_score(query_grams, needle, row, address_grams=None, company_grams=None):
+    """Score of row for a query, or None when it matches neither by similarity nor as a substring"""
+    if address_grams is None:
+        address_grams = trigrams(row['address'])
+    if company_grams is None:
+        company_grams = trigrams(row['company'])
+    score = max(similarity(query_grams, address_grams), similarity(query_grams, company_grams))
+    if score >= SIMILARITY_THRESHOLD or needle in row['address'].lower() or needle in (row['company'] or '').lower():
+        return score
+    return None
+
+
+def _ranked(scored, limit):
+    scored.sort(key=lambda item: (item[0], item[1]), reverse=True)
+    return [dict(row, score=round(score, 4)) for score, _, row in scored[:limit]]
+
+
+class NgramIndex:
+    """In-memory trigram index over one user's project addresses and companies"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.address_grams = []
+        self.company_grams = []
+        self.postings = defaultdict(set)
+
+        for position, row in enumerate(rows):
+            address_grams = trigrams(row['address'])
+            company_grams = trigrams(row['company'])
+            self.address_grams.append(address_grams)
+            self.company_grams.append(company_grams)
+            for gram in address_grams | company_grams:
+                self.postings[gram].add(position)
+
+    def search(self, query, limit=SEARCH_LIMIT):
+        query_grams = trigrams(query)
+        needle = query.lower()
+
+        # Rows sharing a trigram with the query, plus substring matches
+        candidates = set()
+        for gram in query_grams:
+            candidates |= self.postings.get(gram, set())
+        candidates.update(
+            position for position, row in enumerate(self.rows)
+            if needle in row['address'].lower() or needle in (row['company'] or '').lower()
+        )
+
+        scored = []
+        for position in candidates:
+            row = self.rows[position]
+            score = match_score(query_grams, needle, row, self.address_grams[position], self.company_grams[position])
+            if score is not None:
+                scored.append((score, row['id'], row))
+
+        return _ranked(scored, limit)
+
+
+class ResultCache:
+    """
+    Bounded LRU of recent search results, kept separately for each user.
+
+    Live search sends one request per pause in typing and repeats queries as
+    the user edits them. Only exact (normalized) queries are served from
+    here: trigram similarity isn't monotonic as a query grows, so a longer
+    query can match rows its prefix never returned.
+    """
+
+    def __init__(self, size=RESULT_CACHE_SIZE, users=RESULT_CACHE_USERS, ttl=RESULT_CACHE_TTL):
+        self.size = size
+        self.users = users
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, user_id, key, limit):
+        """Cached results for key, or None on a miss"""
+        now = time.monotonic()
+        with self._lock:
+            entries = self._entries.get(user_id)
+            if entries is None:
+                return None
+            self._entries.move_to_end(user_id)
+
+            for stale in [k for k, entry in entries.items() if now - entry[0] >= self.ttl]:
+                del entries[stale]
+
+            # Usable when it was fetched with at least this limit, or held every match
+            entry = entries.get(key)
+            if entry and (entry[2] >= limit or len(entry[1]) < entry[2]):
+                entries.move_to_end(key)
+                return entry[1][:limit]
+            return None
+
+    def put(self, user_id, key, limit, results):
+        with self._lock:
+            entries = self._entries.setdefault(user_id, OrderedDict())
+            self._entries.move_to_end(user_id)
+            entries[key] = (time.monotonic(), results, limit)
+            entries.move_to_end(key)
+            while len(entries) > self.size:
+                entries.popitem(last=False)
+            while len(self._entries) > self.users:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+
+_result_cache = ResultCache()
+
+
+def _project_query(user_id, *columns):
+    """The user's projects with the chargers count of their newest labor estimation"""
+    # Probed per matched project (LATERAL LIMIT 1 on Postgres), not over every estimation of the user
+    labor, labor_on = latest_row_per(
+        Project.id,
+        LaborCostEstimation.project_id,
+        [LaborCostEstimation.created_at.desc(), LaborCostEstimation.id.desc()],
+        [LaborCostEstimation.id, LaborCostEstimation.chargers_count]
+    )
+    return db.session.query(
+        Project.id,
+        Project.address,
+        Project.company,
+        Project.p_type,
+        labor.c.chargers_count,
+        *columns
+    ).select_from(Project).outerjoin(
+        labor, labor_on
+    ).filter(Project.user_id == user_id)
+
+
+def _as_dict(row, **extra):
+    return dict({
+        "id": row.id,
+        "address": row.address,
+        "company": row.company,
+        "p_type": row.p_type,
+        "chargers_count": row.chargers_count
+    }, **extra)
+
+
+def _escape_like(value):
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def _search_postgres(user_id, query, limit):
+    """Similarity-ranked search served by the pg_trgm GIN indexes on address and company"""
+    company = db.func.coalesce(Project.company, '')
+    score = db.func.greatest(
+        db.func.similarity(Project.address, query),
+        db.func.similarity(company, query)
+    )
+    pattern = f"%{_escape_like(query)}%"
+
+    rows = _project_query(user_id, score.label('score')).filter(
+        db.or_(
+            Project.address.ilike(pattern, escape='\\'),
+            Project.company.ilike(pattern, escape='\\'),
+            Project.address.op('%')(query),
+            Project.company.op('%')(query)
+        )
+    ).order_by(score.desc(), Project.id.desc()).limit(limit).all()
+
+    return [_as_dict(row, score=round(float(row.score), 4)) for row in rows]
+
+
+def _user_index(user_id):
+    def build():
+        return NgramIndex([_as_dict(row) for row in _project_query(user_id).all()])
+    return _index_cache.get(user_id, build)
+
+
+def _normalize(query):
+    return ' '.join(query.lower().split())
+
+
+def search_projects(user_id, query, limit=SEARCH_LIMIT):
+    """Projects of a user whose address or company matches query, best match first"""
+    key = _normalize(query)
+    if len(key) < MIN_QUERY_LENGTH:
+        return []
+
+    results = _result_cache.get(user_id, key, limit)
+    if results is not None:
+        return results
+
+    if dialect_name() == 'postgresql':
+        results = _search_postgres(user_id, key, limit)
+    else:
+        results = _user_index(user_id).search(key, limit)
+
+    _result_cache.put(user_id, key, limit, results)
+    return results
+
+
+def invalidate_user_search(user_id):
+    """Forget search state for a user after their projects change"""
+    _index_cache.invalidate(user_id)
+    _result_cache.invalidate(user_id)
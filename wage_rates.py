@@ -0,0 +1,134 @@
+"""
+Union wage rates as of a date.
+
+UnionWageRate rows are effective-dated: a rate applies from its
+effective_date until the position's next one. RateHistory keeps each
+position's effective dates and rates as parallel sorted lists and answers
+"the rate in force on D" by bisection. The history is cached per worker
+next to the price catalogs and reloaded after the union rate writers call
+invalidate().
+"""
+
+from bisect import bisect_right
+
+from database import db, latest_rows
+from models import Project, LaborCostEstimation, LaborCostEntry, UnionPosition, UnionWageRate
+from pricing import price_cache
+
+HISTORY = 'wage_rate_history'
+
+
+def _position_key(name):
+    return " ".join((name or "").lower().split())
+
+
+class RateHistory:
+    """Every position's effective-dated rates, sorted for as-of lookups"""
+
+    def __init__(self, rows):
+        """``rows`` are (union_id, position_id, position_name, effective_date, base_rate), by position and date"""
+        self._dates = {}
+        self._rates = {}
+        self._positions = {}
+        for union_id, position_id, name, effective_date, base_rate in rows:
+            if position_id not in self._dates:
+                self._dates[position_id] = []
+                self._rates[position_id] = []
+                self._positions[(union_id, _position_key(name))] = position_id
+            if effective_date is not None:
+                self._dates[position_id].append(effective_date)
+                self._rates[position_id].append(base_rate)
+
+    def rate_on(self, position_id, on_date):
+        """(rate, effective_date) in force on ``on_date``, or None before the position's first rate"""
+        dates = self._dates.get(position_id)
+        if not dates:
+            return None
+        index = bisect_right(dates, on_date)
+        if index == 0:
+            return None
+        return self._rates[position_id][index - 1], dates[index - 1]
+
+    def position_id(self, union_id, name):
+        """The union's position with this name, matched ignoring case and spacing"""
+        return self._positions.get((union_id, _position_key(name)))
+
+    def has_union(self, union_id):
+        return any(key[0] == union_id for key in self._positions)
+
+
+def load_history():
+    """Every position's rates, oldest first, in one query"""
+    rows = db.session.query(
+        UnionPosition.union_id,
+        UnionPosition.id,
+        UnionPosition.name,
+        UnionWageRate.effective_date,
+        UnionWageRate.base_rate
+    ).outerjoin(UnionWageRate, UnionWageRate.position_id == UnionPosition.id).order_by(
+        UnionPosition.id, UnionWageRate.effective_date
+    ).all()
+    return RateHistory(rows)
+
+
+def get_history():
+    return price_cache.get(HISTORY, load_history)
+
+
+def invalidate():
+    """Call after committing a wage rate change"""
+    price_cache.invalidate(HISTORY)
+
+
+def rate_on(position_id, on_date):
+    return get_history().rate_on(position_id, on_date)
+
+
+def resolve_projects(union_id, project_ids, user_id=None):
+    """
+    The union's rate in force at each project's start date for every entry
+    of the project's latest labor estimation, in one query:
+
+        {project_id: {"start_date": ..., "entries": [{"entry_id", "position",
+         "entered_rate", "rate", "effective_date"}, ...]}}
+
+    ``rate`` is None for positions the union doesn't have or that had no rate
+    yet on the start date. Projects without labor entries are left out.
+    """
+    if not project_ids:
+        return {}
+    history = get_history()
+
+    where = [LaborCostEstimation.project_id.in_(project_ids)]
+    latest = latest_rows(
+        LaborCostEstimation.project_id,
+        (LaborCostEstimation.created_at.desc(), LaborCostEstimation.id.desc()),
+        (LaborCostEstimation.project_id, LaborCostEstimation.id),
+        where=where
+    )
+    query = db.session.query(
+        Project.id,
+        Project.start_date,
+        LaborCostEntry.id,
+        LaborCostEntry.position,
+        LaborCostEntry.rate
+    ).join(latest, latest.c.project_id == Project.id).join(
+        LaborCostEntry, LaborCostEntry.labor_cost_estimation_id == latest.c.id
+    )
+    if user_id is not None:
+        query = query.filter(Project.user_id == user_id)
+
+    resolved = {}
+    for project_id, start_date, entry_id, position, entered_rate in query.order_by(Project.id, LaborCostEntry.id):
+        project = resolved.setdefault(project_id, {"start_date": start_date, "entries": []})
+        position_id = history.position_id(union_id, position)
+        found = history.rate_on(position_id, start_date) if position_id is not None else None
+        project["entries"].append({
+            "entry_id": entry_id,
+            "position": position,
+            "position_id": position_id,
+            "entered_rate": entered_rate,
+            "rate": found[0] if found else None,
+            "effective_date": found[1] if found else None,
+        })
+    return resolved